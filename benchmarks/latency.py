@@ -0,0 +1,309 @@
+"""Latency of the client under degraded network conditions.
+
+Usage::
+
+    python -m benchmarks.latency                              # Default network profile
+    python -m benchmarks.latency --rtt 50 --errors 0.05       # Worse network
+    python -m benchmarks.latency --operation batch --retry 0  # Other operation and settings
+
+The stand-in server injects the RTT, jitter, bandwidth cap, 429/503 responses and
+dropped connections, and each client mode runs the same operations against the
+same sequence of faults. Latencies are measured per operation, retries included,
+and the goodput only counts the successful operations.
+"""
+
+import argparse
+import asyncio
+import collections
+import logging
+import math
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from kinto_http import AsyncClient, Client, utils
+from kinto_http.hedging import HedgingPolicy
+from kinto_http.instrumentation import BACKOFF_WAIT, HEDGE, REQUEST_END, REQUEST_RETRY, Event
+
+from .run import BUCKET, COLLECTION, make_record
+from .server import Faults, Store, running_server
+
+
+MODES = ("sync", "threads", "async")
+
+
+class Outcome(NamedTuple):
+    latency: float
+    error: Optional[str]
+
+
+class Counters(object):
+    """Instrumentation listener counting the retries, the backoff waits and the bytes
+    of successful responses.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.good_bytes = 0
+        self.backoff_wait = 0.0
+        self.hedges = 0
+        self.hedges_won = 0
+
+    def __call__(self, event: Event) -> None:
+        with self._lock:
+            if event.name == REQUEST_RETRY:
+                self.retries += 1
+            elif event.name == HEDGE:
+                self.hedges += 1
+                self.hedges_won += event.attributes["won"]
+            elif event.name == BACKOFF_WAIT:
+                self.backoff_wait += event.attributes["seconds"]
+            elif event.name == REQUEST_END and (event.attributes["status"] or 500) < 400:
+                self.good_bytes += event.attributes["response_bytes"]
+
+
+def record_id(i: int, options: argparse.Namespace) -> str:
+    return make_record(i % options.records)["id"]
+
+
+def get_record(client: Client, i: int, options: argparse.Namespace) -> Any:
+    return client.get_record(id=record_id(i, options))
+
+
+async def async_get_record(client: AsyncClient, i: int, options: argparse.Namespace) -> Any:
+    return await client.get_record(id=record_id(i, options))  # ty: ignore[invalid-await]
+
+
+def get_records(client: Client, i: int, options: argparse.Namespace) -> Any:
+    return client.get_records()
+
+
+async def async_get_records(client: AsyncClient, i: int, options: argparse.Namespace) -> Any:
+    return await client.get_records()  # ty: ignore[invalid-await]
+
+
+def batch(client: Client, i: int, options: argparse.Namespace) -> Any:
+    with client.batch() as b:
+        for j in range(options.batch_size):
+            b.update_record(data=make_record(i * options.batch_size + j), safe=False)
+
+
+# Name: (operation of the sync and threads modes, operation of the async mode)
+OPERATIONS: Dict[str, Any] = {
+    "get_record": (get_record, async_get_record),
+    "get_records": (get_records, async_get_records),
+    # `AsyncClient.batch()` cannot be used as a context manager.
+    "batch": (batch, None),
+}
+
+
+def timed(func: Callable[[], Any]) -> Outcome:
+    started = time.perf_counter()
+    try:
+        func()
+    except Exception as e:
+        return Outcome(time.perf_counter() - started, type(e).__name__)
+    return Outcome(time.perf_counter() - started, None)
+
+
+async def async_timed(coroutine: Any) -> Outcome:
+    started = time.perf_counter()
+    try:
+        await coroutine
+    except Exception as e:
+        return Outcome(time.perf_counter() - started, type(e).__name__)
+    return Outcome(time.perf_counter() - started, None)
+
+
+def run_mode(mode: str, client: Client, options: argparse.Namespace) -> List[Outcome]:
+    operation, async_operation = OPERATIONS[options.operation]
+    requests = range(options.requests)
+
+    if mode == "sync":
+        return [timed(lambda: operation(client, i, options)) for i in requests]
+
+    if mode == "threads":
+        return list(
+            utils.concurrent_map(
+                lambda i: timed(lambda: operation(client, i, options)),
+                requests,
+                options.concurrency,
+            )
+        )
+
+    async def run_async() -> List[Outcome]:
+        semaphore = asyncio.Semaphore(options.concurrency)
+
+        async def one(i: int) -> Outcome:
+            async with semaphore:
+                return await async_timed(async_operation(client, i, options))
+
+        return await asyncio.gather(*(one(i) for i in requests))
+
+    return asyncio.run(run_async())
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def summarize(outcomes: List[Outcome], elapsed: float, counters: Counters) -> Dict[str, Any]:
+    latencies = [outcome.latency for outcome in outcomes]
+    errors = collections.Counter(outcome.error for outcome in outcomes if outcome.error)
+    succeeded = len(outcomes) - sum(errors.values())
+    return {
+        "succeeded": succeeded,
+        "failed": dict(errors),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+        "goodput_ops_per_sec": succeeded / elapsed,
+        "goodput_mb_per_sec": counters.good_bytes / elapsed / (1024 * 1024),
+        "retries": counters.retries,
+        "backoff_wait": counters.backoff_wait,
+        "hedges": counters.hedges,
+        "hedges_won": counters.hedges_won,
+    }
+
+
+def format_result(mode: str, result: Dict[str, Any]) -> str:
+    failed = ", ".join(f"{name}={count}" for name, count in sorted(result["failed"].items()))
+    return (
+        f"{mode:<8} {result['succeeded']:>6} {result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} "
+        f"{result['max_ms']:>8.1f} {result['goodput_ops_per_sec']:>9.1f} "
+        f"{result['goodput_mb_per_sec']:>7.2f} {result['retries']:>7} "
+        f"{result['backoff_wait']:>9.1f} {result['hedges_won']:>4}/{result['hedges']:<4} "
+        f"{failed or '-'}"
+    )
+
+
+HEADER = (
+    f"{'mode':<8} {'ok':>6} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'ok ops/s':>9} "
+    f"{'MB/s':>7} {'retries':>7} {'waited s':>9} {'hedges':>9} failures"
+)
+
+
+def run_all(options: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    store = Store()
+    for i in range(options.records):
+        store.put_record(BUCKET, COLLECTION, make_record(i))
+    faults = Faults(
+        rtt=options.rtt / 1000,
+        jitter=options.jitter / 1000,
+        bandwidth=options.bandwidth * 1024,
+        errors=options.errors,
+        throttles=options.throttles,
+        retry_after=options.server_retry_after,
+        backoffs=options.backoffs,
+        backoff=options.backoff,
+        drops=options.drops,
+        stalls=options.stalls,
+        stall=options.stall / 1000,
+        seed=options.seed,
+    )
+    results = {}
+    print(HEADER, flush=True)
+    for mode in options.modes:
+        if mode == "async" and OPERATIONS[options.operation][1] is None:
+            continue
+        # A new server for each mode, for the same sequence of faults.
+        with running_server(
+            store=store,
+            page_size=options.page_size,
+            batch_max_requests=options.batch_max_requests,
+            faults=faults,
+        ) as server:
+            client_class = AsyncClient if mode == "async" else Client
+            client = client_class(
+                server_url=server.url,
+                bucket=BUCKET,
+                collection=COLLECTION,
+                retry=options.retry,
+                retry_after=options.retry_after,
+                timeout=options.timeout,
+                backoff_mode=options.backoff_mode,
+                deadline=options.deadline,
+                hedging=(
+                    HedgingPolicy(percentile=options.hedge, max_ratio=options.hedge_ratio)
+                    if options.hedge
+                    else None
+                ),
+            )
+            counters = Counters()
+            client.add_listener(counters)
+            started = time.perf_counter()
+            outcomes = run_mode(mode, client, options)
+            results[mode] = summarize(outcomes, time.perf_counter() - started, counters)
+        print(format_result(mode, results[mode]), flush=True)
+    return results
+
+
+def get_arguments(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("modes", nargs="*", metavar="MODE", help=f"Among {', '.join(MODES)}")
+    parser.add_argument("--operation", choices=list(OPERATIONS), default="get_record")
+    parser.add_argument("--requests", type=int, default=300, help="Operations per mode")
+    parser.add_argument("--concurrency", type=int, default=8, help="Of threads and async modes")
+    parser.add_argument("--records", type=int, default=1000, help="Number of records")
+    parser.add_argument("--page-size", type=int, default=100, help="Records per page")
+    parser.add_argument("--batch-size", type=int, default=50, help="Records per batch operation")
+    parser.add_argument("--batch-max-requests", type=int, default=25)
+
+    server = parser.add_argument_group("network conditions")
+    server.add_argument("--rtt", type=float, default=20, help="Round-trip time (ms)")
+    server.add_argument("--jitter", type=float, default=20, help="Maximum jitter (ms)")
+    server.add_argument("--bandwidth", type=int, default=0, help="Bandwidth cap (KB/s)")
+    server.add_argument("--errors", type=float, default=0.01, help="Ratio of 503 responses")
+    server.add_argument("--throttles", type=float, default=0.01, help="Ratio of 429 responses")
+    server.add_argument(
+        "--server-retry-after", type=int, default=1, help="Retry-After header (seconds)"
+    )
+    server.add_argument(
+        "--backoffs", type=float, default=0, help="Ratio of responses with Backoff header"
+    )
+    server.add_argument("--backoff", type=int, default=1, help="Backoff header (seconds)")
+    server.add_argument("--drops", type=float, default=0.005, help="Ratio of dropped connections")
+    server.add_argument("--stalls", type=float, default=0, help="Ratio of stalled responses")
+    server.add_argument("--stall", type=float, default=500, help="Stall duration (ms)")
+    server.add_argument("--seed", type=int, default=42, help="Seed of the faults")
+
+    client = parser.add_argument_group("client settings")
+    client.add_argument("--retry", type=int, default=2, help="Number of retries")
+    client.add_argument(
+        "--retry-after", type=int, default=None, help="Force the retry delay (seconds)"
+    )
+    client.add_argument("--timeout", type=float, default=None, help="Request timeout (seconds)")
+    client.add_argument("--backoff-mode", choices=("raise", "wait"), default="raise")
+    client.add_argument(
+        "--hedge", type=float, default=None, help="Hedge GET requests after this percentile"
+    )
+    client.add_argument(
+        "--hedge-ratio", type=float, default=0.1, help="Maximum ratio of hedged requests"
+    )
+    client.add_argument(
+        "--deadline", type=float, default=None, help="Maximum duration of operations (seconds)"
+    )
+
+    options = parser.parse_args(argv)
+    if unknown := set(options.modes) - set(MODES):
+        parser.error(f"Unknown modes: {', '.join(sorted(unknown))}")
+    options.modes = options.modes or list(MODES)
+    return options
+
+
+def main(argv: List[str] = sys.argv[1:]) -> int:
+    options = get_arguments(argv)
+    # Failed operations are logged, do not measure the terminal output.
+    logging.getLogger("kinto_http").setLevel(logging.CRITICAL)
+    run_all(options)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
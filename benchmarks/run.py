@@ -0,0 +1,275 @@
+"""Benchmarks of the client against the in-process Kinto stand-in server.
+
+Usage::
+
+    python -m benchmarks.run                 # Run all the benchmarks
+    python -m benchmarks.run get_records     # Run some of them
+    python -m benchmarks.run --save          # Store the results as the new baselines
+    python -m benchmarks.run --compare       # Fail if slower than the baselines
+
+Each benchmark runs in a fresh process, so that its peak RSS is not affected by
+the server or by the other benchmarks.
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+from kinto_http import Client
+from kinto_http.replication import replicate
+
+from .server import Faults, Store, running_server
+
+
+BASELINES = os.path.join(os.path.dirname(__file__), "baselines.json")
+
+BUCKET = "bench"
+COLLECTION = "records"
+
+
+class Measure(NamedTuple):
+    ops: int
+    bytes: int
+
+
+def make_record(i: int) -> Dict[str, Any]:
+    return {
+        "id": f"record-{i:08d}",
+        "title": f"Record number {i}",
+        "tags": ["a", "b", "c"][: i % 4],
+        "score": i * 7 % 101,
+        "nested": {"field": "x" * 64},
+    }
+
+
+def seed_records(store: Store, options: argparse.Namespace) -> None:
+    for i in range(options.records):
+        store.put_record(BUCKET, COLLECTION, make_record(i))
+
+
+def seed_attachments(store: Store, options: argparse.Namespace) -> None:
+    content = os.urandom(options.attachment_size)
+    for i in range(options.attachments):
+        store.add_attachment(BUCKET, "files", f"file-{i}", f"file-{i}.bin", content)
+
+
+class ResponseBytes(object):
+    """Instrumentation listener counting the bytes received."""
+
+    def __init__(self) -> None:
+        self.total = 0
+
+    def __call__(self, event: Any) -> None:
+        if event.name == "request.end":
+            self.total += event.attributes["response_bytes"]
+
+
+def bench_get_records(client: Client, options: argparse.Namespace) -> Measure:
+    counter = ResponseBytes()
+    client.add_listener(counter)
+    records = client.get_records()
+    return Measure(len(records), counter.total)
+
+
+def bench_get_paginated_records(client: Client, options: argparse.Namespace) -> Measure:
+    counter = ResponseBytes()
+    client.add_listener(counter)
+    count = sum(len(page["data"]) for page in client.get_paginated_records())
+    return Measure(count, counter.total)
+
+
+def bench_batch(client: Client, options: argparse.Namespace) -> Measure:
+    dest = client.clone(collection=f"batch-{time.monotonic_ns()}")
+    with dest.batch() as batch:
+        for i in range(options.records):
+            batch.update_record(data=make_record(i), safe=False)
+    return Measure(options.records, 0)
+
+
+def bench_create_records(client: Client, options: argparse.Namespace) -> Measure:
+    dest = client.clone(collection=f"bulk-{time.monotonic_ns()}")
+    records = (make_record(i) for i in range(options.records))
+    created = sum(r["status"] < 400 for r in dest.create_records(records, workers=options.workers))
+    return Measure(created, 0)
+
+
+def bench_replicate(client: Client, options: argparse.Namespace) -> Measure:
+    counter = ResponseBytes()
+    client.add_listener(counter)
+    dest = client.clone(collection=f"replica-{time.monotonic_ns()}")
+    replicate(client, dest)
+    return Measure(options.records, counter.total)
+
+
+def bench_download_attachment(client: Client, options: argparse.Namespace) -> Measure:
+    files = client.clone(collection="files")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for record in files.get_records():
+            files.download_attachment(record, filepath=tmp_dir, overwrite=True)
+    return Measure(options.attachments, options.attachments * options.attachment_size)
+
+
+# Name: (benchmark, seeding of the server)
+BENCHMARKS: Dict[str, Tuple[Callable[[Client, argparse.Namespace], Measure], Callable]] = {
+    "get_records": (bench_get_records, seed_records),
+    "get_paginated_records": (bench_get_paginated_records, seed_records),
+    "batch": (bench_batch, seed_records),
+    "create_records": (bench_create_records, seed_records),
+    "replicate": (bench_replicate, seed_records),
+    "download_attachment": (bench_download_attachment, seed_attachments),
+}
+
+
+def peak_rss_mb() -> float:
+    try:
+        # Unlike ``ru_maxrss``, not inherited from the parent process.
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run_benchmark(name: str, server_url: str, options: argparse.Namespace) -> Dict[str, float]:
+    """Run the benchmark in the current (fresh) process, and return its results."""
+    benchmark, _ = BENCHMARKS[name]
+    # Batch responses are logged as warnings, do not measure the terminal output.
+    logging.getLogger("kinto_http").setLevel(logging.ERROR)
+    client = Client(server_url=server_url, bucket=BUCKET, collection=COLLECTION)
+    client.server_info()  # Warm up the connection.
+    rss_before = peak_rss_mb()
+
+    best = float("inf")
+    measure = Measure(0, 0)
+    for _ in range(options.repeat):
+        started = time.perf_counter()
+        measure = benchmark(client.clone(), options)
+        best = min(best, time.perf_counter() - started)
+
+    return {
+        "seconds": best,
+        "ops_per_sec": measure.ops / best,
+        "mb_per_sec": measure.bytes / best / (1024 * 1024),
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_growth_mb": peak_rss_mb() - rss_before,
+    }
+
+
+def run_all(names: List[str], options: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for name in names:
+        _, seed = BENCHMARKS[name]
+        store = Store()
+        seed(store, options)
+        server_options = dict(
+            store=store,
+            page_size=options.page_size,
+            batch_max_requests=options.batch_max_requests,
+            faults=Faults(rtt=options.latency / 1000),
+        )
+        with running_server(**server_options) as server:
+            with context.Pool(1) as pool:
+                results[name] = pool.apply(run_benchmark, (name, server.url, options))
+        print(format_result(name, results[name]), flush=True)
+    return results
+
+
+def format_result(name: str, result: Dict[str, float]) -> str:
+    return (
+        f"{name:<24} {result['ops_per_sec']:>12.1f} ops/s {result['mb_per_sec']:>9.2f} MB/s "
+        f"{result['peak_rss_mb']:>8.1f} MB peak RSS ({result['rss_growth_mb']:+.1f} MB)"
+    )
+
+
+def compare(
+    results: Dict[str, Dict[str, float]], baselines: Dict[str, Any], tolerance: float
+) -> List[str]:
+    """Return the regressions compared to the baselines."""
+    regressions = []
+    for name, result in results.items():
+        baseline = baselines["results"].get(name)
+        if baseline is None:
+            continue
+        if result["ops_per_sec"] < baseline["ops_per_sec"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: {result['ops_per_sec']:.1f} ops/s "
+                f"(baseline {baseline['ops_per_sec']:.1f} ops/s)"
+            )
+        if result["rss_growth_mb"] > max(baseline["rss_growth_mb"], 1) * (1 + tolerance) + 5:
+            regressions.append(
+                f"{name}: RSS grew by {result['rss_growth_mb']:.1f} MB "
+                f"(baseline {baseline['rss_growth_mb']:.1f} MB)"
+            )
+    return regressions
+
+
+def get_arguments(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "benchmarks", nargs="*", metavar="BENCHMARK", help=f"Among {', '.join(BENCHMARKS)}"
+    )
+    parser.add_argument("--records", type=int, default=10_000, help="Number of records")
+    parser.add_argument("--attachments", type=int, default=20, help="Number of attachments")
+    parser.add_argument(
+        "--attachment-size", type=int, default=5 * 1024 * 1024, help="Size of attachments"
+    )
+    parser.add_argument("--page-size", type=int, default=1000, help="Records per page")
+    parser.add_argument("--batch-max-requests", type=int, default=25)
+    parser.add_argument("--workers", type=int, default=None, help="Of bulk operations")
+    parser.add_argument("--latency", type=float, default=0, help="Server latency (ms)")
+    parser.add_argument("--repeat", type=int, default=3, help="Keep the best of N runs")
+    parser.add_argument("--baselines", default=BASELINES, help="Baselines file")
+    parser.add_argument("--save", action="store_true", help="Save results as baselines")
+    parser.add_argument("--compare", action="store_true", help="Compare with baselines")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25, help="Accepted slowdown (default: 25%%)"
+    )
+    options = parser.parse_args(argv)
+    if unknown := set(options.benchmarks) - set(BENCHMARKS):
+        parser.error(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+    return options
+
+
+def main(argv: List[str] = sys.argv[1:]) -> int:
+    options = get_arguments(argv)
+    names = options.benchmarks or list(BENCHMARKS)
+    results = run_all(names, options)
+
+    if options.compare:
+        with open(options.baselines) as f:
+            baselines = json.load(f)
+        regressions = compare(results, baselines, options.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+
+    if options.save:
+        baselines = {
+            "machine": {"python": platform.python_version(), "platform": platform.platform()},
+            "options": {
+                k: v for k, v in vars(options).items() if k not in ("baselines", "save", "compare")
+            },
+            "results": results,
+        }
+        with open(options.baselines, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
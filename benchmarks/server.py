@@ -0,0 +1,530 @@
+"""A lightweight, in-process stand-in for a Kinto server.
+
+It implements just enough of the Kinto API for the client benchmarks: buckets,
+collections, records (with pagination, ``_since``, ``_limit`` and concurrency
+control headers), ``/batch``, ``/changeset`` and attachments (upload, and
+download with ``Range`` support). Data is kept in memory.
+
+Network conditions and failures can be injected with :class:`Faults`.
+
+It is not a reference implementation, and must not be used for functional tests.
+"""
+
+import email.parser
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+
+PREFIX = "/v1"
+
+COLLECTION_RE = re.compile(r"^/buckets/([^/]+)/collections/([^/]+)$")
+RECORDS_RE = re.compile(r"^/buckets/([^/]+)/collections/([^/]+)/records$")
+RECORD_RE = re.compile(r"^/buckets/([^/]+)/collections/([^/]+)/records/([^/]+)$")
+ATTACHMENT_RE = re.compile(r"^/buckets/([^/]+)/collections/([^/]+)/records/([^/]+)/attachment$")
+CHANGESET_RE = re.compile(r"^/buckets/([^/]+)/collections/([^/]+)/changeset$")
+BUCKET_RE = re.compile(r"^/buckets/([^/]+)$")
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str = ""):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Faults(NamedTuple):
+    """Network conditions and failures injected by the stand-in server.
+
+    Ratios are probabilities per request, drawn from a generator seeded with ``seed``
+    so that runs are reproducible.
+    """
+
+    #: Delay added to every request (seconds).
+    rtt: float = 0.0
+    #: Maximum random delay added on top of the RTT (seconds).
+    jitter: float = 0.0
+    #: Maximum throughput of the responses bodies (bytes per second, 0 for unlimited).
+    bandwidth: int = 0
+    #: Ratio of requests answered with ``503 Service Unavailable``.
+    errors: float = 0.0
+    #: Ratio of requests answered with ``429 Too Many Requests``.
+    throttles: float = 0.0
+    #: Value of the ``Retry-After`` header of the 429 and 503 responses (seconds).
+    retry_after: int = 1
+    #: Ratio of successful responses with a ``Backoff`` header.
+    backoffs: float = 0.0
+    #: Value of the ``Backoff`` header (seconds).
+    backoff: int = 1
+    #: Ratio of connections closed without response.
+    drops: float = 0.0
+    #: Ratio of responses delayed by ``stall`` seconds (eg. garbage collection pauses).
+    stalls: float = 0.0
+    #: Delay of the stalled responses (seconds).
+    stall: float = 0.5
+    seed: int = 42
+
+
+class Collection(object):
+    def __init__(self, data: Optional[Dict[str, Any]] = None):
+        self.data = data or {}
+        self.records: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.tombstones: Dict[str, int] = {}
+        self.timestamp = 0
+
+
+class Store(object):
+    """In-memory storage of the stand-in server."""
+
+    def __init__(self) -> None:
+        self.lock = threading.RLock()
+        self.buckets: Dict[str, Dict[str, Any]] = {}
+        self.collections: Dict[Tuple[str, str], Collection] = {}
+        self.attachments: Dict[str, bytes] = {}
+        self._clock = int(time.time() * 1000)
+
+    def tick(self) -> int:
+        # Strictly increasing timestamps, like Kinto.
+        with self.lock:
+            self._clock = max(self._clock + 1, int(time.time() * 1000))
+            return self._clock
+
+    def collection(self, bid: str, cid: str, create: bool = False) -> Collection:
+        with self.lock:
+            key = (bid, cid)
+            if key not in self.collections:
+                if not create:
+                    raise HTTPError(404, f"Collection {cid} not found")
+                self.buckets.setdefault(bid, {"id": bid, "last_modified": self.tick()})
+                self.collections[key] = Collection({"id": cid, "last_modified": self.tick()})
+            return self.collections[key]
+
+    def put_record(self, bid: str, cid: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        with self.lock:
+            collection = self.collection(bid, cid, create=True)
+            record = {**record, "last_modified": self.tick()}
+            collection.records.pop(record["id"], None)
+            collection.records[record["id"]] = record
+            collection.tombstones.pop(record["id"], None)
+            collection.timestamp = record["last_modified"]
+            return record
+
+    def delete_record(self, bid: str, cid: str, rid: str) -> Dict[str, Any]:
+        with self.lock:
+            collection = self.collection(bid, cid)
+            if rid not in collection.records:
+                raise HTTPError(404, f"Record {rid} not found")
+            del collection.records[rid]
+            timestamp = self.tick()
+            collection.tombstones[rid] = timestamp
+            collection.timestamp = timestamp
+            return {"id": rid, "deleted": True, "last_modified": timestamp}
+
+    def add_attachment(self, bid: str, cid: str, rid: str, filename: str, content: bytes) -> None:
+        location = f"{bid}/{cid}/{rid}/{filename}"
+        with self.lock:
+            self.attachments[location] = content
+            record = self.collection(bid, cid, create=True).records.get(rid, {"id": rid})
+        attachment = {
+            "location": location,
+            "filename": filename,
+            "size": len(content),
+            "hash": hashlib.sha256(content).hexdigest(),
+            "mimetype": "application/octet-stream",
+        }
+        self.put_record(bid, cid, {**record, "attachment": attachment})
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately: avoid the delayed ACKs.
+    disable_nagle_algorithm = True
+    server: "StandInServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self._handle("GET")
+
+    def do_HEAD(self) -> None:
+        self._handle("HEAD")
+
+    def do_POST(self) -> None:
+        self._handle("POST")
+
+    def do_PUT(self) -> None:
+        self._handle("PUT")
+
+    def do_PATCH(self) -> None:
+        self._handle("PATCH")
+
+    def do_DELETE(self) -> None:
+        self._handle("DELETE")
+
+    def _handle(self, method: str) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        url = urlparse(self.path)
+        server = self.server
+        delay = server.delay()
+        if delay:
+            time.sleep(delay)
+
+        failure = server.failure()
+        if failure == "drop":
+            self.close_connection = True
+            return
+        if failure:
+            self._send_error(method, failure, {"Retry-After": str(server.faults.retry_after)})
+            return
+
+        if url.path.startswith("/attachments/"):
+            self._send_attachment(method, url.path[len("/attachments/") :])
+            return
+
+        headers = {key.lower(): value for key, value in self.headers.items()}
+        status, payload, response_headers = self.server.dispatch(
+            method, url.path, dict(parse_qsl(url.query)), headers, body
+        )
+        if status < 400 and server.backoff():
+            response_headers["Backoff"] = str(server.faults.backoff)
+        self._send_json(method, status, payload, response_headers)
+
+    def _send_json(self, method: str, status: int, payload: Any, headers: Dict[str, str]) -> None:
+        content = b"" if payload is None else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        if method != "HEAD":
+            self._write(content)
+
+    def _send_error(self, method: str, status: int, headers: Dict[str, str]) -> None:
+        payload = {"code": status, "message": "Injected failure"}
+        self._send_json(method, status, payload, headers)
+
+    def _write(self, content: bytes) -> None:
+        bandwidth = self.server.faults.bandwidth
+        view = memoryview(content)
+        chunk_size = min(64 * 1024, bandwidth) if bandwidth else 64 * 1024
+        for offset in range(0, len(view), chunk_size):
+            chunk = view[offset : offset + chunk_size]
+            self.wfile.write(chunk)
+            if bandwidth:
+                time.sleep(len(chunk) / bandwidth)
+
+    def _send_attachment(self, method: str, location: str) -> None:
+        content = self.server.store.attachments.get(location)
+        if content is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        start = 0
+        match = re.match(r"bytes=(\d+)-$", self.headers.get("Range", ""))
+        if match and int(match.group(1)) < len(content):
+            start = int(match.group(1))
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(content) - 1}/{len(content)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(content) - start))
+        self.end_headers()
+        if method != "HEAD":
+            self._write(content[start:] if start else content)
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Kinto stand-in server.
+
+    :param page_size: maximum number of records per page (like Kinto's ``paginate_by``).
+    :param batch_max_requests: maximum number of requests per batch.
+    :param faults: network conditions and failures to inject (see :class:`Faults`).
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int] = ("127.0.0.1", 0),
+        *,
+        store: Optional[Store] = None,
+        page_size: int = 1000,
+        batch_max_requests: int = 25,
+        faults: Optional[Faults] = None,
+    ):
+        super().__init__(address, Handler)
+        self.store = store or Store()
+        self.page_size = page_size
+        self.batch_max_requests = batch_max_requests
+        self.faults = faults or Faults()
+        self._random = random.Random(self.faults.seed)
+        self._random_lock = threading.Lock()
+
+    def _draw(self) -> float:
+        with self._random_lock:
+            return self._random.random()
+
+    def delay(self) -> float:
+        """Return the delay of the next response (seconds)."""
+        faults = self.faults
+        delay = faults.rtt + (faults.jitter * self._draw() if faults.jitter else 0.0)
+        if faults.stalls and self._draw() < faults.stalls:
+            delay += faults.stall
+        return delay
+
+    def failure(self) -> Union[str, int, None]:
+        """Return ``"drop"``, the status of an error response, or ``None``."""
+        faults = self.faults
+        if not (faults.drops or faults.errors or faults.throttles):
+            return None
+        draw = self._draw()
+        if draw < faults.drops:
+            return "drop"
+        if draw < faults.drops + faults.errors:
+            return 503
+        if draw < faults.drops + faults.errors + faults.throttles:
+            return 429
+        return None
+
+    def backoff(self) -> bool:
+        """Whether the next successful response has a ``Backoff`` header."""
+        return bool(self.faults.backoffs) and self._draw() < self.faults.backoffs
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{PREFIX}"
+
+    def dispatch(
+        self,
+        method: str,
+        path: str,
+        params: Dict[str, str],
+        headers: Dict[str, str],
+        body: bytes,
+    ) -> Tuple[int, Any, Dict[str, str]]:
+        """Handle an API request, and return its status, body and headers."""
+        if not path.startswith(PREFIX):
+            return 404, {"message": "Not found"}, {}
+        path = path[len(PREFIX) :].rstrip("/")
+        try:
+            return self._route(method, path, params, headers, body)
+        except HTTPError as e:
+            return e.status, {"code": e.status, "message": e.message}, {}
+
+    def _route(
+        self,
+        method: str,
+        path: str,
+        params: Dict[str, str],
+        headers: Dict[str, str],
+        body: bytes,
+    ) -> Tuple[int, Any, Dict[str, str]]:
+        store = self.store
+        if path == "":
+            return 200, self._server_info(), {}
+
+        if path == "/batch" and method == "POST":
+            return 200, self._batch(json.loads(body)), {}
+
+        if match := RECORDS_RE.match(path):
+            bid, cid = match.groups()
+            return self._records(method, bid, cid, params, headers)
+
+        if match := ATTACHMENT_RE.match(path):
+            bid, cid, rid = match.groups()
+            if method != "POST":
+                raise HTTPError(405)
+            filename, content = _parse_multipart(headers.get("content-type", ""), body)
+            store.add_attachment(bid, cid, rid, filename, content)
+            record = store.collection(bid, cid).records[rid]
+            return 201, record["attachment"], {}
+
+        if match := RECORD_RE.match(path):
+            bid, cid, rid = match.groups()
+            return self._record(method, bid, cid, rid, headers, body)
+
+        if match := CHANGESET_RE.match(path):
+            bid, cid = match.groups()
+            collection = store.collection(bid, cid)
+            with store.lock:
+                changes = self._changes(collection, params.get("_since"))
+                timestamp = collection.timestamp
+            return (
+                200,
+                {"metadata": collection.data, "timestamp": timestamp, "changes": changes},
+                {},
+            )
+
+        if match := COLLECTION_RE.match(path):
+            bid, cid = match.groups()
+            if method in ("PUT", "PATCH", "POST"):
+                data = (json.loads(body) if body else {}).get("data") or {}
+                exists = (bid, cid) in store.collections
+                if exists and headers.get("if-none-match") == "*":
+                    raise HTTPError(412, "Resource already exists")
+                collection = store.collection(bid, cid, create=True)
+                collection.data = {**collection.data, **data, "id": cid}
+                return (200 if exists else 201), self._resource(collection.data), {}
+            collection = store.collection(bid, cid)
+            return 200, self._resource(collection.data), {}
+
+        if match := BUCKET_RE.match(path):
+            (bid,) = match.groups()
+            with store.lock:
+                exists = bid in store.buckets
+                if method in ("PUT", "PATCH", "POST"):
+                    if exists and headers.get("if-none-match") == "*":
+                        raise HTTPError(412, "Resource already exists")
+                    store.buckets[bid] = {"id": bid, "last_modified": store.tick()}
+                elif not exists:
+                    raise HTTPError(403, f"Bucket {bid} not accessible")
+                return (200 if exists else 201), self._resource(store.buckets[bid]), {}
+
+        raise HTTPError(404, f"Unknown endpoint {path}")
+
+    def _server_info(self) -> Dict[str, Any]:
+        base_url = self.url[: -len(PREFIX)] + "/attachments/"
+        return {
+            "project_name": "kinto stand-in",
+            "settings": {"batch_max_requests": self.batch_max_requests, "readonly": False},
+            "capabilities": {"attachments": {"base_url": base_url}},
+        }
+
+    @staticmethod
+    def _resource(data: Dict[str, Any]) -> Dict[str, Any]:
+        return {"data": data, "permissions": {}}
+
+    @staticmethod
+    def _changes(collection: Collection, since: Optional[str]) -> List[Dict[str, Any]]:
+        # Records are kept in the order of their modification.
+        records = list(reversed(collection.records.values()))
+        if since:
+            since_ts = int(since.strip('"'))
+            records = [r for r in records if r["last_modified"] > since_ts]
+            records += [
+                {"id": rid, "deleted": True, "last_modified": ts}
+                for rid, ts in collection.tombstones.items()
+                if ts > since_ts
+            ]
+            records.sort(key=lambda r: r["last_modified"], reverse=True)
+        return records
+
+    def _records(
+        self, method: str, bid: str, cid: str, params: Dict[str, str], headers: Dict[str, str]
+    ) -> Tuple[int, Any, Dict[str, str]]:
+        store = self.store
+        collection = store.collection(bid, cid, create=method not in ("GET", "HEAD"))
+        with store.lock:
+            etag = f'"{collection.timestamp}"'
+            if headers.get("if-none-match") == etag:
+                return 304, None, {"ETag": etag}
+            if method == "DELETE":
+                deleted = [store.delete_record(bid, cid, rid) for rid in list(collection.records)]
+                return 200, {"data": deleted}, {"ETag": f'"{collection.timestamp}"'}
+            records = self._changes(collection, params.get("_since"))
+
+        if ids := params.get("in_id"):
+            wanted = set(ids.split(","))
+            records = [r for r in records if r["id"] in wanted]
+
+        offset = int(params.pop("_token", 0))
+        limit = min(int(params.get("_limit", self.page_size)), self.page_size)
+        page = records[offset : offset + limit]
+        response_headers = {"ETag": etag, "Total-Records": str(len(records))}
+        if offset + limit < len(records):
+            query = urlencode({**params, "_token": offset + limit})
+            response_headers["Next-Page"] = (
+                f"{self.url}/buckets/{bid}/collections/{cid}/records?{query}"
+            )
+        return 200, {"data": page}, response_headers
+
+    def _record(
+        self, method: str, bid: str, cid: str, rid: str, headers: Dict[str, str], body: bytes
+    ) -> Tuple[int, Any, Dict[str, str]]:
+        store = self.store
+        with store.lock:
+            collection = store.collection(bid, cid, create=method in ("PUT", "PATCH"))
+            existing = collection.records.get(rid)
+            if_match = headers.get("if-match")
+            if if_match and (existing is None or if_match != f'"{existing["last_modified"]}"'):
+                raise HTTPError(412, "Resource was modified meanwhile")
+            if headers.get("if-none-match") == "*" and existing is not None:
+                raise HTTPError(412, "Resource already exists")
+
+            if method == "GET":
+                if existing is None:
+                    raise HTTPError(404, f"Record {rid} not found")
+                return 200, self._resource(existing), {}
+            if method == "DELETE":
+                return 200, {"data": store.delete_record(bid, cid, rid)}, {}
+
+            data = (json.loads(body) if body else {}).get("data") or {}
+            if method == "PATCH":
+                if existing is None:
+                    raise HTTPError(404, f"Record {rid} not found")
+                data = {**existing, **data}
+            data.pop("last_modified", None)
+            record = store.put_record(bid, cid, {**data, "id": rid})
+            return (200 if existing else 201), self._resource(record), {}
+
+    def _batch(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        defaults = payload.get("defaults") or {}
+        requests = payload["requests"]
+        if len(requests) > self.batch_max_requests:
+            raise HTTPError(400, f"Number of requests is limited to {self.batch_max_requests}")
+        responses = []
+        for request in requests:
+            request = {**defaults, **request}
+            path = urlparse(request["path"])
+            subpath = path.path if path.path.startswith(PREFIX) else PREFIX + path.path
+            headers = {k.lower(): v for k, v in (request.get("headers") or {}).items()}
+            body = json.dumps(request.get("body") or {}).encode()
+            status, resp, _ = self.dispatch(
+                request.get("method", "GET").upper(),
+                subpath,
+                dict(parse_qsl(path.query)),
+                headers,
+                body,
+            )
+            responses.append(
+                {"status": status, "path": request["path"], "body": resp or {}, "headers": {}}
+            )
+        return {"responses": responses}
+
+
+def _parse_multipart(content_type: str, body: bytes) -> Tuple[str, bytes]:
+    """Return the filename and content of the ``attachment`` part."""
+    message = email.parser.BytesParser().parsebytes(
+        b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body
+    )
+    for part in message.get_payload():
+        if part.get_param("name", header="content-disposition") == "attachment":
+            return part.get_filename(), part.get_payload(decode=True)
+    raise HTTPError(400, "Missing attachment")
+
+
+@contextmanager
+def running_server(**options: Any) -> Iterator[StandInServer]:
+    """Run a stand-in server in a background thread."""
+    server = StandInServer(**options)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -6,10 +6,14 @@ import requests.auth
 from requests.models import PreparedRequest
 
 from kinto_http.client import AsyncClient, Client
+from kinto_http.deadlines import deadline
 from kinto_http.endpoints import Endpoints
 from kinto_http.exceptions import (
+    AttachmentIntegrityError,
     BucketNotFound,
+    CircuitOpenException,
     CollectionNotFound,
+    DeadlineExceeded,
     KintoBatchException,
     KintoException,
 )
@@ -28,8 +32,12 @@ __all__ = (
     "AsyncClient",
     "Client",
     "create_session",
+    "deadline",
+    "AttachmentIntegrityError",
     "BucketNotFound",
+    "CircuitOpenException",
     "CollectionNotFound",
+    "DeadlineExceeded",
     "KintoException",
     "KintoBatchException",
 )
@@ -0,0 +1,190 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from kinto_http import utils
+from kinto_http.constants import MAX_WORKERS
+
+
+logger = logging.getLogger(__name__)
+
+
+class HashCache(object):
+    """Persistent cache of the SHA-256 hashes of local files.
+
+    Hashes are stored in a JSON file, keyed by the absolute path of the files,
+    along with their size and modification time. A file is hashed again only if
+    its size or modification time has changed.
+
+    The cache can be shared between threads. Call :meth:`save` to persist it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List] = {}
+        self._changed = False
+        try:
+            with open(path) as f:
+                self._entries = json.load(f)
+        except FileNotFoundError:
+            pass
+        except ValueError:
+            logger.warning("Hash cache %r is corrupted, ignoring it", path)
+
+    def sha256(self, filepath: str) -> str:
+        """Return the SHA-256 hash of the file, from the cache if it is up-to-date."""
+        key = os.path.abspath(filepath)
+        stat = os.stat(key)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return entry[2]
+
+        sha256 = utils.compute_sha256(key)
+        with self._lock:
+            self._entries[key] = [stat.st_size, stat.st_mtime_ns, sha256]
+            self._changed = True
+        return sha256
+
+    def set(self, filepath: str, sha256: str) -> None:
+        """Store the hash of a file that was just written (eg. computed while downloading)."""
+        key = os.path.abspath(filepath)
+        stat = os.stat(key)
+        with self._lock:
+            self._entries[key] = [stat.st_size, stat.st_mtime_ns, sha256]
+            self._changed = True
+
+    def save(self) -> None:
+        """Write the cache file, atomically."""
+        with self._lock:
+            if not self._changed:
+                return
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+            self._changed = False
+
+
+class AttachmentCache(object):
+    """Content-addressed cache of attachments, shared by the clients of a host.
+
+    Files are stored under their SHA-256 hash, hence identical attachments
+    referenced by different records are downloaded once. When ``max_size`` (in bytes)
+    is exceeded, the least recently used files are evicted.
+
+    Files are hard-linked from the cache when possible (copied otherwise), so they
+    should not be modified in place. Since hard links share their modification time,
+    the last use of each file is tracked by an empty ``<hash>.used`` file next to it.
+    """
+
+    def __init__(self, directory: str, max_size: Optional[int] = None):
+        self.directory = directory
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(size for _, size, _ in self._blobs())
+
+    def _path(self, sha256: str) -> str:
+        return os.path.join(self.directory, sha256[:2], sha256)
+
+    def _blobs(self) -> Iterator[Tuple[str, int, float]]:
+        """Yield the path, size and last use of the cached files."""
+        for root, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if filename.endswith((".tmp", ".used")):
+                    continue
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:  # pragma: nocover
+                    # Evicted concurrently.
+                    continue
+                try:
+                    last_use = os.stat(f"{path}.used").st_mtime
+                except FileNotFoundError:
+                    last_use = stat.st_mtime
+                yield path, stat.st_size, last_use
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def get(self, sha256: str, filepath: str) -> bool:
+        """Place the cached file with the specified hash at ``filepath``.
+
+        Returns ``False`` if it is not in the cache.
+        """
+        blob = self._path(sha256)
+        try:
+            _place(blob, filepath)
+        except FileNotFoundError:
+            return False
+        _touch(f"{blob}.used")
+        return True
+
+    def add(self, sha256: str, filepath: str) -> None:
+        """Store the file in the cache, and evict old files if necessary."""
+        blob = self._path(sha256)
+        if os.path.exists(blob):
+            _touch(f"{blob}.used")
+            return
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        _place(filepath, blob)
+        _touch(f"{blob}.used")
+        with self._lock:
+            self._size += os.path.getsize(blob)
+            if self.max_size is not None and self._size > self.max_size:
+                self._evict(self.max_size)
+
+    def _evict(self, max_size: int) -> None:
+        # Look at the actual content, since the cache can be shared by several processes.
+        blobs = sorted(self._blobs(), key=lambda blob: blob[2])
+        total = sum(size for _, size, _ in blobs)
+        for path, size, _ in blobs:
+            if total <= max_size:
+                break
+            logger.debug("Evict %r from attachments cache", path)
+            for evicted in (path, f"{path}.used"):
+                try:
+                    os.remove(evicted)
+                except FileNotFoundError:  # pragma: nocover
+                    pass
+            total -= size
+        self._size = total
+
+
+def _touch(path: str) -> None:
+    """Create the file, or update its modification time."""
+    with open(path, "a"):
+        pass
+    os.utime(path)
+
+
+def _place(src: str, dest: str) -> None:
+    """Atomically hard-link (or copy) ``src`` to ``dest``."""
+    tmp_path = f"{dest}.{uuid.uuid4().hex}.tmp"
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dest)
+
+
+def compute_sha256_many(
+    filepaths: Iterable[str],
+    workers: int = MAX_WORKERS,
+    hash_cache: Optional[HashCache] = None,
+) -> Dict[str, str]:
+    """Compute the SHA-256 hashes of the files in a pool of threads.
+
+    ``hashlib`` releases the GIL while hashing, hence files are hashed in parallel.
+    """
+    filepaths = list(filepaths)
+    compute = hash_cache.sha256 if hash_cache is not None else utils.compute_sha256
+    return dict(zip(filepaths, utils.concurrent_map(compute, filepaths, workers)))
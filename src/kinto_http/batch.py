@@ -2,7 +2,9 @@ import logging
 from collections import defaultdict
 from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
+from kinto_http import instrumentation, tracing
 from kinto_http.exceptions import KintoBatchException, KintoException
+from kinto_http.retry import IDEMPOTENT_METHODS
 
 from . import utils
 
@@ -94,9 +96,21 @@ class BatchSession(object):
         id_request = 0
         for chunk in utils.chunks(requests, self.batch_max_requests):
             kwargs: Dict[str, Any] = dict(
-                method="POST", endpoint=self.endpoints.get("batch"), payload={"requests": chunk}
+                method="POST",
+                endpoint=self.endpoints.get("batch"),
+                payload={"requests": chunk},
             )
-            resp, headers = self.session.request(**kwargs)
+            if all(r["method"] in IDEMPOTENT_METHODS for r in chunk):
+                # The batch can be retried like its subrequests.
+                kwargs["idempotent"] = True
+            instrumentation.emit(
+                self.session,
+                instrumentation.BATCH_CHUNK,
+                url=kwargs["endpoint"],
+                requests=len(chunk),
+            )
+            with tracing.start_span(self.session, "batch.chunk", requests=len(chunk)):
+                resp, headers = self.session.request(**kwargs)
             if self.session.dry_mode:
                 resp.setdefault(
                     "responses", [{"status": 200, "body": {}} for i in range(len(chunk))]
@@ -0,0 +1,117 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from kinto_http import utils
+from kinto_http.exceptions import CircuitOpenException
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class Circuit(object):
+    """Circuit of a server.
+
+    - ``closed``: requests are sent. After ``failures`` consecutive failures, the
+      circuit opens.
+    - ``open``: requests are rejected with :class:`CircuitOpenException`, without
+      being sent. After ``reset_timeout`` seconds, the circuit is half-open.
+    - ``half_open``: up to ``half_open_requests`` probe requests are sent at the same
+      time, the others are rejected. The circuit closes when a probe succeeds, and
+      opens again when a probe fails.
+
+    Methods return the new state of the circuit when it changes, ``None`` otherwise.
+    """
+
+    def __init__(self, failures: int, reset_timeout: float, half_open_requests: int):
+        self.threshold = failures
+        self.reset_timeout = reset_timeout
+        self.half_open_requests = half_open_requests
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Optional[str]:
+        """Let a request through, or raise :class:`CircuitOpenException`."""
+        with self._lock:
+            if self.state == OPEN:
+                retry_after = self.opened_at + self.reset_timeout - time.monotonic()
+                if retry_after > 0:
+                    raise CircuitOpenException(
+                        "Circuit open, retry in {:.1f} seconds".format(retry_after), retry_after
+                    )
+                self.state = HALF_OPEN
+                self._probes = 1
+                return HALF_OPEN
+            if self.state == HALF_OPEN:
+                if self._probes >= self.half_open_requests:
+                    raise CircuitOpenException("Circuit half-open, waiting for probes", 0.0)
+                self._probes += 1
+            return None
+
+    def success(self) -> Optional[str]:
+        with self._lock:
+            if self.state == OPEN:
+                # Sent before the circuit opened.
+                return None
+            self.failures = 0
+            if self.state == HALF_OPEN:
+                self.state = CLOSED
+                self._probes = 0
+                return CLOSED
+            return None
+
+    def failure(self) -> Optional[str]:
+        with self._lock:
+            if self.state == OPEN:
+                return None
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self._probes = 0
+                return OPEN
+            return None
+
+    def release(self) -> None:
+        """Forget a request that neither succeeded nor failed (eg. invalid request)."""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+
+class CircuitBreaker(object):
+    """Stop sending requests to a server that keeps failing, with a separate
+    :class:`Circuit` per server.
+
+    Network errors and 5XX responses are failures. Can be shared by several
+    sessions (eg. ``Client(circuit_breaker=breaker)``).
+
+    .. code-block:: python
+
+        breaker = CircuitBreaker(failures=5, reset_timeout=30)
+    """
+
+    def __init__(
+        self, failures: int = 5, reset_timeout: float = 30.0, half_open_requests: int = 1
+    ):
+        if failures < 1 or half_open_requests < 1:
+            raise ValueError("Failures and half-open requests must be positive")
+        self.failures = failures
+        self.reset_timeout = reset_timeout
+        self.half_open_requests = half_open_requests
+        self._lock = threading.Lock()
+        self._circuits: Dict[str, Circuit] = {}
+
+    def circuit(self, url: str) -> Circuit:
+        key = utils.url_origin(url)
+        with self._lock:
+            if key not in self._circuits:
+                self._circuits[key] = Circuit(
+                    self.failures, self.reset_timeout, self.half_open_requests
+                )
+            return self._circuits[key]
@@ -1,38 +1,86 @@
 import asyncio
+import contextvars
 import functools
+import hashlib
 import inspect
 import json
 import logging
 import mimetypes
 import os
 import random
+import time
 import uuid
 from collections import OrderedDict
 from contextlib import contextmanager
-from typing import Any, Callable, Dict, Iterator, List, Optional
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+)
 from urllib.parse import urljoin
 
-import backoff
-import requests
-
-from kinto_http import utils
+from kinto_http import deadlines, instrumentation, retry, tracing, utils
+from kinto_http.attachments import AttachmentCache, HashCache, compute_sha256_many
 from kinto_http.batch import BatchSession
-from kinto_http.constants import DO_NOT_OVERWRITE
+from kinto_http.circuitbreaker import CircuitBreaker
+from kinto_http.constants import (
+    ATTACHMENT_CHUNK_SIZE,
+    ATTACHMENTS_MANIFEST,
+    DO_NOT_OVERWRITE,
+    MAX_URL_LENGTH,
+    MAX_WORKERS,
+)
 from kinto_http.endpoints import Endpoints
-from kinto_http.exceptions import BucketNotFound, CollectionNotFound, KintoException
+from kinto_http.exceptions import (
+    AttachmentIntegrityError,
+    BucketNotFound,
+    CollectionNotFound,
+    KintoException,
+)
+from kinto_http.hedging import HedgingPolicy
 from kinto_http.patch_type import BasicPatch, PatchType
+from kinto_http.pools import ConnectionPools
+from kinto_http.ratelimit import RateLimiter, prepaid
+from kinto_http.replicas import ReplicaRouter
 from kinto_http.session import Session, create_session
 
 
 logger = logging.getLogger(__name__)
 
-retry_timeout = backoff.on_exception(
-    backoff.expo,
-    (requests.exceptions.Timeout, requests.exceptions.ConnectionError),
-    max_tries=2,
-)
+
+def operation_deadlines(cls):
+    """Run each public method within the ``deadline`` of the client (in seconds),
+    pagination, batches and retries included.
+    """
+    # No requests, or the operation ends outside of the method.
+    excluded = ("clone", "add_listener", "remove_listener", "get_endpoint", "batch")
+
+    def bounded(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            with deadlines.deadline(self.deadline):
+                result = func(self, *args, **kwargs)
+                # The requests of lazy results are sent once this block has exited.
+                return deadlines.bound(result) if inspect.isgenerator(result) else result
+
+        return wrapper
+
+    for name, method in inspect.getmembers(cls, inspect.isfunction):
+        if not (name.startswith("_") or name in excluded):
+            setattr(cls, name, bounded(method))
+    return cls
 
 
+@operation_deadlines
 class Client(object):
     def __init__(
         self,
@@ -48,6 +96,19 @@ class Client(object):
         ignore_batch_4xx: bool = False,
         headers: Optional[Dict[str, str]] = None,
         dry_mode: bool = False,
+        max_url_length: int = MAX_URL_LENGTH,
+        max_workers: int = MAX_WORKERS,
+        tracer: Optional[tracing.Tracer] = None,
+        rate_limit: Union[float, RateLimiter, None] = None,
+        rate_limit_burst: Optional[float] = None,
+        backoff_mode: str = "raise",
+        retry_policy: Optional[retry.RetryPolicy] = None,
+        deadline: Optional[float] = None,
+        circuit_breaker: Union[int, CircuitBreaker, None] = None,
+        hedging: Optional[HedgingPolicy] = None,
+        read_replicas: Union[List[str], ReplicaRouter, None] = None,
+        read_your_writes: Optional[float] = None,
+        connection_pools: Union[bool, ConnectionPools, None] = None,
     ):
         self.endpoints = Endpoints()
 
@@ -66,6 +127,16 @@ class Client(object):
             timeout=timeout,
             headers=headers,
             dry_mode=dry_mode,
+            tracer=tracer,
+            rate_limit=rate_limit,
+            rate_limit_burst=rate_limit_burst,
+            backoff_mode=backoff_mode,
+            retry_policy=retry_policy,
+            circuit_breaker=circuit_breaker,
+            hedging=hedging,
+            read_replicas=read_replicas,
+            read_your_writes=read_your_writes,
+            connection_pools=connection_pools,
         )
         self.session = create_session(**session_kwargs)
         self.bucket_name = bucket
@@ -74,6 +145,10 @@ class Client(object):
         self._server_settings: Optional[Dict[str, Any]] = None
         self._records_timestamp: Dict[str, str] = {}
         self._ignore_batch_4xx = ignore_batch_4xx
+        self.max_url_length = max_url_length
+        self.max_workers = max_workers
+        # Maximum duration of each operation, in seconds (see :func:`deadlines.deadline`).
+        self.deadline = deadline
         # Populated when used as a batch client (see :meth:`batch`).
         self.results: Optional[Callable[[], List[Any]]] = None
 
@@ -85,31 +160,101 @@ class Client(object):
             kwargs.setdefault("session", self.session)
         kwargs.setdefault("bucket", self.bucket_name)
         kwargs.setdefault("collection", self.collection_name)
+        retry_policy = getattr(self.session, "retry_policy", None)
+        if isinstance(retry_policy, retry.RetryPolicy) and "retry_policy" not in kwargs:
+            # Keep the custom policy, with the number of retries and delay overridden.
+            changes = {
+                option: kwargs[name]
+                for name, option in (("retry", "retries"), ("retry_after", "retry_after"))
+                if name in kwargs
+            }
+            kwargs["retry_policy"] = retry_policy.replace(**changes) if changes else retry_policy
         kwargs.setdefault("retry", self.session.nb_retry)
         kwargs.setdefault("retry_after", self.session.retry_after)
+        kwargs.setdefault("max_url_length", self.max_url_length)
+        kwargs.setdefault("max_workers", self.max_workers)
+        kwargs.setdefault("tracer", getattr(self.session, "tracer", None))
+        kwargs.setdefault("rate_limit", getattr(self.session, "rate_limiter", None))
+        kwargs.setdefault("backoff_mode", getattr(self.session, "backoff_mode", "raise"))
+        kwargs.setdefault("deadline", self.deadline)
+        kwargs.setdefault("circuit_breaker", getattr(self.session, "circuit_breaker", None))
+        kwargs.setdefault("hedging", getattr(self.session, "hedging", None))
+        kwargs.setdefault("connection_pools", getattr(self.session, "connection_pools", None))
+        if kwargs.get("server_url", self.session.server_url) == self.session.server_url:
+            # The replicas of another server would not make sense.
+            kwargs.setdefault("read_replicas", getattr(self.session, "read_replicas", None))
         return self.__class__(**kwargs)
 
-    @retry_timeout
+    def add_listener(self, listener: instrumentation.Listener) -> None:
+        """Register a callable that receives the instrumentation events of the
+        requests sent by this client (and its clones sharing the same session).
+        """
+        self.session.add_listener(listener)
+
+    def remove_listener(self, listener: instrumentation.Listener) -> None:
+        self.session.remove_listener(listener)
+
     @contextmanager
     def batch(self, **kwargs: Any) -> Iterator["Client"]:
+        with deadlines.deadline(kwargs.get("deadline", self.deadline)):
+            batch_max_requests = self._batch_max_requests()
+            batch_session = BatchSession(
+                self,
+                batch_max_requests=batch_max_requests,
+                ignore_4xx_errors=self._ignore_batch_4xx,
+            )
+            # The deadline applies to the whole batch, not to the operations of the batch client.
+            batch_client = self.clone(session=batch_session, **{**kwargs, "deadline": None})
+
+            # Set a reference for reading results from the context.
+            batch_client.results = batch_session.results
+
+            yield batch_client
+            with tracing.start_span(
+                self.session,
+                "batch",
+                bucket=kwargs.get("bucket") or self.bucket_name,
+                collection=kwargs.get("collection") or self.collection_name,
+                requests=len(batch_session.requests),
+            ):
+                batch_session.send()
+            batch_session.reset()
+
+    def _batch_max_requests(self) -> int:
         if self._server_settings is None:
             resp, _ = self.session.request("GET", self._get_endpoint("root"))
             self._server_settings = resp["settings"] if not self.session.dry_mode else {}
 
-        batch_max_requests = (
-            self._server_settings["batch_max_requests"] if not self.session.dry_mode else 999999
-        )
-        batch_session = BatchSession(
-            self, batch_max_requests=batch_max_requests, ignore_4xx_errors=self._ignore_batch_4xx
-        )
-        batch_client = self.clone(session=batch_session, **kwargs)
+        return self._server_settings["batch_max_requests"] if not self.session.dry_mode else 999999
 
-        # Set a reference for reading results from the context.
-        batch_client.results = batch_session.results
+    def _bulk(
+        self,
+        operations: Iterable[Tuple[str, Dict[str, Any]]],
+        workers: Optional[int] = None,
+    ) -> Iterator[Dict]:
+        """Run the operations, in batches sent concurrently.
+
+        Each operation is a tuple with the name of a client method and its keyword
+        arguments. Yields the batch subresponse (``status``, ``path``, ``body``,
+        ``headers``) of each operation, in order. 4XX errors are returned as
+        subresponses instead of being raised.
+        """
+        batch_max_requests = self._batch_max_requests()
+
+        def send(chunk: List[Tuple[str, Dict[str, Any]]]) -> List[Dict]:
+            batch_session = BatchSession(
+                self, batch_max_requests=batch_max_requests, ignore_4xx_errors=True
+            )
+            batch_client = self.clone(session=batch_session)
+            for operation, kwargs in chunk:
+                # Use the synchronous methods, even from an `AsyncClient`.
+                getattr(Client, operation)(batch_client, **kwargs)
+            logger.info("Send batch of %s operations" % len(chunk))
+            return [r for resp, _ in batch_session.send() for r in resp["responses"]]
 
-        yield batch_client
-        batch_session.send()
-        batch_session.reset()
+        chunks = utils.ichunks(operations, batch_max_requests)
+        for responses in utils.concurrent_map(send, chunks, workers or self.max_workers):
+            yield from responses
 
     def get_endpoint(
         self,
@@ -140,7 +285,6 @@ class Client(object):
         }
         return self.endpoints.get(name, **kwargs)
 
-    @retry_timeout
     def _paginated(
         self,
         endpoint: str,
@@ -151,6 +295,11 @@ class Client(object):
         **kwargs: Any,
     ) -> List[Any]:
         if records is None:
+            oversized = self._oversized_filter(endpoint, kwargs)
+            if oversized is not None:
+                return self._paginated_chunks(
+                    endpoint, oversized, if_none_match=if_none_match, pages=pages, **kwargs
+                )
             records = OrderedDict()
         headers = {}
         if if_none_match is not None:
@@ -159,15 +308,23 @@ class Client(object):
         if pages is None:
             pages = 1 if "_limit" in kwargs else float("inf")
 
-        record_resp, headers = self.session.request(
-            "get", endpoint, headers=headers, params=kwargs
-        )
+        with tracing.start_span(self.session, "pagination.page", url=endpoint) as span:
+            record_resp, headers = self.session.request(
+                "get", endpoint, headers=headers, params=kwargs
+            )
+            span.set_attribute("records", len(record_resp["data"]) if record_resp else 0)
 
         # Save the current records collection timestamp
         etag = headers.get("ETag", "").strip('"')
         self._records_timestamp[endpoint] = etag
 
         if record_resp:
+            instrumentation.emit(
+                self.session,
+                instrumentation.PAGINATION_PAGE,
+                url=endpoint,
+                records=len(record_resp["data"]),
+            )
             records_tuples = [(r["id"], r) for r in record_resp["data"]]
             records.update(OrderedDict(records_tuples))
 
@@ -180,6 +337,78 @@ class Client(object):
                 )
         return list(records.values())
 
+    def _oversized_filter(self, endpoint: str, params: Dict[str, Any]) -> Optional[str]:
+        """Return the name of the longest ``in_`` or ``exclude_`` list filter
+        if the resulting URL exceeds ``max_url_length``.
+        """
+        filters = [key for key, value in params.items() if utils.is_list_filter(key, value)]
+        if not filters:
+            return None
+        url = utils.urljoin(self.session.server_url or "", endpoint)
+        if utils.url_length(url, params) <= self.max_url_length:
+            return None
+        longest = max(filters, key=lambda key: len(params[key]))
+        return longest if len(params[longest]) > 1 else None
+
+    def _paginated_chunks(
+        self,
+        endpoint: str,
+        field: str,
+        *,
+        if_none_match: Optional[str] = None,
+        pages: Optional[float] = None,
+        **kwargs: Any,
+    ) -> List[Any]:
+        """Split the ``field`` filter values into URL-safe chunks, fetch them
+        concurrently and merge the results.
+
+        Results of ``in_`` chunks are united, whereas results of ``exclude_``
+        chunks are intersected. Chunks are fetched recursively, hence other
+        oversized filters are split too. With ``_limit``, all the pages of each
+        chunk are fetched, then the results are sorted and truncated. The ``exclude_``
+        chunks are always fetched entirely, since the records of the first pages of
+        a chunk may be on the next pages of the others: without ``_limit``, the size
+        of the pages is unknown, hence the results are not truncated to ``pages``.
+        """
+        others = {k: v for k, v in kwargs.items() if k != field}
+        url = utils.urljoin(self.session.server_url or "", endpoint)
+        # Length of `&field=` plus the rest of the URL.
+        budget = self.max_url_length - utils.url_length(url, others) - len(field) - 2
+        chunks = utils.split_values(list(kwargs[field]), budget)
+
+        logger.debug("Split %r filter into %s requests", field, len(chunks))
+
+        limit = None
+        if "_limit" in kwargs and pages != float("inf"):
+            limit = int(kwargs["_limit"]) * int(pages or 1)
+        # The first records of each chunk are not the first ones of the merged results.
+        complete = limit is not None or not field.startswith("in_")
+        chunk_pages = float("inf") if complete else pages
+
+        def fetch(chunk: List[Any]) -> List[Any]:
+            params: Dict[str, Any] = {**others, field: chunk}
+            return self._paginated(
+                endpoint, if_none_match=if_none_match, pages=chunk_pages, **params
+            )
+
+        results = list(utils.concurrent_map(fetch, chunks, self.max_workers))
+
+        merged: "OrderedDict[str, Any]" = OrderedDict()
+        if field.startswith("in_"):
+            for result in results:
+                merged.update((r["id"], r) for r in result)
+        else:
+            common = set.intersection(*[{r["id"] for r in result} for result in results])
+            merged.update((r["id"], r) for r in results[0] if r["id"] in common)
+        records = list(merged.values())
+
+        if "_sort" in kwargs or limit is not None:
+            # Same default order as the server.
+            records = utils.sort_records(records, kwargs.get("_sort", "-last_modified"))
+        if limit is not None:
+            records = records[:limit]
+        return records
+
     def _get_cache_headers(
         self,
         safe: bool,
@@ -217,7 +446,6 @@ class Client(object):
 
         return (id, if_match)
 
-    @retry_timeout
     def _patch_method(
         self,
         endpoint: str,
@@ -291,7 +519,6 @@ class Client(object):
 
     # Server Info
 
-    @retry_timeout
     def server_info(self) -> Dict:
         if self._server_info is not None:
             return self._server_info
@@ -302,7 +529,6 @@ class Client(object):
 
     # Buckets
 
-    @retry_timeout
     def create_bucket(
         self,
         *,
@@ -329,7 +555,6 @@ class Client(object):
         )
         return resp
 
-    @retry_timeout
     def update_bucket(
         self,
         *,
@@ -352,7 +577,6 @@ class Client(object):
         )
         return resp
 
-    @retry_timeout
     def patch_bucket(
         self,
         *,
@@ -392,7 +616,6 @@ class Client(object):
         endpoint = self._get_endpoint("buckets")
         return self._paginated(endpoint, **kwargs)
 
-    @retry_timeout
     def get_bucket(self, *, id: Optional[str] = None, **kwargs: Any) -> Dict:
         endpoint = self._get_endpoint("bucket", bucket=id)
 
@@ -413,7 +636,6 @@ class Client(object):
             raise BucketNotFound(id or self.bucket_name, e)
         return resp
 
-    @retry_timeout
     def delete_bucket(
         self,
         *,
@@ -432,7 +654,6 @@ class Client(object):
         resp, _ = self.session.request("delete", endpoint, headers=headers)
         return resp["data"]
 
-    @retry_timeout
     def delete_buckets(self, *, safe: bool = True, if_match: Optional[Any] = None) -> Dict:
         endpoint = self._get_endpoint("buckets")
         headers = self._get_cache_headers(safe, if_match=if_match)
@@ -448,7 +669,6 @@ class Client(object):
         endpoint = self._get_endpoint("groups", bucket=bucket)
         return self._paginated(endpoint, **kwargs)
 
-    @retry_timeout
     def create_group(
         self,
         *,
@@ -490,7 +710,6 @@ class Client(object):
 
         return resp
 
-    @retry_timeout
     def update_group(
         self,
         *,
@@ -517,7 +736,6 @@ class Client(object):
         )
         return resp
 
-    @retry_timeout
     def patch_group(
         self,
         *,
@@ -554,7 +772,6 @@ class Client(object):
             endpoint, changes, data=data, permissions=permissions, safe=safe, if_match=if_match
         )
 
-    @retry_timeout
     def get_group(self, *, id: str, bucket: Optional[str] = None) -> Dict:
         endpoint = self._get_endpoint("group", bucket=bucket, group=id)
 
@@ -563,7 +780,6 @@ class Client(object):
         resp, _ = self.session.request("get", endpoint)
         return resp
 
-    @retry_timeout
     def delete_group(
         self,
         *,
@@ -585,7 +801,6 @@ class Client(object):
         resp, _ = self.session.request("delete", endpoint, headers=headers)
         return resp["data"]
 
-    @retry_timeout
     def delete_groups(
         self,
         *,
@@ -607,7 +822,6 @@ class Client(object):
         endpoint = self._get_endpoint("collections", bucket=bucket)
         return self._paginated(endpoint, **kwargs)
 
-    @retry_timeout
     def create_collection(
         self,
         *,
@@ -650,7 +864,6 @@ class Client(object):
 
         return resp
 
-    @retry_timeout
     def update_collection(
         self,
         *,
@@ -677,7 +890,6 @@ class Client(object):
         )
         return resp
 
-    @retry_timeout
     def patch_collection(
         self,
         *,
@@ -717,7 +929,6 @@ class Client(object):
             endpoint, changes, data=data, permissions=permissions, safe=safe, if_match=if_match
         )
 
-    @retry_timeout
     def get_collection(
         self,
         *,
@@ -741,7 +952,6 @@ class Client(object):
             raise
         return resp
 
-    @retry_timeout
     def delete_collection(
         self,
         *,
@@ -766,7 +976,6 @@ class Client(object):
         resp, _ = self.session.request("delete", endpoint, headers=headers)
         return resp["data"]
 
-    @retry_timeout
     def delete_collections(
         self,
         *,
@@ -797,7 +1006,7 @@ class Client(object):
 
         return self._records_timestamp[endpoint]
 
-    @retry_timeout
+    @tracing.traced("get_records")
     def get_records(
         self, *, collection: Optional[str] = None, bucket: Optional[str] = None, **kwargs: Any
     ) -> List[Dict]:
@@ -812,7 +1021,6 @@ class Client(object):
 
         return self._paginated_generator(endpoint, **kwargs)
 
-    @retry_timeout
     def get_permissions(
         self,
         exclude_resource_names: Optional[List[str]] = None,
@@ -833,18 +1041,25 @@ class Client(object):
         if if_none_match is not None:
             headers["If-None-Match"] = utils.quote(if_none_match)
 
-        record_resp, headers = self.session.request(
-            "get", endpoint, headers=headers, params=kwargs
-        )
+        with tracing.start_span(self.session, "pagination.page", url=endpoint) as span:
+            record_resp, headers = self.session.request(
+                "get", endpoint, headers=headers, params=kwargs
+            )
+            span.set_attribute("records", len(record_resp["data"]) if record_resp else 0)
 
         if record_resp:
+            instrumentation.emit(
+                self.session,
+                instrumentation.PAGINATION_PAGE,
+                url=endpoint,
+                records=len(record_resp["data"]),
+            )
             yield record_resp
 
         if "next-page" in map(str.lower, headers.keys()):
             next_page = headers["Next-Page"]
             yield from self._paginated_generator(next_page, if_none_match=if_none_match)
 
-    @retry_timeout
     def get_record(
         self,
         *,
@@ -863,7 +1078,6 @@ class Client(object):
         resp, _ = self.session.request("get", endpoint, params=kwargs)
         return resp
 
-    @retry_timeout
     def create_record(
         self,
         *,
@@ -913,7 +1127,6 @@ class Client(object):
 
         return resp
 
-    @retry_timeout
     def update_record(
         self,
         *,
@@ -941,7 +1154,6 @@ class Client(object):
         )
         return resp
 
-    @retry_timeout
     def patch_record(
         self,
         *,
@@ -986,7 +1198,6 @@ class Client(object):
             endpoint, changes, data=data, permissions=permissions, safe=safe, if_match=if_match
         )
 
-    @retry_timeout
     def delete_record(
         self,
         *,
@@ -1012,7 +1223,7 @@ class Client(object):
         resp, _ = self.session.request("delete", endpoint, headers=headers)
         return resp["data"]
 
-    @retry_timeout
+    @tracing.traced("delete_records")
     def delete_records(
         self,
         *,
@@ -1032,13 +1243,143 @@ class Client(object):
         resp, _ = self.session.request("delete", endpoint, headers=headers)
         return resp["data"]
 
-    @retry_timeout
+    def create_records(
+        self,
+        records: Iterable[Dict[str, Any]],
+        *,
+        collection: Optional[str] = None,
+        bucket: Optional[str] = None,
+        safe: bool = True,
+        workers: Optional[int] = None,
+    ) -> Iterator[Dict]:
+        """Create the records, in batches sent concurrently.
+
+        Returns an iterator of the batch subresponses, one per record. Requests
+        are sent as the iterator is consumed.
+        """
+        kwargs = dict(collection=collection, bucket=bucket, safe=safe)
+        return self._bulk(
+            (("create_record", {**kwargs, "data": record}) for record in records), workers=workers
+        )
+
+    def update_records(
+        self,
+        records: Iterable[Dict[str, Any]],
+        *,
+        collection: Optional[str] = None,
+        bucket: Optional[str] = None,
+        safe: bool = True,
+        workers: Optional[int] = None,
+    ) -> Iterator[Dict]:
+        """Update the records, in batches sent concurrently.
+
+        Returns an iterator of the batch subresponses, one per record. Requests
+        are sent as the iterator is consumed.
+        """
+        kwargs = dict(collection=collection, bucket=bucket, safe=safe)
+        return self._bulk(
+            (("update_record", {**kwargs, "data": record}) for record in records), workers=workers
+        )
+
+    def patch_records(
+        self,
+        records: Iterable[Dict[str, Any]],
+        *,
+        collection: Optional[str] = None,
+        bucket: Optional[str] = None,
+        safe: bool = True,
+        workers: Optional[int] = None,
+    ) -> Iterator[Dict]:
+        """Patch the records, in batches sent concurrently.
+
+        Returns an iterator of the batch subresponses, one per record. Requests
+        are sent as the iterator is consumed.
+        """
+        kwargs = dict(collection=collection, bucket=bucket, safe=safe)
+        return self._bulk(
+            (("patch_record", {**kwargs, "data": record}) for record in records), workers=workers
+        )
+
+    def delete_records_by_id(
+        self,
+        ids: Iterable[str],
+        *,
+        collection: Optional[str] = None,
+        bucket: Optional[str] = None,
+        workers: Optional[int] = None,
+    ) -> Iterator[Dict]:
+        """Delete the records with the specified IDs, in batches sent concurrently.
+
+        Returns an iterator of the batch subresponses, one per record. Requests
+        are sent as the iterator is consumed.
+        """
+        kwargs = dict(collection=collection, bucket=bucket)
+        return self._bulk((("delete_record", {**kwargs, "id": id}) for id in ids), workers=workers)
+
+    @tracing.traced("apply_records")
+    def apply_records(
+        self,
+        records: Iterable[Dict[str, Any]],
+        *,
+        collection: Optional[str] = None,
+        bucket: Optional[str] = None,
+        workers: Optional[int] = None,
+    ) -> Dict[str, List]:
+        """Make the collection records match the specified ones.
+
+        The current records are fetched, compared with the desired ones, and the
+        minimal set of creations, updates and deletions is sent in batches. Updates
+        and deletions are conditioned to the ``last_modified`` of the fetched
+        records, hence concurrent changes are reported as errors and left intact.
+
+        Returns a report with the IDs of the ``created``, ``updated`` and ``deleted``
+        records, and the subresponses of the failed operations in ``errors``.
+        """
+        endpoint = self._get_endpoint("records", bucket=bucket, collection=collection)
+        current = (r for page in self._paginated_generator(endpoint) for r in page["data"])
+
+        kwargs = dict(collection=collection, bucket=bucket)
+        operations: List[Tuple[str, Dict[str, Any]]] = []
+        for change in utils.iter_collection_diff(records, current):
+            if change.action == "create":
+                operations.append(("create_record", {**kwargs, "data": change.record}))
+            elif change.action == "update":
+                assert change.record is not None
+                data = {k: v for k, v in change.record.items() if k != "last_modified"}
+                params = {**kwargs, "data": data, "if_match": change.last_modified}
+                operations.append(("update_record", params))
+            else:
+                params = {**kwargs, "id": change.id, "if_match": change.last_modified}
+                operations.append(("delete_record", params))
+
+        report: Dict[str, List] = {"created": [], "updated": [], "deleted": [], "errors": []}
+        if not operations:
+            return report
+
+        actions = {
+            "create_record": "created",
+            "update_record": "updated",
+            "delete_record": "deleted",
+        }
+        results = self._bulk(operations, workers=workers)
+        for (operation, params), response in zip(operations, results):
+            if response["status"] >= 400:
+                report["errors"].append(response)
+            else:
+                record_id = params["id"] if "id" in params else params["data"]["id"]
+                report[actions[operation]].append(record_id)
+        logger.info(
+            "Applied records: %s created, %s updated, %s deleted, %s errors"
+            % tuple(len(v) for v in report.values())
+        )
+        return report
+
+    @tracing.traced("get_history")
     def get_history(self, *, bucket: Optional[str] = None, **kwargs: Any) -> List[Dict]:
         endpoint = self._get_endpoint("history", bucket=bucket)
         logger.info("Get history from bucket %r" % bucket or self.bucket_name)
         return self._paginated(endpoint, **kwargs)
 
-    @retry_timeout
     def purge_history(
         self,
         *,
@@ -1053,7 +1394,7 @@ class Client(object):
         resp, _ = self.session.request("delete", endpoint, headers=headers, params=kwargs)
         return resp["data"]
 
-    @retry_timeout
+    @tracing.traced("download_attachment")
     def download_attachment(self, *args: Any, **kwargs: Any) -> Any:
         server_info = self.server_info()
         return self._download_attachment(server_info, *args, **kwargs)
@@ -1065,8 +1406,38 @@ class Client(object):
         filepath: Optional[str] = None,
         save_metadata: bool = False,
         overwrite: bool = False,
-        chunk_size: int = 8 * 1024,
+        chunk_size: int = ATTACHMENT_CHUNK_SIZE,
+        hash_cache: Optional[HashCache] = None,
+        cache: Optional[AttachmentCache] = None,
     ) -> str:
+        filepath, _ = self._fetch_attachment(
+            server_info,
+            record,
+            filepath=filepath,
+            save_metadata=save_metadata,
+            overwrite=overwrite,
+            chunk_size=chunk_size,
+            hash_cache=hash_cache,
+            cache=cache,
+        )
+        return filepath
+
+    def _fetch_attachment(
+        self,
+        server_info: Dict[str, Any],
+        record: Dict[str, Any],
+        filepath: Optional[str] = None,
+        save_metadata: bool = False,
+        overwrite: bool = False,
+        chunk_size: int = ATTACHMENT_CHUNK_SIZE,
+        hash_cache: Optional[HashCache] = None,
+        cache: Optional[AttachmentCache] = None,
+    ) -> Tuple[str, Optional[int]]:
+        """Download the attachment of the record, unless the local file is up-to-date.
+
+        Returns the path of the file and the number of bytes downloaded, or
+        ``None`` if the download was skipped.
+        """
         if "attachment" not in record:
             raise ValueError("Specified record has no attachment")
 
@@ -1081,11 +1452,15 @@ class Client(object):
 
         if os.path.exists(filepath) and not overwrite:
             local_size = os.path.getsize(filepath)
-            if local_size == record["attachment"]["size"]:
-                local_sha256 = utils.compute_sha256(filepath)
+            if local_size == record["attachment"].get("size") and "hash" in record["attachment"]:
+                local_sha256 = (
+                    hash_cache.sha256(filepath)
+                    if hash_cache is not None
+                    else utils.compute_sha256(filepath)
+                )
                 if local_sha256 == record["attachment"]["hash"]:
                     logger.info("Attachment %r is already up-to-date", filepath)
-                    return filepath
+                    return filepath, None
             logger.info(
                 "Attachment %r exists but is outdated, re-downloading", filepath
             )  # pragma: nocover
@@ -1093,23 +1468,306 @@ class Client(object):
         if folder := os.path.dirname(filepath):
             os.makedirs(folder, exist_ok=True)
 
-        with open(filepath, "wb") as f:
-            # `self.session.request()` parses JSON and is not compatible with `stream=True`.
-            # Using the underlying `Session` object, instead of introducing more
-            # code branches there seems the most reasonable approach.
-            with self.session._session.request("get", url, stream=True) as r:
-                r.raise_for_status()
-                for chunk in r.iter_content(chunk_size=chunk_size):
-                    f.write(chunk)
+        expected_hash = record["attachment"].get("hash")
+        downloaded: Optional[int] = None
+        if cache is not None and expected_hash and cache.get(expected_hash, filepath):
+            logger.info("Attachment %r restored from cache", filepath)
+        else:
+            # An interrupted download is resumed on retry.
+            downloaded, sha256 = retry.call(
+                self.session,
+                "GET",
+                url,
+                lambda: self._stream_attachment(url, record, filepath, chunk_size),
+            )
+            if hash_cache is not None:
+                hash_cache.set(filepath, sha256)
+            if cache is not None:
+                cache.add(sha256, filepath)
 
         if save_metadata:
             metadata_path = filepath + ".meta.json"
             with open(metadata_path, "w") as meta_file:
                 json.dump(record, meta_file)
 
+        return filepath, downloaded
+
+    def _stream_attachment(
+        self, url: str, record: Dict[str, Any], filepath: str, chunk_size: int
+    ) -> Tuple[int, str]:
+        """Download the attachment at ``filepath``, and verify its size and hash.
+
+        Returns the number of bytes downloaded and the SHA-256 hash of the file.
+        """
+        # Download into a temporary file, renamed once complete and verified. If a
+        # previous download was interrupted, resume it with a `Range` request.
+        part_path = filepath + ".part"
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        expected_size = record["attachment"].get("size")
+        if expected_size is not None and offset > expected_size:
+            offset = 0
+
+        h = hashlib.sha256()
+        if offset:
+            utils.hash_file(h, part_path)
+        downloaded = 0
+        while expected_size is None or offset < expected_size:
+            headers = {"Range": f"bytes={offset}-"} if offset else {}
+            request_kwargs: Dict[str, Any] = {"stream": True, "headers": headers}
+            if (timeout := deadlines.timeout(None)) is not None:
+                request_kwargs["timeout"] = timeout
+            # `self.session.request()` parses JSON and is not compatible with `stream=True`.
+            # Using the underlying `Session` object, instead of introducing more
+            # code branches there seems the most reasonable approach.
+            with (
+                tracing.start_span(self.session, "attachment.download", url=url) as span,
+                self.session._session.request("get", url, **request_kwargs) as r,
+            ):
+                if offset and r.status_code in (206, 416):
+                    start, total = utils.parse_content_range(r.headers.get("Content-Range", ""))
+                    if r.status_code == 416 and total in (None, offset):
+                        # Nothing left to download, the partial file is verified below.
+                        break
+                    if r.status_code == 416 or start != offset:
+                        # The partial file does not match the attachment on the server.
+                        logger.info("Restart download of %r", filepath)
+                        os.remove(part_path)
+                        offset = 0
+                        h = hashlib.sha256()
+                        continue
+                r.raise_for_status()
+                if offset and r.status_code != 206:
+                    # The server does not support ranges, and sent the whole file.
+                    offset = 0
+                    h = hashlib.sha256()
+                if offset:
+                    logger.info("Resume download of %r from byte %s", filepath, offset)
+                with open(part_path, "ab" if offset else "wb") as f:
+                    for chunk in r.iter_content(chunk_size=chunk_size):
+                        # The partial file is kept, and resumed by the next download.
+                        deadlines.check(f"the end of the download of {url}")
+                        f.write(chunk)
+                        h.update(chunk)
+                        downloaded += len(chunk)
+                span.set_attribute("bytes", downloaded)
+            break
+
+        # Verify the downloaded content, without reading the file again.
+        expected_hash = record["attachment"].get("hash")
+        actual_size = os.path.getsize(part_path)
+        error = None
+        if expected_size is not None and actual_size != expected_size:
+            error = "Downloaded attachment %r has %s bytes instead of %s" % (
+                filepath,
+                actual_size,
+                expected_size,
+            )
+        elif expected_hash is not None and h.hexdigest() != expected_hash:
+            error = "Downloaded attachment %r does not match the record hash" % filepath
+        if error is not None:
+            os.remove(part_path)
+            if offset:
+                # The partial file may come from a previous version of the attachment:
+                # download it once more from the start.
+                logger.info("Restart download of %r", filepath)
+                restarted, sha256 = self._stream_attachment(url, record, filepath, chunk_size)
+                return downloaded + restarted, sha256
+            raise AttachmentIntegrityError(error)
+        os.replace(part_path, filepath)
+        return downloaded, h.hexdigest()
+
+    @tracing.traced("download_attachments")
+    def download_attachments(
+        self,
+        records: Iterable[Dict[str, Any]],
+        dest_dir: str,
+        *,
+        workers: Optional[int] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """Download the attachments of the records into ``dest_dir``, concurrently.
+
+        Local files that are up-to-date (same size and hash) are skipped. Attachments
+        with the same filename are downloaded one after the other, hence the file of
+        the last record is kept. The other options are the same as
+        :meth:`download_attachment`.
+
+        Returns a report with the ``files`` (``id``, ``filepath``, ``size``,
+        ``elapsed`` and ``skipped`` for each record), and the total ``size`` downloaded,
+        ``elapsed`` time and ``throughput`` (bytes per second).
+        """
+        # Use the synchronous method, even from an `AsyncClient`.
+        server_info = Client.server_info(self)
+        os.makedirs(dest_dir, exist_ok=True)
+
+        def download(group: List[Tuple[int, Dict[str, Any]]]) -> List[Tuple[int, Dict[str, Any]]]:
+            return self._timed_fetch_attachments(server_info, group, dest_dir, **kwargs)
+
+        started = time.monotonic()
+        groups = self._attachment_groups(records)
+        results = utils.concurrent_map(download, groups, workers or self.max_workers)
+        files = [file for _, file in sorted(r for group in results for r in group)]
+        return self._transfers_report("Downloaded", files, time.monotonic() - started)
+
+    @staticmethod
+    def _attachment_groups(
+        records: Iterable[Dict[str, Any]],
+    ) -> List[List[Tuple[int, Dict[str, Any]]]]:
+        """Group the records (and their index) by attachment filename, since their
+        downloads would write the same files concurrently.
+        """
+        groups: Dict[Any, List[Tuple[int, Dict[str, Any]]]] = {}
+        for index, record in enumerate(records):
+            filename = (record.get("attachment") or {}).get("filename")
+            groups.setdefault(filename or index, []).append((index, record))
+        return list(groups.values())
+
+    def _timed_fetch_attachments(
+        self,
+        server_info: Dict[str, Any],
+        group: List[Tuple[int, Dict[str, Any]]],
+        dest_dir: str,
+        **kwargs: Any,
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        return [
+            (index, self._timed_fetch_attachment(server_info, record, dest_dir, **kwargs))
+            for index, record in group
+        ]
+
+    def _timed_fetch_attachment(
+        self, server_info: Dict[str, Any], record: Dict[str, Any], dest_dir: str, **kwargs: Any
+    ) -> Dict[str, Any]:
+        started = time.monotonic()
+        filepath, size = self._fetch_attachment(server_info, record, dest_dir, **kwargs)
+        elapsed = time.monotonic() - started
+        return {
+            "id": record.get("id"),
+            "filepath": filepath,
+            "size": size or 0,
+            "elapsed": elapsed,
+            "skipped": size is None,
+        }
+
+    @staticmethod
+    def _transfers_report(
+        action: str, files: List[Dict[str, Any]], elapsed: float
+    ) -> Dict[str, Any]:
+        size = sum(f["size"] for f in files)
+        throughput = size / elapsed if elapsed > 0 else 0.0
+        logger.info(
+            "%s %s attachments (%s skipped), %s bytes in %.2fs (%.0f bytes/s)"
+            % (action, len(files), sum(f["skipped"] for f in files), size, elapsed, throughput)
+        )
+        return {"files": files, "size": size, "elapsed": elapsed, "throughput": throughput}
+
+    @tracing.traced("sync_attachments")
+    def sync_attachments(
+        self,
+        dest_dir: str,
+        *,
+        bucket: Optional[str] = None,
+        collection: Optional[str] = None,
+        workers: Optional[int] = None,
+        **kwargs: Any,
+    ) -> Dict[str, Any]:
+        """Mirror the attachments of the collection records into ``dest_dir``.
+
+        Files are stored at their ``location``. A manifest of the mirrored files and of
+        the collection timestamp is kept in ``dest_dir``, so that only the records changed
+        or deleted since the last synchronization are fetched, and nothing but a single
+        request is made when the collection did not change. The files of deleted records
+        (or of replaced attachments) are removed.
+
+        The other options are the same as :meth:`download_attachment`.
+
+        Returns a report like :meth:`download_attachments`, with the ``deleted`` files
+        and the collection ``timestamp``.
+        """
+        os.makedirs(dest_dir, exist_ok=True)
+        manifest_path = os.path.join(dest_dir, ATTACHMENTS_MANIFEST)
+        manifest: Dict[str, Any] = {}
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            pass
+        since: Optional[str] = manifest.get("timestamp")
+        entries: Dict[str, Dict[str, Any]] = manifest.get("files") or {}
+
+        endpoint = self._get_endpoint("records", bucket=bucket, collection=collection)
+        params: Dict[str, Any] = {"_since": since} if since else {}
+        changes = self._paginated(endpoint, if_none_match=since, **params)
+        timestamp = self._records_timestamp.get(endpoint) or since
+
+        deleted = []
+        to_download = []
+        for record in changes:
+            entry = entries.get(record["id"])
+            attachment = None if record.get("deleted") else record.get("attachment")
+            if entry is not None:
+                if (
+                    attachment
+                    and attachment["location"] == entry["location"]
+                    and attachment.get("hash") == entry["hash"]
+                ):
+                    # Only the record metadata changed.
+                    continue
+                self._remove_mirrored_file(dest_dir, entry["location"])
+                deleted.append(entry["location"])
+                del entries[record["id"]]
+            if attachment:
+                to_download.append(record)
+
+        started = time.monotonic()
+        files = []
+        synchronized = False
+        try:
+            if to_download:
+                # Use the synchronous method, even from an `AsyncClient`.
+                server_info = Client.server_info(self)
+
+                def download(record: Dict[str, Any]) -> Dict[str, Any]:
+                    filepath = self._mirrored_path(dest_dir, record["attachment"]["location"])
+                    return self._timed_fetch_attachment(server_info, record, filepath, **kwargs)
+
+                results = utils.concurrent_map(download, to_download, workers or self.max_workers)
+                for record, result in zip(to_download, results):
+                    attachment = record["attachment"]
+                    entries[record["id"]] = {
+                        "location": attachment["location"],
+                        "hash": attachment.get("hash"),
+                        "size": attachment.get("size"),
+                    }
+                    files.append(result)
+            synchronized = True
+        finally:
+            # Keep the files downloaded so far, but fetch the same changes again
+            # next time if the synchronization was interrupted.
+            manifest = {"timestamp": timestamp if synchronized else since, "files": entries}
+            tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(manifest, f)
+            os.replace(tmp_path, manifest_path)
+
+        report = self._transfers_report("Downloaded", files, time.monotonic() - started)
+        return {**report, "deleted": deleted, "timestamp": timestamp}
+
+    @staticmethod
+    def _mirrored_path(dest_dir: str, location: str) -> str:
+        filepath = os.path.normpath(os.path.join(dest_dir, location.lstrip("/")))
+        if not filepath.startswith(os.path.normpath(dest_dir) + os.sep):
+            raise ValueError(f"Invalid attachment location {location!r}")
         return filepath
 
-    @retry_timeout
+    def _remove_mirrored_file(self, dest_dir: str, location: str) -> None:
+        filepath = self._mirrored_path(dest_dir, location)
+        logger.info("Remove outdated attachment %r", filepath)
+        try:
+            os.remove(filepath)
+        except FileNotFoundError:
+            pass
+
+    @tracing.traced("add_attachment")
     def add_attachment(
         self,
         id: str,
@@ -1132,12 +1790,72 @@ class Client(object):
                 endpoint,
                 data=json.dumps(data) if data is not None else None,
                 permissions=json.dumps(permissions) if permissions is not None else None,
-                files=[("attachment", (filename, file, mimetype))],
+                # Read the file by chunks while sending, instead of loading it in memory.
+                files=utils.MultipartEncoder([("attachment", (filename, file, mimetype))]),
             )
 
         return resp
 
-    @retry_timeout
+    @tracing.traced("add_attachments")
+    def add_attachments(
+        self,
+        items: Iterable[Dict[str, Any]],
+        *,
+        bucket: Optional[str] = None,
+        collection: Optional[str] = None,
+        workers: Optional[int] = None,
+        hash_cache: Optional[HashCache] = None,
+    ) -> Dict[str, Any]:
+        """Upload the attachments of several records, concurrently.
+
+        Each item contains the ``id`` of the record and the ``filepath`` of the file,
+        and optionally the other parameters of :meth:`add_attachment`. Records whose
+        attachment has the same hash as the local file are skipped.
+
+        Returns a report like :meth:`download_attachments`.
+        """
+        items = list(items)
+        workers = workers or self.max_workers
+        started = time.monotonic()
+
+        remote_hashes = {}
+        if items:
+            endpoint = self._get_endpoint("records", bucket=bucket, collection=collection)
+            records = self._paginated(
+                endpoint, in_id=[item["id"] for item in items], _fields="attachment"
+            )
+            remote_hashes = {r["id"]: (r.get("attachment") or {}).get("hash") for r in records}
+        local_hashes = compute_sha256_many(
+            [item["filepath"] for item in items], workers=workers, hash_cache=hash_cache
+        )
+
+        def upload(item: Dict[str, Any]) -> Dict[str, Any]:
+            started = time.monotonic()
+            skipped = remote_hashes.get(item["id"]) == local_hashes[item["filepath"]]
+            if not skipped:
+                # Use the synchronous method, even from an `AsyncClient`.
+                Client.add_attachment(
+                    self,
+                    id=item["id"],
+                    filepath=item["filepath"],
+                    filename=item.get("filename"),
+                    bucket=item.get("bucket", bucket),
+                    collection=item.get("collection", collection),
+                    data=item.get("data"),
+                    permissions=item.get("permissions"),
+                    mimetype=item.get("mimetype"),
+                )
+            return {
+                "id": item["id"],
+                "filepath": item["filepath"],
+                "size": 0 if skipped else os.path.getsize(item["filepath"]),
+                "elapsed": time.monotonic() - started,
+                "skipped": skipped,
+            }
+
+        files = list(utils.concurrent_map(upload, items, workers))
+        return self._transfers_report("Uploaded", files, time.monotonic() - started)
+
     def remove_attachment(
         self, id: str, bucket: Optional[str] = None, collection: Optional[str] = None
     ) -> Any:
@@ -1145,6 +1863,7 @@ class Client(object):
         resp, _ = self.session.request("delete", endpoint)
         return resp
 
+    @tracing.traced("get_changeset")
     def get_changeset(
         self,
         bucket: Optional[str] = None,
@@ -1243,20 +1962,42 @@ class Client(object):
         return f"<Kinto{self.__class__.__name__} {absolute_endpoint}>"
 
 
-def async_wrap(func):
+def async_wrap(func, prepay=True):
     @functools.wraps(func)
     async def wrapper(*args, **kwargs):
         loop = asyncio.get_event_loop()
         func_partial = functools.partial(func, *args, **kwargs)
-        return await loop.run_in_executor(None, func_partial)
+        session = getattr(args[0], "session", None) if args else None
+        limiter = getattr(session, "rate_limiter", None)
+        server_url = getattr(session, "server_url", None)
+        if prepay and isinstance(limiter, RateLimiter) and server_url:
+            # Wait for the first request on the event loop, rather than in the executor.
+            await limiter.acquire_async(server_url)
+            func_partial = prepaid(server_url, func_partial, limiter)
+        # Keep the context (eg. the current deadline) in the executor.
+        return await loop.run_in_executor(None, contextvars.copy_context().run, func_partial)
 
     return wrapper
 
 
 def async_client(cls):
+    # Either synchronous, or asynchronous on their own.
+    excluded = (
+        "clone",
+        "add_listener",
+        "remove_listener",
+        "download_attachment",
+        "download_attachments",
+        "create_records",
+        "update_records",
+        "patch_records",
+        "delete_records_by_id",
+    )
+    # Send no request when called (their results are lazy, if any).
+    local = ("batch", "get_endpoint", "get_paginated_records")
     for name, method in inspect.getmembers(cls, inspect.isfunction):
-        if not (name.startswith("_") or name in ("clone", "download_attachment")):
-            setattr(cls, name, async_wrap(method))
+        if not (name.startswith("_") or name in excluded):
+            setattr(cls, name, async_wrap(method, prepay=name not in local))
     return cls
 
 
@@ -1271,12 +2012,100 @@ class AsyncClient(Client):
     patch `_create_if_not_exists` and `_delete_if_exists` below that reason.
     """
 
-    @retry_timeout
     async def download_attachment(self, *args: Any, **kwargs: Any) -> Any:
-        # `server_info` is wrapped by `async_client` decorator so it is awaitable
-        # at runtime even though ty cannot infer this through the dynamic wrapping.
-        server_info = await self.server_info()  # ty: ignore[invalid-await]
-        return super()._download_attachment(server_info, *args, **kwargs)
+        with deadlines.deadline(self.deadline):
+            # `server_info` is wrapped by `async_client` decorator so it is awaitable
+            # at runtime even though ty cannot infer this through the dynamic wrapping.
+            server_info = await self.server_info()  # ty: ignore[invalid-await]
+            # The transfer, the disk writes and the hashing run in the executor, in order
+            # not to block the event loop.
+            loop = asyncio.get_event_loop()
+            func_partial = functools.partial(
+                super()._download_attachment, server_info, *args, **kwargs
+            )
+            return await loop.run_in_executor(None, contextvars.copy_context().run, func_partial)
+
+    async def download_attachments(
+        self,
+        records: Iterable[Dict[str, Any]],
+        dest_dir: str,
+        *,
+        workers: Optional[int] = None,
+        **kwargs: Any,
+    ) -> Dict[str, Any]:
+        """Download the attachments of the records into ``dest_dir``, concurrently.
+
+        At most ``workers`` downloads run at the same time, each one in the executor.
+        See :meth:`Client.download_attachments`.
+        """
+        with deadlines.deadline(self.deadline):
+            server_info = await self.server_info()  # ty: ignore[invalid-await]
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(
+                None, functools.partial(os.makedirs, dest_dir, exist_ok=True)
+            )
+            semaphore = asyncio.Semaphore(workers or self.max_workers)
+
+            async def download(
+                group: List[Tuple[int, Dict[str, Any]]],
+            ) -> List[Tuple[int, Dict[str, Any]]]:
+                async with semaphore:
+                    func_partial = functools.partial(
+                        self._timed_fetch_attachments, server_info, group, dest_dir, **kwargs
+                    )
+                    return await loop.run_in_executor(
+                        None, contextvars.copy_context().run, func_partial
+                    )
+
+            started = time.monotonic()
+            groups = self._attachment_groups(records)
+            results = await asyncio.gather(*(download(group) for group in groups))
+        files = [file for _, file in sorted(r for group in results for r in group)]
+        return self._transfers_report("Downloaded", files, time.monotonic() - started)
+
+    def create_records(  # ty: ignore[invalid-method-override]
+        self, *args: Any, **kwargs: Any
+    ) -> AsyncIterator[Dict]:
+        """See :meth:`Client.create_records`. Returns an asynchronous iterator."""
+        return self._iterate_in_executor(super().create_records, *args, **kwargs)
+
+    def update_records(  # ty: ignore[invalid-method-override]
+        self, *args: Any, **kwargs: Any
+    ) -> AsyncIterator[Dict]:
+        """See :meth:`Client.update_records`. Returns an asynchronous iterator."""
+        return self._iterate_in_executor(super().update_records, *args, **kwargs)
+
+    def patch_records(  # ty: ignore[invalid-method-override]
+        self, *args: Any, **kwargs: Any
+    ) -> AsyncIterator[Dict]:
+        """See :meth:`Client.patch_records`. Returns an asynchronous iterator."""
+        return self._iterate_in_executor(super().patch_records, *args, **kwargs)
+
+    def delete_records_by_id(  # ty: ignore[invalid-method-override]
+        self, *args: Any, **kwargs: Any
+    ) -> AsyncIterator[Dict]:
+        """See :meth:`Client.delete_records_by_id`. Returns an asynchronous iterator."""
+        return self._iterate_in_executor(super().delete_records_by_id, *args, **kwargs)
+
+    async def _iterate_in_executor(
+        self, func: Callable[..., Iterator[Any]], *args: Any, **kwargs: Any
+    ) -> AsyncIterator[Any]:
+        # The batches are sent as the results are consumed: iterate in the executor,
+        # in order not to block the event loop.
+        loop = asyncio.get_event_loop()
+        # Keep the context (eg. the current deadline) in the executor.
+        context = contextvars.copy_context()
+        func_partial = functools.partial(func, *args, **kwargs)
+        results = await loop.run_in_executor(None, context.run, func_partial)
+        done = object()
+        try:
+            while (
+                result := await loop.run_in_executor(None, context.run, next, results, done)
+            ) is not done:
+                yield result
+        finally:
+            # Waits for the batches in flight.
+            await loop.run_in_executor(None, context.run, cast(Generator, results).close)
 
     #  have to redefine this because of the use of getattr. We want to make sure
     #  that we get the synchronous version of the create_ or get_ method
@@ -19,6 +19,14 @@ OBJECTS_PERMISSIONS = {
 ID_FIELD = "id"
 DO_NOT_OVERWRITE = {"If-None-Match": "*"}
 VALID_SLUG_REGEXP = re.compile(r"^[a-zA-Z0-9][a-zA-Z0-9_-]*$")
+# Many proxies and servers reject URLs longer than a few kilobytes.
+MAX_URL_LENGTH = 4096
+# Number of concurrent requests when an operation is split into several ones.
+MAX_WORKERS = 4
+# Size of the chunks read when streaming attachments.
+ATTACHMENT_CHUNK_SIZE = 64 * 1024
+# Index of the files mirrored by `Client.sync_attachments()`.
+ATTACHMENTS_MANIFEST = ".manifest.json"
 SERVER_URL = "http://localhost:8888/v1"
 DEFAULT_AUTH = ("user", "p4ssw0rd")
 ALL_PARAMETERS = [
@@ -0,0 +1,103 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Any, Generator, Iterator, Optional, TypeVar
+
+from kinto_http.exceptions import DeadlineExceeded
+
+
+T = TypeVar("T")
+
+# Expiration (``time.monotonic()``) of the innermost deadline. Context variables
+# are inherited by the threads of ``utils.concurrent_map()`` and by the executor
+# of the ``AsyncClient``.
+_expires: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "kinto_http_deadline", default=None
+)
+
+
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[None]:
+    """Limit the time spent by the enclosed operations, retries and waits included.
+
+    The timeout of each request is reduced to the remaining time, and
+    :class:`kinto_http.DeadlineExceeded` is raised once the time is spent.
+    Nested deadlines cannot extend the enclosing one.
+
+    .. code-block:: python
+
+        with deadline(5):
+            records = client.get_records()
+    """
+    if seconds is None:
+        yield
+        return
+    expires = time.monotonic() + seconds
+    current = _expires.get()
+    token = _expires.set(expires if current is None else min(current, expires))
+    try:
+        yield
+    finally:
+        _expires.reset(token)
+
+
+def bound(generator: Generator[T, None, None]) -> Iterator[T]:
+    """Keep the current deadline for the iterations of a lazy ``generator``, which
+    run once the enclosing :func:`deadline` block has exited.
+    """
+    expires = _expires.get()
+    if expires is None:
+        return generator
+    return _bound(generator, expires)
+
+
+def _bound(generator: Generator[T, None, None], expires: float) -> Iterator[T]:
+    try:
+        while True:
+            current = _expires.get()
+            token = _expires.set(expires if current is None else min(current, expires))
+            try:
+                item = next(generator)
+            except StopIteration:
+                return
+            finally:
+                _expires.reset(token)
+            yield item
+    finally:
+        generator.close()
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or ``None`` without deadline."""
+    expires = _expires.get()
+    return None if expires is None else expires - time.monotonic()
+
+
+def check(action: str) -> None:
+    """Raise :class:`kinto_http.DeadlineExceeded` if the deadline has expired."""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"Deadline exceeded before {action}")
+
+
+def timeout(configured: Any) -> Any:
+    """Reduce the ``timeout`` argument of ``requests`` (``None``, a number of seconds
+    or a ``(connect, read)`` tuple) to the remaining time.
+    """
+    left = remaining()
+    if left is None:
+        return configured
+    left = max(left, 0.001)
+    if configured is None or configured is False:
+        return left
+    if isinstance(configured, tuple):
+        return tuple(left if t is None else min(t, left) for t in configured)
+    return min(configured, left)
+
+
+def sleep(seconds: float, action: str) -> None:
+    """Sleep, unless it would exceed the deadline: fail right away instead."""
+    left = remaining()
+    if left is not None and seconds >= left:
+        raise DeadlineExceeded(f"Deadline exceeded before {action} (in {seconds:.2f}s)")
+    time.sleep(seconds)
@@ -32,6 +32,10 @@ class CollectionNotFound(KintoException):
     pass
 
 
+class AttachmentIntegrityError(KintoException):
+    pass
+
+
 class BackoffException(KintoException):
     def __init__(
         self, message: Optional[str], backoff: int, exception: Optional[Exception] = None
@@ -40,6 +44,18 @@ class BackoffException(KintoException):
         super().__init__(message, exception)
 
 
+class CircuitOpenException(KintoException):
+    def __init__(
+        self, message: Optional[str], retry_after: float, exception: Optional[Exception] = None
+    ):
+        self.retry_after = retry_after
+        super().__init__(message, exception)
+
+
+class DeadlineExceeded(KintoException):
+    pass
+
+
 class KintoBatchException(KintoException):
     def __init__(self, exceptions: List[Exception], results: List[Tuple[Any, Any]]):
         self.message = "\n".join([str(e) for e in exceptions])
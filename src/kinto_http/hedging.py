@@ -0,0 +1,148 @@
+import contextvars
+import math
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Deque, NamedTuple, Optional, Tuple
+
+
+class Hedge(NamedTuple):
+    #: Seconds waited before sending the hedged request.
+    delay: float
+    #: Whether the response of the hedged request was used.
+    won: bool
+
+
+class HedgingPolicy(object):
+    """Send a second identical ``GET`` request when the response of the first one
+    is late, and use the first response received.
+
+    - The delay is the ``percentile`` of the latencies of the last ``window``
+      requests (once ``min_samples`` were measured), or the fixed ``delay``.
+    - The hedged request is sent to ``alternate_url`` (eg. another node of the
+      cluster), instead of the server URL of the session, if specified.
+    - At most ``max_ratio`` of the requests are hedged (eg. ``0.05`` for 5% extra load).
+
+    Requests are sent from a pool of ``workers`` threads. A policy can be shared by
+    several clients:
+
+    .. code-block:: python
+
+        hedging = HedgingPolicy(percentile=95, max_ratio=0.05)
+        client = Client(server_url="http://localhost:8888/v1", hedging=hedging)
+        ...
+        print(hedging.hedges, hedging.wins)
+    """
+
+    def __init__(
+        self,
+        *,
+        percentile: float = 95.0,
+        delay: Optional[float] = None,
+        alternate_url: Optional[str] = None,
+        max_ratio: float = 0.1,
+        window: int = 1000,
+        min_samples: int = 20,
+        workers: int = 32,
+    ):
+        if not 0 < percentile <= 100:
+            raise ValueError("Percentile must be between 0 and 100")
+        self.percentile = percentile
+        self.fixed_delay = delay
+        self.alternate_url = alternate_url
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.workers = workers
+        #: Number of requests, of hedged requests, and of hedged requests that won.
+        self.requests = 0
+        self.hedges = 0
+        self.wins = 0
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._delay: Optional[float] = None
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait for a response before hedging, or ``None`` not to hedge."""
+        return self._delay if self._delay is not None else self.fixed_delay
+
+    def record(self, latency: float) -> None:
+        """Measure the latency of a response."""
+        with self._lock:
+            self._latencies.append(latency)
+            count = len(self._latencies)
+            # Sorting is cheap, but not at each request.
+            if count >= self.min_samples and (self._delay is None or count % 10 == 0):
+                values = sorted(self._latencies)
+                self._delay = values[max(0, math.ceil(self.percentile / 100 * count) - 1)]
+
+    def allow(self) -> bool:
+        """Take a hedge, unless it would exceed the maximum extra load."""
+        with self._lock:
+            if self.hedges + 1 > self.max_ratio * self.requests:
+                return False
+            self.hedges += 1
+            return True
+
+    def hedge_url(self, url: str, server_url: Optional[str]) -> str:
+        """URL of the hedged request of a request to ``url``."""
+        if self.alternate_url and server_url and url.startswith(server_url):
+            return self.alternate_url.rstrip("/") + url[len(server_url.rstrip("/")) :]
+        return url
+
+    def call(
+        self,
+        send: Callable[[str], Any],
+        url: str,
+        hedge_url: str,
+        send_hedge: Optional[Callable[[str], Any]] = None,
+    ) -> Tuple[Any, Optional[Hedge]]:
+        """Call ``send(url)``, and ``send(hedge_url)`` if the first call is late.
+
+        The hedged request is sent with ``send_hedge`` instead, if specified.
+        Returns the first successful result, and a :class:`Hedge` if a hedged
+        request was sent (``None`` otherwise).
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="kinto-hedging"
+                )
+            executor = self._executor
+            self.requests += 1
+        # Run in a copy of the current context, eg. to keep the deadline.
+        primary = executor.submit(contextvars.copy_context().run, send, url)
+        delay = self.delay()
+        if delay is None:
+            return primary.result(), None
+        try:
+            return primary.result(timeout=delay), None
+        except FutureTimeoutError:
+            pass
+        if not self.allow():
+            return primary.result(), None
+        hedge = executor.submit(contextvars.copy_context().run, send_hedge or send, hedge_url)
+
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            # Prefer the primary response if both arrived.
+            for future in sorted(done, key=lambda f: f is hedge):
+                error = future.exception()
+                if error is None:
+                    # The other response is closed once received.
+                    (primary if future is hedge else hedge).add_done_callback(_close_response)
+                    won = future is hedge
+                    if won:
+                        with self._lock:
+                            self.wins += 1
+                    return future.result(), Hedge(delay, won)
+        assert error is not None
+        raise error
+
+
+def _close_response(future: Future) -> None:
+    if future.exception() is None and hasattr(future.result(), "close"):
+        future.result().close()
@@ -0,0 +1,209 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Names of the emitted events.
+REQUEST_START = "request.start"
+REQUEST_END = "request.end"
+REQUEST_RETRY = "request.retry"
+RETRY_GIVE_UP = "retry.give_up"
+BACKOFF = "backoff"
+BACKOFF_WAIT = "backoff.wait"
+RATE_LIMIT = "rate_limit"
+CIRCUIT_STATE = "circuit.state"
+CIRCUIT_REJECT = "circuit.reject"
+HEDGE = "hedge"
+REPLICA_FAILOVER = "replica.failover"
+BATCH_CHUNK = "batch.chunk"
+PAGINATION_PAGE = "pagination.page"
+
+
+class Event(NamedTuple):
+    """An instrumentation event.
+
+    The attributes depend on the event:
+
+    - ``request.start``: ``method``, ``url``
+    - ``request.end``: ``method``, ``url``, ``status`` (``None`` on network errors),
+      ``error``, ``duration``, ``serialization``, ``network`` and ``parse`` (seconds),
+      ``request_bytes``, ``response_bytes``
+    - ``request.retry``: ``method``, ``url``, ``status`` (``None`` on network errors),
+      ``error``, ``attempt``, ``sleep`` (seconds)
+    - ``retry.give_up``: ``method``, ``url``, ``status``, ``error``, ``attempts`` (retries
+      done), ``reason`` (``exhausted``, ``budget``, ``deadline`` or ``not_idempotent``)
+    - ``backoff``: ``url``, ``seconds``
+    - ``backoff.wait``: ``url``, ``seconds`` (waited before sending the request)
+    - ``rate_limit``: ``url``, ``seconds`` (waited before sending the request)
+    - ``circuit.state``: ``url`` (of the server), ``state`` (``open``, ``half_open`` or
+      ``closed``), ``failures`` (consecutive)
+    - ``circuit.reject``: ``url``, ``retry_after`` (seconds before the next probe)
+    - ``hedge``: ``url``, ``delay`` (seconds before the hedged request), ``won``
+      (whether the response of the hedged request was used)
+    - ``replica.failover``: ``url`` (of the replica), ``status`` (``None`` on network
+      errors), ``error``
+    - ``batch.chunk``: ``url``, ``requests`` (size of the chunk)
+    - ``pagination.page``: ``url``, ``records`` (in the page)
+    """
+
+    name: str
+    attributes: Dict[str, Any]
+
+
+Listener = Callable[[Event], None]
+
+
+class Instrumentation(object):
+    """Dispatch events to the registered listeners.
+
+    Emitters should check :attr:`listeners` before building the events, so that
+    instrumentation costs nothing when no listener is registered.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # Replaced (never mutated) so that it can be iterated without locking.
+        self.listeners: List[Listener] = []
+
+    def add_listener(self, listener: Listener) -> None:
+        with self._lock:
+            self.listeners = [*self.listeners, listener]
+
+    def remove_listener(self, listener: Listener) -> None:
+        with self._lock:
+            self.listeners = [existing for existing in self.listeners if existing != listener]
+
+    def emit(self, name: str, **attributes: Any) -> None:
+        event = Event(name, attributes)
+        for listener in self.listeners:
+            try:
+                listener(event)
+            except Exception:
+                # Never break requests because of a listener.
+                logger.exception("Instrumentation listener %r failed", listener)
+
+
+class PrometheusListener(object):
+    """Export the events as Prometheus counters and histograms.
+
+    Requires the ``prometheus_client`` package.
+
+    .. code-block:: python
+
+        client.add_listener(PrometheusListener())
+    """
+
+    def __init__(self, registry: Any = None, namespace: str = "kinto_http"):
+        import prometheus_client
+
+        if registry is None:
+            registry = prometheus_client.REGISTRY
+        options: Dict[str, Any] = dict(namespace=namespace, registry=registry)
+
+        self.requests = prometheus_client.Counter(
+            "requests", "HTTP requests sent", ["method", "status"], **options
+        )
+        self.request_duration = prometheus_client.Histogram(
+            "request_duration_seconds", "Duration of HTTP requests", ["method"], **options
+        )
+        self.request_phase_duration = prometheus_client.Histogram(
+            "request_phase_duration_seconds",
+            "Duration of the serialization, network and parse phases of HTTP requests",
+            ["phase"],
+            **options,
+        )
+        self.request_bytes = prometheus_client.Counter(
+            "request_bytes", "Size of the request bodies", **options
+        )
+        self.response_bytes = prometheus_client.Counter(
+            "response_bytes", "Size of the response bodies", **options
+        )
+        self.retries = prometheus_client.Counter(
+            "retries", "Retried HTTP requests", ["status"], **options
+        )
+        self.retry_give_ups = prometheus_client.Counter(
+            "retry_give_ups", "Failed requests not retried", ["reason"], **options
+        )
+        self.retry_sleep = prometheus_client.Counter(
+            "retry_sleep_seconds", "Time spent waiting before retries", **options
+        )
+        self.backoffs = prometheus_client.Counter(
+            "backoffs", "Backoff headers received from the server", **options
+        )
+        self.backoff_wait = prometheus_client.Counter(
+            "backoff_wait_seconds", "Time spent waiting for the backoff delays", **options
+        )
+        self.rate_limit_wait = prometheus_client.Counter(
+            "rate_limit_wait_seconds", "Time spent waiting for the rate limiter", **options
+        )
+        self.circuit_transitions = prometheus_client.Counter(
+            "circuit_transitions", "State changes of the circuit breakers", ["state"], **options
+        )
+        self.circuit_rejections = prometheus_client.Counter(
+            "circuit_rejections", "Requests rejected by open circuits", **options
+        )
+        self.hedges = prometheus_client.Counter(
+            "hedges", "Hedged GET requests", ["won"], **options
+        )
+        self.replica_failovers = prometheus_client.Counter(
+            "replica_failovers", "Reads sent again after a read replica failed", **options
+        )
+        self.batch_chunks = prometheus_client.Counter(
+            "batch_chunks", "Batch requests sent", **options
+        )
+        self.batch_chunk_size = prometheus_client.Histogram(
+            "batch_chunk_size",
+            "Number of requests in batch chunks",
+            buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000),
+            **options,
+        )
+        self.pages = prometheus_client.Counter("pages", "Pages of paginated lists", **options)
+
+    def __call__(self, event: Event) -> None:
+        attributes = event.attributes
+        if event.name == REQUEST_END:
+            status = attributes["status"]
+            self.requests.labels(
+                attributes["method"].upper(), "error" if status is None else str(status)
+            ).inc()
+            self.request_duration.labels(attributes["method"].upper()).observe(
+                attributes["duration"]
+            )
+            for phase in ("serialization", "network", "parse"):
+                self.request_phase_duration.labels(phase).observe(attributes[phase])
+            self.request_bytes.inc(attributes["request_bytes"])
+            self.response_bytes.inc(attributes["response_bytes"])
+        elif event.name == REQUEST_RETRY:
+            status = attributes["status"]
+            self.retries.labels("error" if status is None else str(status)).inc()
+            self.retry_sleep.inc(attributes["sleep"])
+        elif event.name == RETRY_GIVE_UP:
+            self.retry_give_ups.labels(attributes["reason"]).inc()
+        elif event.name == BACKOFF:
+            self.backoffs.inc()
+        elif event.name == BACKOFF_WAIT:
+            self.backoff_wait.inc(attributes["seconds"])
+        elif event.name == RATE_LIMIT:
+            self.rate_limit_wait.inc(attributes["seconds"])
+        elif event.name == CIRCUIT_STATE:
+            self.circuit_transitions.labels(attributes["state"]).inc()
+        elif event.name == CIRCUIT_REJECT:
+            self.circuit_rejections.inc()
+        elif event.name == HEDGE:
+            self.hedges.labels(str(attributes["won"]).lower()).inc()
+        elif event.name == REPLICA_FAILOVER:
+            self.replica_failovers.inc()
+        elif event.name == BATCH_CHUNK:
+            self.batch_chunks.inc()
+            self.batch_chunk_size.observe(attributes["requests"])
+        elif event.name == PAGINATION_PAGE:
+            self.pages.inc()
+
+
+def emit(session: Any, name: str, **attributes: Any) -> None:
+    """Emit an event on the instrumentation of the session, if any listener is registered."""
+    instrumentation: Optional[Instrumentation] = getattr(session, "instrumentation", None)
+    if instrumentation is not None and instrumentation.listeners:
+        instrumentation.emit(name, **attributes)
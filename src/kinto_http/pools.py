@@ -0,0 +1,166 @@
+import threading
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from kinto_http import utils
+
+
+class _ClosingPool(object):
+    """Close the connections once released, instead of keeping them for the next
+    requests: the server may close them at any time after the response.
+    """
+
+    def _put_conn(self, conn: Any) -> None:
+        if conn is not None:
+            conn.close()
+        super()._put_conn(conn)  # ty: ignore[unresolved-attribute]
+
+
+class _ClosingHTTPConnectionPool(_ClosingPool, HTTPConnectionPool):
+    pass
+
+
+class _ClosingHTTPSConnectionPool(_ClosingPool, HTTPSConnectionPool):
+    pass
+
+
+class ConnectionPools(object):
+    """HTTP connection pools, shared by the threads of the sessions that use them.
+
+    - ``pool_connections`` is the number of servers (hosts) whose pool is kept.
+    - ``pool_maxsize`` is the number of connections kept open per server.
+    - With ``pool_block``, the requests wait for a free connection when
+      ``pool_maxsize`` are in use, instead of opening extra connections that are
+      closed after use.
+    - Without ``keep_alive``, the connections are closed after each response.
+
+    The pools can be shared by several clients:
+
+    .. code-block:: python
+
+        pools = ConnectionPools(pool_maxsize=20, pool_block=True)
+        client = Client(server_url="http://localhost:8888/v1", connection_pools=pools)
+        ...
+        print(pools.stats())
+    """
+
+    def __init__(
+        self,
+        *,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        keep_alive: bool = True,
+    ):
+        if pool_connections < 1 or pool_maxsize < 1:
+            raise ValueError("Pool sizes must be positive")
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        # The urllib3 pools are thread-safe, unlike the cookie jar of requests.Session:
+        # the sessions of each thread mount the same adapter.
+        self.adapter = HTTPAdapter(
+            pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block
+        )
+        if not keep_alive:
+            pool_classes: Dict[str, Any] = {
+                "http": _ClosingHTTPConnectionPool,
+                "https": _ClosingHTTPSConnectionPool,
+            }
+            self.adapter.poolmanager.pool_classes_by_scheme = pool_classes
+
+    def mount(self, session: requests.Session) -> None:
+        """Send the requests of this ``requests.Session`` through the pools."""
+        session.mount("http://", self.adapter)
+        session.mount("https://", self.adapter)
+        if not self.keep_alive:
+            session.headers["Connection"] = "close"
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Statistics of the pool of each server, by origin (eg. ``https://host:443``).
+
+        - ``maxsize``: connections kept open;
+        - ``in_use``: connections currently used by requests;
+        - ``idle``: open connections waiting in the pool;
+        - ``connections``: connections created since the pool was created (not
+          counting the reconnections of closed ones);
+        - ``requests``: requests sent since the pool was created.
+        """
+        poolmanager = self.adapter.poolmanager
+        stats = {}
+        for key in poolmanager.pools.keys():
+            pool = poolmanager.pools.get(key)
+            if pool is None or pool.pool is None:  # Evicted or closed meanwhile.
+                continue
+            # Free slots of the queue are ``None``, taken ones are missing.
+            with pool.pool.mutex:
+                queued = list(pool.pool.queue)
+            stats[f"{key.key_scheme}://{key.key_host}:{key.key_port}"] = {
+                "maxsize": pool.pool.maxsize,
+                "in_use": pool.pool.maxsize - len(queued),
+                "idle": sum(1 for conn in queued if conn and getattr(conn, "is_connected", True)),
+                "connections": pool.num_connections,
+                "requests": pool.num_requests,
+            }
+        return stats
+
+    def close(self) -> None:
+        """Close the open connections."""
+        self.adapter.close()
+
+
+class PoolRegistry(object):
+    """Process-wide connection pools per server, shared by the sessions created
+    with ``connection_pools=True``.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pools: Dict[str, ConnectionPools] = {}
+
+    def configure(self, server_url: str, **settings: Any) -> ConnectionPools:
+        """Set the pools of the server of this URL (see :class:`ConnectionPools`).
+
+        The sessions that already use the previous pools keep them.
+        """
+        pools = ConnectionPools(**settings)
+        with self._lock:
+            self._pools[utils.url_origin(server_url)] = pools
+        return pools
+
+    def get(self, server_url: str) -> ConnectionPools:
+        """Return the pools of the server of this URL, with the default settings
+        unless configured.
+        """
+        key = utils.url_origin(server_url)
+        with self._lock:
+            pools = self._pools.get(key)
+            if pools is None:
+                pools = self._pools[key] = ConnectionPools()
+            return pools
+
+    def stats(self) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """Statistics of the pools (see :meth:`ConnectionPools.stats`), by server."""
+        with self._lock:
+            pools = dict(self._pools)
+        return {server: p.stats() for server, p in pools.items()}
+
+    def clear(self, server_url: Optional[str] = None) -> None:
+        """Close and forget the pools of a server, or of all of them."""
+        with self._lock:
+            if server_url is None:
+                removed = list(self._pools.values())
+                self._pools = {}
+            else:
+                pools = self._pools.pop(utils.url_origin(server_url), None)
+                removed = [pools] if pools is not None else []
+        for pools in removed:
+            pools.close()
+
+
+#: The process-wide registry.
+POOLS = PoolRegistry()
@@ -0,0 +1,113 @@
+import asyncio
+import contextvars
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from kinto_http import deadlines, utils
+
+
+# Server whose token was already acquired by the caller, eg. by the event loop
+# before running a request in the executor (see :func:`prepaid`).
+_prepaid: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "kinto_http_rate_limit_prepaid", default=None
+)
+
+
+class TokenBucket(object):
+    """Allow ``rate`` requests per second on average, and bursts of ``burst`` requests.
+
+    Tokens are reserved in order: when the bucket is empty, each caller is given
+    the delay until its own token is available, hence waiting callers are not
+    woken up all at once.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("Rate must be positive")
+        self.rate = rate
+        self.burst = max(1.0, rate if burst is None else burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token, and return the delay (in seconds) before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def refund(self) -> None:
+        """Give back a token that was taken but not used."""
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+
+class RateLimiter(object):
+    """Rate limit the requests, with a separate :class:`TokenBucket` per server.
+
+    Can be shared by several sessions (eg. ``Client(rate_limit=limiter)``).
+
+    .. code-block:: python
+
+        limiter = RateLimiter(rate=50, burst=10)
+        limiter.acquire("https://kinto.example.com/v1/buckets")  # Sleeps if needed.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        # Fail early on invalid values.
+        TokenBucket(rate, burst)
+        self.rate = rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def bucket(self, url: str) -> TokenBucket:
+        key = utils.url_origin(url)
+        with self._lock:
+            if key not in self._buckets:
+                self._buckets[key] = TokenBucket(self.rate, self.burst)
+            return self._buckets[key]
+
+    def acquire(self, url: str) -> float:
+        """Wait until a request can be sent to this URL, and return the time waited."""
+        if _prepaid.get() == utils.url_origin(url):
+            _prepaid.set(None)
+            return 0.0
+        delay = self.bucket(url).reserve()
+        if delay > 0:
+            deadlines.sleep(delay, "the rate limit")
+        return delay
+
+    async def acquire_async(self, url: str) -> float:
+        """Like :meth:`acquire`, but waits without blocking the event loop."""
+        delay = self.bucket(url).reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+
+def prepaid(
+    url: str, func: Callable[[], Any], limiter: Optional[RateLimiter] = None
+) -> Callable[[], Any]:
+    """Return a function that runs ``func``, without acquiring a token for its
+    first request to the server of ``url``, since it was already acquired.
+
+    If ``func`` sends no request to this server, the token is given back to the
+    ``limiter``.
+    """
+
+    def run() -> Any:
+        origin = utils.url_origin(url)
+        _prepaid.set(origin)
+        try:
+            return func()
+        finally:
+            if limiter is not None and _prepaid.get() == origin:
+                limiter.bucket(url).refund()
+
+    # In a copy of the context, so that the token is not seen by other tasks.
+    return lambda: contextvars.copy_context().run(run)
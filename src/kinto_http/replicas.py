@@ -0,0 +1,98 @@
+import random
+import threading
+import time
+from typing import AbstractSet, Iterable, List, Optional
+
+
+class Replica(object):
+    """A read replica, and its recent latency."""
+
+    def __init__(self, url: str):
+        self.url = url
+        # Moving average of the latencies (seconds), 0 until measured.
+        self.latency = 0.0
+        self.in_flight = 0
+        self.failed_until = 0.0
+
+    def score(self) -> float:
+        return self.latency * (self.in_flight + 1)
+
+
+class ReplicaRouter(object):
+    """Route the read requests (``GET`` and ``HEAD``) of sessions among read replicas.
+
+    - Among two random healthy replicas, the one with the lowest recent latency
+      (weighted by its requests in flight) is chosen.
+    - A replica that fails (network error or ``5XX`` response) is skipped for
+      ``cooldown`` seconds, and the request is sent to another replica, or to the
+      primary server if none is left.
+    - With ``read_your_writes``, the reads are sent to the primary server during
+      this number of seconds after each write (eg. the maximum replication lag),
+      so that they see the writes.
+
+    Only the requests to relative endpoints are routed: absolute URLs, like the
+    ``Next-Page`` links, stay on the same server.
+
+    A router can be shared by several clients:
+
+    .. code-block:: python
+
+        router = ReplicaRouter(["http://replica1:8888/v1", "http://replica2:8888/v1"])
+        client = Client(server_url="http://primary:8888/v1", read_replicas=router)
+    """
+
+    def __init__(
+        self,
+        replicas: Iterable[str],
+        *,
+        read_your_writes: Optional[float] = None,
+        cooldown: float = 10.0,
+        smoothing: float = 0.3,
+    ):
+        self.replicas: List[Replica] = [Replica(url) for url in replicas]
+        if not self.replicas:
+            raise ValueError("At least one replica is required")
+        self.read_your_writes = read_your_writes
+        self.cooldown = cooldown
+        self.smoothing = smoothing
+        self._primary_until = 0.0
+        self._lock = threading.Lock()
+
+    def choose(self, exclude: AbstractSet[str] = frozenset()) -> Optional[Replica]:
+        """Return the replica for the next read, or ``None`` to read from the primary."""
+        now = time.monotonic()
+        with self._lock:
+            if now < self._primary_until:
+                return None
+            healthy = [
+                replica
+                for replica in self.replicas
+                if replica.failed_until <= now and replica.url not in exclude
+            ]
+            if not healthy:
+                return None
+            # "Power of two choices": avoids sending every read to the same replica.
+            candidates = random.sample(healthy, 2) if len(healthy) > 1 else healthy
+            return min(candidates, key=Replica.score)
+
+    def sent(self, replica: Replica) -> None:
+        """Record the start of a read."""
+        with self._lock:
+            replica.in_flight += 1
+
+    def done(self, replica: Replica, latency: Optional[float]) -> None:
+        """Record the end of a read, and its latency (``None`` if it failed)."""
+        with self._lock:
+            replica.in_flight -= 1
+            if latency is None:
+                replica.failed_until = time.monotonic() + self.cooldown
+            elif replica.latency == 0:
+                replica.latency = latency
+            else:
+                replica.latency += self.smoothing * (latency - replica.latency)
+
+    def wrote(self) -> None:
+        """Record a write of the session."""
+        if self.read_your_writes:
+            with self._lock:
+                self._primary_until = time.monotonic() + self.read_your_writes
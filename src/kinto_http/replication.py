@@ -1,7 +1,7 @@
 import argparse
 import logging
 
-from kinto_http import Client, cli_utils
+from kinto_http import Client, cli_utils, tracing
 
 
 logger = logging.getLogger(__name__)
@@ -12,25 +12,32 @@ def replicate(origin: Client, destination: Client) -> None:
 
     All records are replicated, not only the ones that changed.
     """
-    msg = "Replication from {0} to {1}".format(origin, destination)
-    logger.info(msg)
-
-    destination.create_bucket(if_not_exists=True)
-    collection_data = origin.get_collection()
-    destination.create_collection(
-        data=collection_data["data"],
-        permissions=collection_data["permissions"],
-        if_not_exists=True,
-    )
-
-    records = origin.get_records()
-    logger.info("replication of {0} records".format(len(records)))
-    with destination.batch() as batch:
-        for record in records:
-            if record.get("deleted", False) is True:
-                batch.delete_record(id=record["id"], if_match=record["last_modified"])
-            else:
-                batch.update_record(data=record, safe=False)
+    with tracing.start_span(
+        destination.session,
+        "replicate",
+        bucket=destination.bucket_name,
+        collection=destination.collection_name,
+    ) as span:
+        msg = "Replication from {0} to {1}".format(origin, destination)
+        logger.info(msg)
+
+        destination.create_bucket(if_not_exists=True)
+        collection_data = origin.get_collection()
+        destination.create_collection(
+            data=collection_data["data"],
+            permissions=collection_data["permissions"],
+            if_not_exists=True,
+        )
+
+        records = origin.get_records()
+        logger.info("replication of {0} records".format(len(records)))
+        span.set_attribute("records", len(records))
+        with destination.batch() as batch:
+            for record in records:
+                if record.get("deleted", False) is True:
+                    batch.delete_record(id=record["id"], if_match=record["last_modified"])
+                else:
+                    batch.update_record(data=record, safe=False)
 
 
 def get_arguments() -> argparse.Namespace:  # pragma: nocover
@@ -0,0 +1,218 @@
+import logging
+import random
+import re
+import time
+from typing import Any, Callable, NamedTuple, Optional, TypeVar
+
+import requests
+
+from kinto_http import deadlines, instrumentation
+from kinto_http.exceptions import DeadlineExceeded
+from kinto_http.tracing import NOOP_SPAN
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+# Methods that can be sent several times with the same effect.
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+# Responses of requests that the server did not process: always safe to retry.
+UNPROCESSED_STATUSES = (409, 429, 503)
+
+# Errors that may be transient.
+NETWORK_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+
+class RetryDecision(NamedTuple):
+    """Delay before the next attempt (``None`` to give up), and the reason to give up."""
+
+    delay: Optional[float]
+    reason: Optional[str] = None
+
+
+class RetryPolicy(object):
+    """Decide whether and when failed requests are retried.
+
+    - Server errors (5xx, ``409`` and ``429`` responses) are retried ``retries`` times,
+      and network errors (connection errors and timeouts) ``network_retries`` times.
+    - The delay grows exponentially (``backoff_factor * 2 ** attempt``, up to
+      ``max_backoff`` seconds), with full jitter. It is never shorter than the
+      ``Retry-After`` header of the response, unless forced with ``retry_after``.
+    - No retry starts more than ``budget`` seconds after the first attempt.
+    - Requests that are not idempotent (``POST``, ``PATCH``) are only retried when
+      the server did not process them (``409``, ``429`` and ``503`` responses), unless
+      ``retry_non_idempotent`` is set.
+
+    A policy has no state, and can be shared by several clients:
+
+    .. code-block:: python
+
+        policy = RetryPolicy(retries=5, backoff_factor=1, budget=60)
+        client = Client(server_url="http://localhost:8888/v1", retry_policy=policy)
+    """
+
+    def __init__(
+        self,
+        retries: int = 0,
+        *,
+        network_retries: int = 1,
+        backoff_factor: float = 0.2,
+        max_backoff: float = 30.0,
+        retry_after: Optional[float] = None,
+        budget: Optional[float] = None,
+        retry_non_idempotent: bool = False,
+    ):
+        self.retries = retries
+        self.network_retries = network_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.retry_after = retry_after
+        self.budget = budget
+        self.retry_non_idempotent = retry_non_idempotent
+
+    def replace(self, **changes: Any) -> "RetryPolicy":
+        """Return a copy of the policy with some parameters changed."""
+        return self.__class__(**{**vars(self), **changes})
+
+    def is_idempotent(self, method: str, idempotent: Optional[bool] = None) -> bool:
+        if idempotent is not None:
+            return idempotent
+        return method.upper() in IDEMPOTENT_METHODS
+
+    def backoff(self, attempt: int) -> float:
+        """Exponential backoff with full jitter, before the retry number ``attempt + 1``."""
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2**attempt))
+
+    def decide(
+        self,
+        attempt: int,
+        method: str,
+        *,
+        status: Optional[int] = None,
+        retry_after: Optional[str] = None,
+        error: Optional[BaseException] = None,
+        elapsed: float = 0.0,
+        idempotent: Optional[bool] = None,
+    ) -> Optional[RetryDecision]:
+        """Decide about the retry of a failed request, after ``attempt`` retries.
+
+        :param status: status of the error response.
+        :param retry_after: value of the ``Retry-After`` header of the response.
+        :param error: exception raised instead of a response.
+        :param elapsed: seconds since the first attempt.
+        :param idempotent: override the idempotency of the method (eg. for batches).
+        :returns: ``None`` if this failure is not retriable at all.
+        """
+        if error is not None:
+            if not isinstance(error, NETWORK_ERRORS):
+                return None
+            limit = self.network_retries
+            # The server may have received the request.
+            processed = True
+        elif status is not None and (status >= 500 or status in (409, 429)):
+            limit = self.retries
+            processed = status not in UNPROCESSED_STATUSES
+        else:
+            return None
+
+        if attempt >= limit:
+            return RetryDecision(None, "exhausted")
+        if processed and not (self.retry_non_idempotent or self.is_idempotent(method, idempotent)):
+            return RetryDecision(None, "not_idempotent")
+
+        if self.retry_after is not None:
+            delay = float(self.retry_after)
+        else:
+            delay = self.backoff(attempt)
+            if retry_after and re.match(r"^\d+$", retry_after):
+                delay = max(delay, int(retry_after))
+
+        if self.budget is not None and elapsed + delay > self.budget:
+            return RetryDecision(None, "budget")
+        return RetryDecision(delay)
+
+
+def retry_delay(
+    session: Any,
+    attempt: int,
+    method: str,
+    url: str,
+    first_attempt: float,
+    *,
+    span: Any = NOOP_SPAN,
+    idempotent: Optional[bool] = None,
+    status: Optional[int] = None,
+    retry_after: Optional[str] = None,
+    error: Optional[BaseException] = None,
+) -> Optional[float]:
+    """Return the delay before retrying a failed request of the session, according
+    to its retry policy, or ``None`` to give up. Raise :class:`DeadlineExceeded` if
+    the retry would start after the current deadline.
+
+    :param first_attempt: ``time.monotonic()`` of the first attempt.
+    """
+    policy = getattr(session, "retry_policy", None)
+    if not isinstance(policy, RetryPolicy):
+        return None
+    decision = policy.decide(
+        attempt,
+        method,
+        status=status,
+        retry_after=retry_after,
+        error=error,
+        elapsed=time.monotonic() - first_attempt,
+        idempotent=idempotent,
+    )
+    if decision is None:
+        return None
+    left = deadlines.remaining()
+    if decision.delay is not None and left is not None and decision.delay >= left:
+        decision = RetryDecision(None, "deadline")
+    if decision.delay is None:
+        logger.debug("Give up retrying %s %s (%s)", method.upper(), url, decision.reason)
+        instrumentation.emit(
+            session,
+            instrumentation.RETRY_GIVE_UP,
+            method=method,
+            url=url,
+            status=status,
+            error=error,
+            attempts=attempt,
+            reason=decision.reason,
+        )
+        if decision.reason == "deadline":
+            raise DeadlineExceeded(f"Deadline exceeded before retrying {method.upper()} {url}")
+        return None
+    instrumentation.emit(
+        session,
+        instrumentation.REQUEST_RETRY,
+        method=method,
+        url=url,
+        status=status,
+        error=error,
+        attempt=attempt + 1,
+        sleep=decision.delay,
+    )
+    if span is not NOOP_SPAN:
+        span.set_attribute("retries", attempt + 1)
+    return decision.delay
+
+
+def call(session: Any, method: str, url: str, func: Callable[[], T]) -> T:
+    """Call ``func``, that sends a request without ``session.request()`` (eg. to stream
+    a download), and retry it on network errors according to the retry policy.
+    """
+    first_attempt = time.monotonic()
+    attempt = 0
+    while True:
+        try:
+            return func()
+        except Exception as e:
+            delay = retry_delay(session, attempt, method, url, first_attempt, error=e)
+            if delay is None:
+                raise
+            deadlines.sleep(delay, f"retrying {method.upper()} {url}")
+            attempt += 1
@@ -1,19 +1,38 @@
-import json
 import logging
 import re
 import threading
 import time
 import warnings
-from typing import Any, Dict, Optional, Tuple, Union, cast
+from typing import Any, Dict, List, Optional, Set, Tuple, Union, cast
 from urllib.parse import urlencode, urlparse
 
 import requests
 from urllib3.response import HTTPResponse
 
 import kinto_http
-from kinto_http import utils
+from kinto_http import deadlines, utils
+from kinto_http.circuitbreaker import Circuit, CircuitBreaker
 from kinto_http.constants import USER_AGENT
-from kinto_http.exceptions import BackoffException, KintoException
+from kinto_http.exceptions import BackoffException, CircuitOpenException, KintoException
+from kinto_http.hedging import HedgingPolicy
+from kinto_http.instrumentation import (
+    BACKOFF,
+    BACKOFF_WAIT,
+    CIRCUIT_REJECT,
+    CIRCUIT_STATE,
+    HEDGE,
+    RATE_LIMIT,
+    REPLICA_FAILOVER,
+    REQUEST_END,
+    REQUEST_START,
+    Instrumentation,
+    Listener,
+)
+from kinto_http.pools import POOLS, ConnectionPools
+from kinto_http.ratelimit import RateLimiter
+from kinto_http.replicas import Replica, ReplicaRouter
+from kinto_http.retry import NETWORK_ERRORS, RetryPolicy, retry_delay
+from kinto_http.tracing import NOOP_SPAN, NOOP_TRACER, Tracer
 
 
 logger = logging.getLogger(__name__)
@@ -67,6 +86,36 @@ def create_session(
     return session
 
 
+class BackoffDeadlines(object):
+    """Backoff deadlines sent by the servers, shared by the sessions in ``"wait"`` mode."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._deadlines: Dict[str, float] = {}
+
+    def set(self, url: str, deadline: float) -> None:
+        key = utils.url_origin(url)
+        with self._lock:
+            self._deadlines[key] = max(deadline, self._deadlines.get(key, 0.0))
+
+    def wait(self, url: str) -> float:
+        """Sleep until the deadline of the server of this URL, and return the time waited."""
+        key = utils.url_origin(url)
+        waited = 0.0
+        # The deadline can be pushed back meanwhile by other sessions.
+        while (delay := self._deadlines.get(key, 0.0) - time.time()) > 0:
+            deadlines.sleep(delay, "the end of the server backoff")
+            waited += delay
+        return waited
+
+    def clear(self) -> None:
+        with self._lock:
+            self._deadlines = {}
+
+
+BACKOFF_DEADLINES = BackoffDeadlines()
+
+
 class Session(object):
     """Handles all the interactions with the network."""
 
@@ -79,17 +128,80 @@ class Session(object):
         retry: int = 0,
         retry_after: Optional[int] = None,
         dry_mode: bool = False,
+        tracer: Optional[Tracer] = None,
+        rate_limit: Union[float, RateLimiter, None] = None,
+        rate_limit_burst: Optional[float] = None,
+        backoff_mode: str = "raise",
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Union[int, CircuitBreaker, None] = None,
+        hedging: Optional[HedgingPolicy] = None,
+        read_replicas: Union[List[str], ReplicaRouter, None] = None,
+        read_your_writes: Optional[float] = None,
+        connection_pools: Union[bool, ConnectionPools, None] = None,
     ):
+        if backoff_mode not in ("raise", "wait"):
+            raise ValueError(f"Unknown backoff mode {backoff_mode!r}")
         self.backoff: Optional[float] = None
+        self.backoff_mode = backoff_mode
+        # Total time spent waiting for the backoff delays (in ``"wait"`` mode).
+        self.backoff_waited = 0.0
+        self._backoff_lock = threading.Lock()
         self.server_url: Optional[str] = server_url
         self.auth = auth
-        self.nb_retry = retry
-        self.retry_after = retry_after
+        self.retry_policy = retry_policy or RetryPolicy(retries=retry, retry_after=retry_after)
         self.timeout = timeout
         self.headers: Dict[str, str] = headers or {}
         self.dry_mode = dry_mode
+        self.instrumentation = Instrumentation()
+        self.tracer = tracer or NOOP_TRACER
+        self.rate_limiter: Optional[RateLimiter] = (
+            RateLimiter(rate_limit, rate_limit_burst)
+            if isinstance(rate_limit, (int, float))
+            else rate_limit
+        )
+        self.circuit_breaker: Optional[CircuitBreaker] = (
+            CircuitBreaker(failures=circuit_breaker)
+            if isinstance(circuit_breaker, int)
+            else circuit_breaker
+        )
+        self.hedging = hedging
+        self.read_replicas: Optional[ReplicaRouter] = (
+            read_replicas
+            if read_replicas is None or isinstance(read_replicas, ReplicaRouter)
+            else ReplicaRouter(read_replicas, read_your_writes=read_your_writes)
+        )
+        # Without pools, each thread has its own pools with the default sizes.
+        self.connection_pools: Optional[ConnectionPools] = (
+            POOLS.get(server_url or "") if connection_pools is True else connection_pools or None
+        )
         self._local = threading.local()
 
+    @property
+    def nb_retry(self) -> int:
+        return self.retry_policy.retries
+
+    @nb_retry.setter
+    def nb_retry(self, value: int) -> None:
+        # The policy can be shared with other sessions.
+        self.retry_policy = self.retry_policy.replace(retries=value)
+
+    @property
+    def retry_after(self) -> Optional[float]:
+        return self.retry_policy.retry_after
+
+    @retry_after.setter
+    def retry_after(self, value: Optional[float]) -> None:
+        self.retry_policy = self.retry_policy.replace(retry_after=value)
+
+    def add_listener(self, listener: Listener) -> None:
+        """Register a callable that receives the instrumentation events
+        (see :class:`kinto_http.instrumentation.Event`).
+        """
+        self.instrumentation.add_listener(listener)
+
+    def remove_listener(self, listener: Listener) -> None:
+        self.instrumentation.remove_listener(listener)
+
     @property
     def _session(self):
         # Connection pool and cookie jar of requests.Session are not thread-safe.
@@ -97,6 +209,8 @@ class Session(object):
         s = getattr(self._local, "session", None)
         if s is None:
             s = requests.Session()
+            if self.connection_pools is not None:
+                self.connection_pools.mount(s)
             self._local.session = s
         return s
 
@@ -109,8 +223,29 @@ class Session(object):
         payload: Optional[Dict[str, Any]] = None,
         **kwargs: Any,
     ) -> Tuple[Any, Any]:
+        if self.tracer is NOOP_TRACER:
+            return self._request(NOOP_SPAN, method, endpoint, data, permissions, payload, **kwargs)
+        with self.tracer.start_span("http.request", method=method.upper()) as span:
+            return self._request(span, method, endpoint, data, permissions, payload, **kwargs)
+
+    def _request(
+        self,
+        span: Any,
+        method: str,
+        endpoint: str,
+        data: Any,
+        permissions: Any,
+        payload: Optional[Dict[str, Any]],
+        **kwargs: Any,
+    ) -> Tuple[Any, Any]:
+        # Timings are only measured if someone listens.
+        instrumentation = self.instrumentation if self.instrumentation.listeners else None
+        # Whether the request can be sent twice (see :class:`RetryPolicy`).
+        idempotent: Optional[bool] = kwargs.pop("idempotent", None)
+        started = sent = time.perf_counter() if instrumentation else 0.0
+
         current_time = time.time()
-        if self.backoff and self.backoff > current_time:
+        if self.backoff_mode == "raise" and self.backoff and self.backoff > current_time:
             seconds = int(self.backoff - current_time)
             raise BackoffException("Retry after {} seconds".format(seconds), seconds)
 
@@ -122,20 +257,13 @@ class Session(object):
 
         if self.timeout is not False:
             kwargs.setdefault("timeout", self.timeout)
+        configured_timeout = kwargs.get("timeout")
 
         if self.auth is not None:
             kwargs.setdefault("auth", self.auth)
 
         if kwargs.get("params") is not None:
-            params = dict()
-            for key, value in kwargs["params"].items():
-                if key.startswith("in_") or key.startswith("exclude_"):
-                    params[key] = f"{value}," if isinstance(value, str) else ",".join(value)
-                elif isinstance(value, str):
-                    params[key] = value
-                else:
-                    params[key] = json.dumps(value)
-            kwargs["params"] = params
+            kwargs["params"] = utils.encode_params(kwargs["params"])
 
         overridden_headers = kwargs.get("headers") or {}
 
@@ -157,15 +285,70 @@ class Session(object):
             payload["permissions"] = permissions
 
         if method.lower() not in ("get", "head"):
-            if "files" in kwargs:
+            if isinstance(kwargs.get("files"), utils.MultipartEncoder):
+                # Stream the body, along with the payload as form fields.
+                body = kwargs.pop("files")
+                body.fields.update(payload)
+                kwargs["data"] = body
+                kwargs["headers"]["Content-Type"] = body.content_type
+
+            elif "files" in kwargs:
                 kwargs.setdefault("data", payload)
 
             else:
                 kwargs.setdefault("data", utils.json_dumps(payload))
                 kwargs["headers"].setdefault("Content-Type", "application/json")
 
-        retry = self.nb_retry
-        while retry >= 0:
+        traced = span is not NOOP_SPAN
+        if traced:
+            span.set_attribute("url", actual_url)
+        router = self.read_replicas if not self.dry_mode else None
+        routed = router is not None and not parsed.scheme and method.upper() in ("GET", "HEAD")
+        primary_url = actual_url
+        failed_replicas: Set[str] = set()
+        replica: Optional[Replica] = None
+        request_started = 0.0
+        first_attempt = time.monotonic()
+        attempt = 0
+        while True:
+            if routed:
+                replica = router.choose(failed_replicas)
+                actual_url = utils.urljoin(replica.url, endpoint) if replica else primary_url
+            circuit = (
+                self.circuit_breaker.circuit(actual_url)
+                if self.circuit_breaker is not None and not self.dry_mode
+                else None
+            )
+            deadlines.check(f"{method.upper()} {actual_url}")
+            if (timeout := deadlines.timeout(configured_timeout)) is not None:
+                kwargs["timeout"] = timeout
+            if self.backoff_mode == "wait" and not self.dry_mode:
+                waited = BACKOFF_DEADLINES.wait(actual_url)
+                if waited:
+                    with self._backoff_lock:
+                        self.backoff_waited += waited
+                    logger.info("Waited %.1f seconds for the server backoff", waited)
+                    if instrumentation:
+                        instrumentation.emit(BACKOFF_WAIT, url=actual_url, seconds=waited)
+            if self.rate_limiter is not None and not self.dry_mode:
+                waited = self.rate_limiter.acquire(actual_url)
+                if waited and instrumentation:
+                    instrumentation.emit(RATE_LIMIT, url=actual_url, seconds=waited)
+            if circuit is not None:
+                # Right before sending, so that probes are not held while waiting.
+                try:
+                    self._acquire_circuit(circuit, actual_url)
+                except CircuitOpenException:
+                    if replica is None:
+                        raise
+                    failed_replicas.add(replica.url)
+                    continue
+            if replica is not None:
+                cast(ReplicaRouter, router).sent(replica)
+                request_started = time.monotonic()
+            if instrumentation:
+                instrumentation.emit(REQUEST_START, method=method, url=actual_url)
+                sent = time.perf_counter()
             if self.dry_mode:
                 qs = (
                     ("?" + urlencode(kwargs["params"])) if kwargs.get("params") is not None else ""
@@ -177,33 +360,107 @@ class Session(object):
                 dry_resp.status_code = dry_resp.status  # ty: ignore[unresolved-attribute]
                 resp: requests.Response = cast(requests.Response, dry_resp)
             else:
-                resp = self._session.request(method, actual_url, **kwargs)
+                try:
+                    if self.hedging is not None and method.upper() == "GET":
+                        resp = self._hedged_request(method, actual_url, kwargs)
+                    else:
+                        resp = self._session.request(method, actual_url, **kwargs)
+                except Exception as e:
+                    if circuit is not None:
+                        if isinstance(e, NETWORK_ERRORS):
+                            self._circuit_changed(circuit, actual_url, circuit.failure())
+                        else:
+                            circuit.release()
+                    if instrumentation:
+                        self._emit_request_end(
+                            instrumentation, method, actual_url, kwargs, None, e, started, sent
+                        )
+                    if replica is not None:
+                        failed = isinstance(e, NETWORK_ERRORS)
+                        cast(ReplicaRouter, router).done(
+                            replica, None if failed else time.monotonic() - request_started
+                        )
+                        if failed:
+                            # Not a retry: try another replica, or the primary.
+                            self._replica_failed(failed_replicas, replica, e, None)
+                            if instrumentation:
+                                started = time.perf_counter()
+                            continue
+                    # The timeout may have been reduced to the remaining time.
+                    deadlines.check(f"the end of {method.upper()} {actual_url}")
+                    delay = retry_delay(
+                        self,
+                        attempt,
+                        method,
+                        actual_url,
+                        first_attempt,
+                        span=span,
+                        idempotent=idempotent,
+                        error=e,
+                    )
+                    if delay is None:
+                        raise
+                    deadlines.sleep(delay, f"retrying {method.upper()} {actual_url}")
+                    attempt += 1
+                    if instrumentation:
+                        started = time.perf_counter()
+                    continue
+            received = time.perf_counter() if instrumentation else 0.0
 
             if "Alert" in resp.headers:
                 warnings.warn(resp.headers["Alert"], DeprecationWarning)
             backoff_seconds = resp.headers.get("Backoff")
             if backoff_seconds and re.match(r"^\d+$", backoff_seconds):
                 self.backoff = time.time() + int(backoff_seconds)
+                if self.backoff_mode == "wait":
+                    BACKOFF_DEADLINES.set(actual_url, self.backoff)
+                if instrumentation:
+                    instrumentation.emit(BACKOFF, url=actual_url, seconds=int(backoff_seconds))
             else:
                 self.backoff = None
 
-            retry = retry - 1
             status_code = resp.status_code or 0
+            if circuit is not None:
+                outcome = circuit.failure() if status_code >= 500 else circuit.success()
+                self._circuit_changed(circuit, actual_url, outcome)
+            if replica is not None:
+                cast(ReplicaRouter, router).done(
+                    replica, None if status_code >= 500 else time.monotonic() - request_started
+                )
+            if traced:
+                span.set_attribute("status", status_code)
             if 200 <= status_code < 400:
                 # Success
+                if router is not None and method.upper() not in ("GET", "HEAD"):
+                    router.wrote()
                 break
             else:
-                if retry >= 0 and (status_code >= 500 or status_code in (409, 429)):
+                if instrumentation:
+                    self._emit_request_end(
+                        instrumentation, method, actual_url, kwargs, resp, None, started, sent
+                    )
+                if replica is not None and status_code >= 500:
+                    self._replica_failed(failed_replicas, replica, None, status_code)
+                    if instrumentation:
+                        started = time.perf_counter()
+                    continue
+                delay = retry_delay(
+                    self,
+                    attempt,
+                    method,
+                    actual_url,
+                    first_attempt,
+                    span=span,
+                    idempotent=idempotent,
+                    status=status_code,
+                    retry_after=resp.headers.get("Retry-After"),
+                )
+                if delay is not None:
                     # Wait and try again.
-                    # If not forced, use retry-after header and wait.
-                    if self.retry_after is None:
-                        server_retryafter = resp.headers.get("Retry-After", "0")
-                        retry_after = (
-                            int(server_retryafter) if re.match(r"^\d+$", server_retryafter) else 0
-                        )
-                    else:
-                        retry_after = self.retry_after
-                    time.sleep(retry_after)
+                    deadlines.sleep(delay, f"retrying {method.upper()} {actual_url}")
+                    attempt += 1
+                    if instrumentation:
+                        started = time.perf_counter()
                     continue
 
                 # Retries exhausted, raise exception.
@@ -220,4 +477,125 @@ class Session(object):
             body = None
         else:
             body = resp.json()
+        if traced and isinstance(getattr(resp, "content", None), bytes):
+            span.set_attribute("response_bytes", len(resp.content))
+        if instrumentation:
+            self._emit_request_end(
+                instrumentation, method, actual_url, kwargs, resp, None, started, sent, received
+            )
         return body, resp.headers
+
+    def _hedged_request(self, method: str, url: str, kwargs: Dict[str, Any]) -> Any:
+        hedging = cast(HedgingPolicy, self.hedging)
+
+        def send(target: str) -> Any:
+            started = time.monotonic()
+            resp = self._session.request(method, target, **kwargs)
+            hedging.record(time.monotonic() - started)
+            return resp
+
+        def send_hedge(target: str) -> Any:
+            # Like the primary request, the hedged one is rate limited and guarded
+            # by the circuit of its server.
+            if self.rate_limiter is not None:
+                waited = self.rate_limiter.acquire(target)
+                if waited and self.instrumentation.listeners:
+                    self.instrumentation.emit(RATE_LIMIT, url=target, seconds=waited)
+            if self.circuit_breaker is None:
+                return send(target)
+            circuit = self.circuit_breaker.circuit(target)
+            self._acquire_circuit(circuit, target)
+            try:
+                resp = send(target)
+            except Exception as e:
+                if isinstance(e, NETWORK_ERRORS):
+                    self._circuit_changed(circuit, target, circuit.failure())
+                else:
+                    circuit.release()
+                raise
+            status_code = resp.status_code or 0
+            outcome = circuit.failure() if status_code >= 500 else circuit.success()
+            self._circuit_changed(circuit, target, outcome)
+            return resp
+
+        resp, hedge = hedging.call(send, url, hedging.hedge_url(url, self.server_url), send_hedge)
+        if hedge is not None:
+            logger.debug(
+                "Hedged GET %s after %.3f seconds (%s)",
+                url,
+                hedge.delay,
+                "won" if hedge.won else "lost",
+            )
+            if self.instrumentation.listeners:
+                self.instrumentation.emit(HEDGE, url=url, delay=hedge.delay, won=hedge.won)
+        return resp
+
+    def _replica_failed(
+        self,
+        failed_replicas: Set[str],
+        replica: Replica,
+        error: Optional[Exception],
+        status: Optional[int],
+    ) -> None:
+        failed_replicas.add(replica.url)
+        logger.warning(
+            "Read replica %s failed (%s)", replica.url, repr(error) if status is None else status
+        )
+        if self.instrumentation.listeners:
+            self.instrumentation.emit(
+                REPLICA_FAILOVER, url=replica.url, error=error, status=status
+            )
+
+    def _acquire_circuit(self, circuit: Circuit, url: str) -> None:
+        try:
+            state = circuit.acquire()
+        except CircuitOpenException as e:
+            if self.instrumentation.listeners:
+                self.instrumentation.emit(
+                    CIRCUIT_REJECT, url=utils.url_origin(url), retry_after=e.retry_after
+                )
+            raise
+        self._circuit_changed(circuit, url, state)
+
+    def _circuit_changed(self, circuit: Circuit, url: str, state: Optional[str]) -> None:
+        if state is None:
+            return
+        origin = utils.url_origin(url)
+        logger.warning("Circuit of %s is %s", origin, state.replace("_", "-"))
+        if self.instrumentation.listeners:
+            self.instrumentation.emit(
+                CIRCUIT_STATE, url=origin, state=state, failures=circuit.failures
+            )
+
+    @staticmethod
+    def _emit_request_end(
+        instrumentation: Instrumentation,
+        method: str,
+        url: str,
+        kwargs: Dict[str, Any],
+        resp: Any,
+        error: Optional[Exception],
+        started: float,
+        sent: float,
+        received: Optional[float] = None,
+    ) -> None:
+        now = time.perf_counter()
+        if received is None:
+            # The body was not parsed.
+            received = now
+        data = kwargs.get("data")
+        request_bytes = len(data) if isinstance(data, (str, bytes, utils.MultipartEncoder)) else 0
+        content = getattr(resp, "content", None)
+        instrumentation.emit(
+            REQUEST_END,
+            method=method,
+            url=url,
+            status=getattr(resp, "status_code", None),
+            error=error,
+            duration=now - started,
+            serialization=sent - started,
+            network=received - sent,
+            parse=now - received,
+            request_bytes=request_bytes,
+            response_bytes=len(content) if isinstance(content, bytes) else 0,
+        )
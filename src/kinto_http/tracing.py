@@ -0,0 +1,146 @@
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional, TypeVar
+
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "kinto_http_span", default=None
+)
+
+
+class _NoopSpan(object):
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer(object):
+    """Base class of the tracers, which does not record anything.
+
+    Tracers open spans with :meth:`start_span`, used as a context manager. The
+    spans have a ``set_attribute(key, value)`` method.
+    """
+
+    def start_span(self, name: str, **attributes: Any) -> ContextManager[Any]:
+        return NOOP_SPAN
+
+
+NOOP_TRACER = Tracer()
+
+
+class Span(object):
+    """A span recorded by the :class:`InMemoryTracer`."""
+
+    def __init__(self, name: str, attributes: Dict[str, Any], parent: Optional["Span"]):
+        self.name = name
+        self.attributes = attributes
+        self.parent = parent
+        self.error: Optional[BaseException] = None
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    @property
+    def duration(self) -> Optional[float]:
+        return None if self.end is None else self.end - self.start
+
+    def __repr__(self) -> str:
+        return f"<Span {self.name} {self.attributes}>"
+
+
+class InMemoryTracer(Tracer):
+    """Keep the finished spans in memory, eg. for tests."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.spans: List[Span] = []
+
+    @contextmanager
+    def start_span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        span = Span(name, attributes, _current_span.get())
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = e
+            raise
+        finally:
+            span.end = time.perf_counter()
+            _current_span.reset(token)
+            with self._lock:
+                self.spans.append(span)
+
+    def find(self, name: str) -> List[Span]:
+        """Return the finished spans with this name."""
+        return [span for span in self.spans if span.name == name]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.spans = []
+
+
+class OpenTelemetryTracer(Tracer):
+    """Open the spans with OpenTelemetry.
+
+    Requires the ``opentelemetry-api`` package. By default, the tracer of the global
+    tracer provider is used.
+    """
+
+    def __init__(self, tracer: Any = None):
+        if tracer is None:
+            from opentelemetry import trace
+
+            tracer = trace.get_tracer("kinto_http")
+        self._tracer = tracer
+
+    def start_span(self, name: str, **attributes: Any) -> ContextManager[Any]:
+        # OpenTelemetry does not accept `None` values.
+        attributes = {key: value for key, value in attributes.items() if value is not None}
+        return self._tracer.start_as_current_span(name, attributes=attributes)
+
+
+def start_span(session: Any, name: str, **attributes: Any) -> ContextManager[Any]:
+    """Open a span with the tracer of the session (if any)."""
+    tracer = getattr(session, "tracer", None) or NOOP_TRACER
+    return tracer.start_span(name, **attributes)
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """Open a span around a client operation, with the bucket and collection
+    as attributes, and the number of records returned if it is a list.
+    """
+
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+            tracer = getattr(self.session, "tracer", None)
+            if tracer is None or tracer is NOOP_TRACER:
+                return func(self, *args, **kwargs)
+            with tracer.start_span(
+                name,
+                bucket=kwargs.get("bucket") or self.bucket_name,
+                collection=kwargs.get("collection") or self.collection_name,
+            ) as span:
+                result = func(self, *args, **kwargs)
+                if isinstance(result, list):
+                    span.set_attribute("records", len(result))
+                return result
+
+        return wrapper  # ty: ignore[invalid-return-type]
+
+    return decorator
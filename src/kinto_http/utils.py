@@ -1,18 +1,43 @@
+import contextvars
 import functools
 import hashlib
+import heapq
 import json
+import os
+import pickle
 import re
-import sys
+import tempfile
 import unicodedata
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import date, datetime
-from typing import Any, Iterable, Iterator, List, Tuple
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+from urllib.parse import quote_plus, urlencode, urlparse
 
 from unidecode import unidecode
 
-from kinto_http.constants import VALID_SLUG_REGEXP
+from kinto_http.constants import ATTACHMENT_CHUNK_SIZE, VALID_SLUG_REGEXP
 
 
-MAX_LENGTH_INT = len(str(sys.maxsize * 2 + 1))
+# Fields assigned automatically by the server, ignored when comparing records.
+IGNORED_FIELDS = ("last_modified", "schema")
+
+T = TypeVar("T")
+R = TypeVar("R")
 
 
 def slugify(value: Any) -> str:
@@ -38,6 +63,12 @@ def urljoin(server_url: str, path: str) -> str:
     return server_url.rstrip("/") + "/" + path.lstrip("/")
 
 
+def url_origin(url: str) -> str:
+    """Return the scheme and host of the url, eg. to keep a state per server."""
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
 def quote(text: Any) -> str:
     if hasattr(text, "strip"):
         text = text.strip('"')
@@ -55,6 +86,87 @@ def chunks(lst: List[Any], n: int) -> Iterator[List[Any]]:
         yield lst
 
 
+def ichunks(iterable: Iterable[T], n: int) -> Iterator[List[T]]:
+    """Yield successive n-sized chunks from any iterable, without consuming
+    it entirely.
+    """
+    chunk: List[T] = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == n:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def concurrent_map(func: Callable[[T], R], iterable: Iterable[T], workers: int) -> Iterator[R]:
+    """Like ``map()``, but calls ``func`` in a pool of threads.
+
+    Results are yielded in the order of the input. At most ``workers`` items
+    are consumed ahead of the results, hence the input can be a stream.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending: Deque[Future] = deque()
+        for item in iterable:
+            if len(pending) >= workers:
+                yield pending.popleft().result()
+            # Run in a copy of the current context, eg. to keep the tracing span.
+            pending.append(executor.submit(contextvars.copy_context().run, func, item))
+        while pending:
+            yield pending.popleft().result()
+
+
+def is_list_filter(key: str, value: Any) -> bool:
+    """Return True if the querystring parameter is a ``in_`` or ``exclude_``
+    filter whose values are given as a list.
+    """
+    return key.startswith(("in_", "exclude_")) and isinstance(value, (list, tuple))
+
+
+def encode_params(params: Dict[str, Any]) -> Dict[str, str]:
+    """Serialize querystring parameters the way the server expects them."""
+    encoded = dict()
+    for key, value in params.items():
+        if key.startswith("in_") or key.startswith("exclude_"):
+            encoded[key] = f"{value}," if isinstance(value, str) else ",".join(value)
+        elif isinstance(value, str):
+            encoded[key] = value
+        else:
+            encoded[key] = json.dumps(value)
+    return encoded
+
+
+def url_length(url: str, params: Dict[str, Any]) -> int:
+    """Return the length of the URL once the parameters are encoded in its querystring."""
+    if not params:
+        return len(url)
+    return len(url) + 1 + len(urlencode(encode_params(params)))
+
+
+def split_values(values: List[Any], max_length: int) -> List[List[Any]]:
+    """Split a list of filter values into chunks whose comma-separated
+    and URL-encoded form does not exceed ``max_length`` characters.
+
+    A single value longer than ``max_length`` gets its own chunk.
+    """
+    separator = len(quote_plus(","))
+    chunks: List[List[Any]] = []
+    current: List[Any] = []
+    length = 0
+    for value in values:
+        size = len(quote_plus(str(value)))
+        if current and length + separator + size > max_length:
+            chunks.append(current)
+            current = []
+            length = 0
+        length += size + (separator if current else 0)
+        current.append(value)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
 def json_iso_datetime(obj: Any) -> str:
     """JSON serializer for objects not serializable by default json code"""
     if isinstance(obj, (datetime, date)):
@@ -65,24 +177,105 @@ def json_iso_datetime(obj: Any) -> str:
 json_dumps = functools.partial(json.dumps, default=json_iso_datetime)
 
 
-def sort_records(records: List[dict], sort: str) -> List[dict]:
+# Order of values of different types, as in PostgreSQL ``jsonb`` comparisons.
+# Missing fields come last, like SQL ``NULL`` values.
+_TYPES_ORDER = {type(None): 0, str: 1, int: 2, float: 2, bool: 3, list: 4, dict: 5}
+_MISSING_ORDER = 6
+_MISSING = object()
+
+
+def _field_value(record: dict, field: str) -> Any:
+    if field in record:
+        return record[field]
+    value: Any = record
+    for subfield in field.split("."):
+        if not isinstance(value, dict) or subfield not in value:
+            return _MISSING
+        value = value[subfield]
+    return value
+
+
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    """Return a key to compare values of any type."""
+    if value is _MISSING:
+        return (_MISSING_ORDER, 0)
+    order = _TYPES_ORDER.get(type(value), _MISSING_ORDER)
+    if order in (0, _MISSING_ORDER):
+        return (order, 0)
+    if isinstance(value, (list, dict)):
+        return (order, json.dumps(value, sort_keys=True, default=json_iso_datetime))
+    return (order, value)
+
+
+def _parse_sort(sort: str) -> List[Tuple[str, bool]]:
+    """Return the list of (field, descending) tuples of a sort string."""
+    fields = [f.strip() for f in sort.split(",") if f.strip()]
+    return [(f[1:], True) if f.startswith("-") else (f, False) for f in fields]
+
+
+class _Descending:
+    """Invert the comparison of the wrapped value."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __eq__(self, other: Any) -> bool:
+        return self.value == other.value
+
+    def __lt__(self, other: Any) -> bool:
+        return other.value < self.value
+
+
+def sort_records(records: Iterable[dict], sort: str) -> List[dict]:
     """
     Sort records following the same format as the server ``name,-last_modified``.
+
+    Values of different types are ordered like the server does, and records
+    without the field come last (first when descending).
     """
+    result = list(records)
+    # Python sorts are stable: sort by each field, starting with the last one.
+    for field, descending in reversed(_parse_sort(sort)):
+        keys = _field_keys(result, field)
+        order = sorted(range(len(result)), key=keys.__getitem__, reverse=descending)
+        result = [result[i] for i in order]
+    return result
 
-    def reversed(way: int, value: Any) -> str:
-        if isinstance(value, (int, float)):
-            value = str(way * value).zfill(MAX_LENGTH_INT)
-        if isinstance(value, str):
-            return "".join(chr(255 - ord(c)) for c in value) if way < 0 else value
-        return str(value)
 
-    sort_fields = [
-        (-1, f.strip()[1:]) if f.startswith("-") else (1, f.strip()) for f in sort.split(",")
-    ]
-    return sorted(
-        records, key=lambda r: tuple(reversed(way, r.get(field)) for way, field in sort_fields)
-    )
+def _field_keys(records: List[dict], field: str) -> List[Any]:
+    """Return the sort keys of the field values for the specified records."""
+    if "." in field:
+        values = [_field_value(r, field) for r in records]
+    else:
+        values = [r.get(field, _MISSING) for r in records]
+    # Values of the same type are compared natively (common case).
+    types = set(map(type, values))
+    if types <= {int, float} or types == {str}:
+        return values
+    return [_sort_key(v) for v in values]
+
+
+def iter_sort_records(
+    records: Iterable[dict], sort: str, buffer_size: int = 100_000
+) -> Iterator[dict]:
+    """
+    Like :func:`sort_records`, for streams of records that may not fit in memory.
+
+    See :func:`external_sort`.
+    """
+    fields = _parse_sort(sort)
+
+    def key(record: dict) -> Tuple:
+        return tuple(
+            _Descending(_sort_key(_field_value(record, field)))
+            if descending
+            else _sort_key(_field_value(record, field))
+            for field, descending in fields
+        )
+
+    return external_sort(records, key=key, buffer_size=buffer_size)
 
 
 def records_equal(a: dict, b: dict) -> bool:
@@ -90,17 +283,138 @@ def records_equal(a: dict, b: dict) -> bool:
     Compare records attributes, ignoring those assigned automatically
     by the server.
     """
-    ignore_fields = ("last_modified", "schema")
-    ac = {k: v for k, v in a.items() if k not in ignore_fields}
-    bc = {k: v for k, v in b.items() if k not in ignore_fields}
+    ac = {k: v for k, v in a.items() if k not in IGNORED_FIELDS}
+    bc = {k: v for k, v in b.items() if k not in IGNORED_FIELDS}
     return ac == bc
 
 
+def record_digest(record: dict) -> bytes:
+    """
+    Return a digest of the record attributes, ignoring those assigned
+    automatically by the server. Equal records have equal digests.
+    """
+    content = {k: v for k, v in record.items() if k not in IGNORED_FIELDS}
+    canonical = json.dumps(
+        content, sort_keys=True, separators=(",", ":"), default=json_iso_datetime
+    )
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).digest()
+
+
+class RecordChange(NamedTuple):
+    """A change to apply on the destination records, as yielded by
+    :func:`iter_collection_diff`.
+    """
+
+    action: str  # "create", "update" or "delete"
+    id: Any
+    # The source record, for creations and updates.
+    record: Optional[dict]
+    # The timestamp of the destination record, for updates and deletions.
+    last_modified: Optional[int]
+
+
+def iter_collection_diff(
+    src: Iterable[dict],
+    dest: Iterable[dict],
+    *,
+    external: bool = False,
+    buffer_size: int = 100_000,
+) -> Iterator[RecordChange]:
+    """
+    Compare two streams of records, and yield the changes to apply on ``dest``
+    to make it identical to ``src``.
+
+    Records are compared using their digest, computed once. Only the digests
+    and timestamps of the destination records are kept in memory, and the source
+    records are streamed. With ``external=True``, both streams are sorted by ID
+    on disk (see :func:`external_sort`) and merged, hence the memory usage does
+    not depend on the number of records.
+
+    The input records are not modified.
+    """
+    if external:
+        yield from _sorted_collection_diff(src, dest, buffer_size)
+        return
+
+    dest_digests = {r["id"]: (record_digest(r), r.get("last_modified")) for r in dest}
+    for r in src:
+        existing = dest_digests.pop(r["id"], None)
+        if existing is None:
+            yield RecordChange("create", r["id"], r, None)
+        elif existing[0] != record_digest(r):
+            yield RecordChange("update", r["id"], r, existing[1])
+    for id, (_, last_modified) in dest_digests.items():
+        yield RecordChange("delete", id, None, last_modified)
+
+
+def _sorted_collection_diff(
+    src: Iterable[dict], dest: Iterable[dict], buffer_size: int
+) -> Iterator[RecordChange]:
+    def by_id(item: Tuple) -> str:
+        return str(item[0])
+
+    sorted_src = external_sort(((r["id"], r) for r in src), key=by_id, buffer_size=buffer_size)
+    sorted_dest = external_sort(
+        ((r["id"], record_digest(r), r.get("last_modified")) for r in dest),
+        key=by_id,
+        buffer_size=buffer_size,
+    )
+    source = next(sorted_src, None)
+    destination = next(sorted_dest, None)
+    while source is not None or destination is not None:
+        if destination is None or (source is not None and by_id(source) < by_id(destination)):
+            assert source is not None
+            yield RecordChange("create", source[0], source[1], None)
+            source = next(sorted_src, None)
+        elif source is None or by_id(destination) < by_id(source):
+            yield RecordChange("delete", destination[0], None, destination[2])
+            destination = next(sorted_dest, None)
+        else:
+            if record_digest(source[1]) != destination[1]:
+                yield RecordChange("update", source[0], source[1], destination[2])
+            source = next(sorted_src, None)
+            destination = next(sorted_dest, None)
+
+
+def external_sort(
+    items: Iterable[T], key: Callable[[T], Any], buffer_size: int = 100_000
+) -> Iterator[T]:
+    """
+    Sort items that may not fit in memory.
+
+    Sorted runs of ``buffer_size`` items are written to temporary files,
+    and then merged lazily.
+    """
+    runs: List[IO[bytes]] = []
+
+    def read(run: IO[bytes]) -> Iterator[T]:
+        run.seek(0)
+        while True:
+            try:
+                yield pickle.load(run)
+            except EOFError:
+                return
+
+    try:
+        for chunk in ichunks(items, buffer_size):
+            chunk.sort(key=key)
+            run = tempfile.TemporaryFile()
+            runs.append(run)
+            for item in chunk:
+                pickle.dump(item, run, protocol=pickle.HIGHEST_PROTOCOL)
+        yield from heapq.merge(*[read(run) for run in runs], key=key)
+    finally:
+        for run in runs:
+            run.close()
+
+
 def collection_diff(
     src: Iterable[dict], dest: Iterable[dict]
 ) -> Tuple[List[dict], List[Tuple[dict, dict]], List[dict]]:
     """
     Compare two lists of records.
+
+    See :func:`iter_collection_diff` for large collections.
     """
     dest_by_id = {r["id"]: r for r in dest}
     to_create: List[dict] = []
@@ -110,15 +424,116 @@ def collection_diff(
         if record is None:
             to_create.append(r)
         elif not records_equal(r, record):
-            r.pop("last_modified", None)
-            to_update.append((record, r))
+            new = {k: v for k, v in r.items() if k != "last_modified"}
+            to_update.append((record, new))
     to_delete = list(dest_by_id.values())
     return to_create, to_update, to_delete
 
 
-def compute_sha256(filepath: str) -> str:
-    """Compute SHA-256 hash of specified file."""
-    with open(filepath, "rb") as f:
-        binary = f.read()
-    h = hashlib.sha256(binary)
+def compute_sha256(filepath: str, chunk_size: int = 1024 * 1024) -> str:
+    """Compute SHA-256 hash of specified file, reading it by chunks."""
+    h = hashlib.sha256()
+    hash_file(h, filepath, chunk_size)
     return h.hexdigest()
+
+
+def hash_file(h: Any, filepath: str, chunk_size: int = 1024 * 1024) -> None:
+    """Update the ``hashlib`` object with the content of the file, read by chunks."""
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(filepath, "rb", buffering=0) as f:
+        while size := f.readinto(buffer):
+            h.update(view[:size])
+
+
+def parse_content_range(value: str) -> Tuple[Optional[int], Optional[int]]:
+    """Return the first byte and the total length of a ``Content-Range`` header
+    (eg. ``bytes 10-99/100`` or ``bytes */100``), ``None`` when unknown.
+    """
+    match = re.match(r"bytes (?:(\d+)-\d+|\*)/(\d+|\*)$", value.strip())
+    if match is None:
+        return None, None
+    start, total = match.groups()
+    return (
+        int(start) if start is not None else None,
+        int(total) if total != "*" else None,
+    )
+
+
+def _quote_multipart_param(value: str) -> str:
+    # Same escaping as browsers (and ``urllib3``) for names and filenames.
+    return value.translate(
+        {ord('"'): "%22", ord("\\"): "\\\\", ord("\r"): "%0D", ord("\n"): "%0A"}
+    )
+
+
+class MultipartEncoder(object):
+    """Streaming ``multipart/form-data`` request body.
+
+    Files are read by chunks while the body is being sent, instead of being loaded
+    in memory. The body can be iterated several times (eg. if the request is retried),
+    the files are read again from their initial position.
+
+    :param files:
+        A list of ``(name, (filename, fileobj, mimetype))`` tuples, like the
+        ``files`` parameter of ``requests``.
+    :param fields:
+        The form fields, sent before the files.
+    """
+
+    def __init__(
+        self,
+        files: List[Tuple[str, Tuple[str, IO[bytes], Optional[str]]]],
+        fields: Optional[Dict[str, Any]] = None,
+        chunk_size: int = ATTACHMENT_CHUNK_SIZE,
+    ):
+        self.files = files
+        self.fields = dict(fields or {})
+        self.chunk_size = chunk_size
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self._offsets: Dict[int, int] = {}
+
+    def _segments(self) -> Iterator[Any]:
+        """Yield the parts of the body, either bytes or ``(fileobj, start, end)``."""
+        for name, value in self.fields.items():
+            if not isinstance(value, str):
+                value = json_dumps(value)
+            yield (
+                f"--{self.boundary}\r\n"
+                f'Content-Disposition: form-data; name="{_quote_multipart_param(name)}"\r\n\r\n'
+                f"{value}\r\n"
+            ).encode("utf-8")
+        for name, (filename, fileobj, mimetype) in self.files:
+            header = (
+                f"--{self.boundary}\r\n"
+                f'Content-Disposition: form-data; name="{_quote_multipart_param(name)}"; '
+                f'filename="{_quote_multipart_param(filename)}"\r\n'
+            )
+            if mimetype:
+                header += f"Content-Type: {mimetype}\r\n"
+            yield (header + "\r\n").encode("utf-8")
+            start = self._offsets.setdefault(id(fileobj), fileobj.tell())
+            end = fileobj.seek(0, os.SEEK_END)
+            yield fileobj, start, end
+            yield b"\r\n"
+        yield f"--{self.boundary}--\r\n".encode("utf-8")
+
+    def __len__(self) -> int:
+        # Let ``requests`` send a ``Content-Length`` instead of a chunked body.
+        return sum(
+            len(segment) if isinstance(segment, bytes) else segment[2] - segment[1]
+            for segment in self._segments()
+        )
+
+    def __iter__(self) -> Iterator[bytes]:
+        for segment in self._segments():
+            if isinstance(segment, bytes):
+                yield segment
+                continue
+            fileobj, start, end = segment
+            fileobj.seek(start)
+            remaining = end - start
+            while remaining > 0 and (chunk := fileobj.read(min(self.chunk_size, remaining))):
+                remaining -= len(chunk)
+                yield chunk
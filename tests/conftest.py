@@ -19,6 +19,13 @@ from .support import create_user, get_200, get_503, mock_response
 def mocked_session(mocker: MockerFixture):
     session = mocker.MagicMock()
     session.dry_mode = False
+    session.rate_limiter = None
+    session.backoff_mode = "raise"
+    session.retry_policy = None
+    session.circuit_breaker = None
+    session.hedging = None
+    session.read_replicas = None
+    session.connection_pools = None
     return session
 
 
@@ -1,5 +1,8 @@
+import asyncio
 import os
 import re
+import threading
+import time
 from unittest import mock
 
 import pytest
@@ -1277,7 +1280,7 @@ async def test_download_attachment(async_client_setup: Client, mocker: MockerFix
     with pytest.raises(ValueError):
         await client.download_attachment({})
 
-    record = {"attachment": {"location": "file.bin", "filename": "local.bin", "size": 42}}
+    record = {"attachment": {"location": "file.bin", "filename": "local.bin", "size": 18}}
 
     path = await client.download_attachment(record)
     assert path == "local.bin"
@@ -1288,6 +1291,117 @@ async def test_download_attachment(async_client_setup: Client, mocker: MockerFix
     assert os.path.exists("/tmp/local.bin")
 
 
+async def test_download_attachment_does_not_block_the_event_loop(
+    async_client_setup: Client, mocker: MockerFixture, tmp_path
+):
+    client = async_client_setup
+    client.session.request.return_value = (
+        {"capabilities": {"attachments": {"base_url": "https://cdn/"}}},
+        {},
+    )
+    ticks = []
+
+    def slow_body(**kwargs):
+        time.sleep(0.2)
+        yield b"hello"
+
+    mock_response = mocker.MagicMock()
+    mock_response.iter_content.side_effect = slow_body
+    client.session._session.request.return_value.__enter__.return_value = mock_response
+    record = {"attachment": {"location": "file.bin", "filename": "file.bin", "size": 5}}
+
+    async def tick():
+        for _ in range(5):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    started = time.monotonic()
+    await asyncio.gather(client.download_attachment(record, filepath=str(tmp_path)), tick())
+
+    assert (tmp_path / "file.bin").read_bytes() == b"hello"
+    assert ticks[-1] - started < 0.2
+
+
+async def test_download_attachments_limits_concurrency(
+    async_client_setup: Client, mocker: MockerFixture, tmp_path
+):
+    client = async_client_setup
+    client.session.request.return_value = (
+        {"capabilities": {"attachments": {"base_url": "https://cdn/"}}},
+        {},
+    )
+    lock = threading.Lock()
+    running = [0]
+    max_running = [0]
+
+    def body(**kwargs):
+        with lock:
+            running[0] += 1
+            max_running[0] = max(max_running[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+        yield b"chunk"
+
+    mock_response = mocker.MagicMock()
+    mock_response.iter_content.side_effect = body
+    client.session._session.request.return_value.__enter__.return_value = mock_response
+    records = [
+        {"id": f"r{i}", "attachment": {"location": f"f{i}.bin", "filename": f"f{i}.bin"}}
+        for i in range(8)
+    ]
+
+    report = await client.download_attachments(records, str(tmp_path / "dest"), workers=2)
+
+    client.session.request.assert_called_once_with("get", "/")
+    assert [f["id"] for f in report["files"]] == [f"r{i}" for i in range(8)]
+    assert report["size"] == 8 * 5
+    assert max_running[0] == 2
+    assert (tmp_path / "dest" / "f7.bin").read_bytes() == b"chunk"
+
+
+async def test_download_attachments_with_the_same_filename(
+    async_client_setup: Client, mocker: MockerFixture, tmp_path
+):
+    client = async_client_setup
+    client.session.request.return_value = (
+        {"capabilities": {"attachments": {"base_url": "https://cdn/"}}},
+        {},
+    )
+    lock = threading.Lock()
+    downloading = set()
+    overlaps = []
+
+    def request(method, url, **kwargs):
+        def body(**kwargs):
+            with lock:
+                if url in downloading:
+                    overlaps.append(url)
+                downloading.add(url)
+            time.sleep(0.02)
+            yield b"chunk"
+            with lock:
+                downloading.discard(url)
+
+        response = mocker.MagicMock(status_code=200)
+        response.iter_content.side_effect = body
+        context = mocker.MagicMock()
+        context.__enter__.return_value = response
+        return context
+
+    client.session._session.request.side_effect = request
+    records = [
+        {"id": f"r{i}", "attachment": {"location": "same.bin", "filename": "same.bin"}}
+        for i in range(3)
+    ]
+
+    report = await client.download_attachments(records, str(tmp_path), workers=3)
+
+    assert overlaps == []
+    assert [f["id"] for f in report["files"]] == ["r0", "r1", "r2"]
+    assert (tmp_path / "same.bin").read_bytes() == b"chunk"
+
+
 async def test_add_attachment_guesses_mimetype(async_client_setup: Client, tmp_path):
     client = async_client_setup
     mock_response(client.session)
@@ -1305,5 +1419,88 @@ async def test_add_attachment_guesses_mimetype(async_client_setup: Client, tmp_p
             "/buckets/a/collections/b/records/abc/attachment",
             data=None,
             permissions=None,
-            files=[("attachment", ("file.txt", mock_file.return_value, "text/plain"))],
+            files=mock.ANY,
         )
+        body = client.session.request.call_args[1]["files"]
+        assert body.files == [("attachment", ("file.txt", mock_file.return_value, "text/plain"))]
+
+
+async def test_rate_limiter_waits_on_the_event_loop(mocker: MockerFixture):
+    requests_mock = mocker.patch("kinto_http.session.requests.Session").return_value
+    requests_mock.request.return_value.status_code = 200
+    requests_mock.request.return_value.headers = {}
+    requests_mock.request.return_value.json.return_value = {"data": {"id": "a"}}
+    client = Client(server_url=SERVER_URL, bucket="b", collection="c", rate_limit=10)
+    acquire_async = mocker.spy(client.session.rate_limiter, "acquire_async")
+    sleep = mocker.patch("kinto_http.ratelimit.time.sleep")
+
+    await asyncio.gather(*(client.get_record(id="a") for _ in range(3)))
+
+    assert acquire_async.call_count == 3
+    assert not sleep.called
+
+
+async def test_rate_limit_tokens_are_only_taken_for_requests(mocker: MockerFixture):
+    requests_mock = mocker.patch("kinto_http.session.requests.Session").return_value
+    requests_mock.request.return_value.status_code = 200
+    requests_mock.request.return_value.headers = {"ETag": '"42"'}
+    requests_mock.request.return_value.json.return_value = {}
+    client = Client(server_url=SERVER_URL, bucket="b", collection="c", rate_limit=1)
+    acquire_async = mocker.spy(client.session.rate_limiter, "acquire_async")
+    bucket = client.session.rate_limiter.bucket(SERVER_URL)
+
+    # No request is sent when called.
+    assert await client.get_endpoint("bucket") == "/buckets/b"
+    await client.get_paginated_records()
+    assert acquire_async.call_count == 0
+
+    # The token is given back if the result is cached.
+    assert await client.get_records_timestamp() == "42"
+    assert await client.get_records_timestamp() == "42"
+    assert acquire_async.call_count == 2
+    assert requests_mock.request.call_count == 1
+    assert bucket.reserve() == 0
+
+
+async def test_bulk_operations_are_asynchronous_iterators(async_client_setup: Client):
+    client = async_client_setup
+    client._server_settings = {"batch_max_requests": 2}
+    threads = set()
+
+    def batch_response(method, endpoint, payload, **kwargs):
+        threads.add(threading.current_thread())
+        return {"responses": [{"status": 201, "body": r["body"]} for r in payload["requests"]]}, {}
+
+    client.session.request.side_effect = batch_response
+
+    results = client.create_records(
+        [{"id": "a"}, {"id": "b"}, {"id": "c"}], bucket="mozilla", collection="test"
+    )
+
+    assert [r["body"]["data"]["id"] async for r in results] == ["a", "b", "c"]
+    # The batches are not sent from the event loop.
+    assert threading.current_thread() not in threads
+    assert client.session.request.call_count == 2
+
+
+@pytest.mark.parametrize(
+    "method,items",
+    [
+        ("update_records", [{"id": "a"}]),
+        ("patch_records", [{"id": "a"}]),
+        ("delete_records_by_id", ["a"]),
+    ],
+)
+async def test_bulk_operations_can_be_interrupted(async_client_setup: Client, method, items):
+    client = async_client_setup
+    client._server_settings = {"batch_max_requests": 1}
+    client.session.request.return_value = ({"responses": [{"status": 200, "body": {}}]}, {})
+
+    results = getattr(client, method)(items * 5, bucket="mozilla", collection="test", workers=2)
+    async for result in results:
+        assert result["status"] == 200
+        break
+    await results.aclose()
+
+    # Only the batches sent ahead of the first result.
+    assert client.session.request.call_count == 2
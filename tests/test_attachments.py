@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+
+from pytest_mock.plugin import MockerFixture
+
+from kinto_http import attachments, utils
+
+
+def test_hash_cache_computes_and_stores_hashes(tmp_path):
+    filepath = tmp_path / "file.bin"
+    filepath.write_bytes(b"aaa")
+    cache_path = str(tmp_path / "hashes.json")
+
+    cache = attachments.HashCache(cache_path)
+    assert cache.sha256(str(filepath)) == hashlib.sha256(b"aaa").hexdigest()
+    cache.save()
+
+    with open(cache_path) as f:
+        entries = json.load(f)
+    assert entries[str(filepath)][2] == hashlib.sha256(b"aaa").hexdigest()
+
+
+def test_hash_cache_does_not_reread_unchanged_files(tmp_path, mocker: MockerFixture):
+    filepath = tmp_path / "file.bin"
+    filepath.write_bytes(b"aaa")
+    cache_path = str(tmp_path / "hashes.json")
+    cache = attachments.HashCache(cache_path)
+    cache.sha256(str(filepath))
+    cache.save()
+
+    compute = mocker.spy(utils, "compute_sha256")
+    cache = attachments.HashCache(cache_path)
+    assert cache.sha256(str(filepath)) == hashlib.sha256(b"aaa").hexdigest()
+    compute.assert_not_called()
+
+    filepath.write_bytes(b"bbbb")
+    assert cache.sha256(str(filepath)) == hashlib.sha256(b"bbbb").hexdigest()
+    compute.assert_called_once()
+
+
+def test_hash_cache_ignores_corrupted_file(tmp_path):
+    cache_path = tmp_path / "hashes.json"
+    cache_path.write_text("{not json")
+
+    cache = attachments.HashCache(str(cache_path))
+    cache.save()  # Nothing changed.
+
+    assert cache_path.read_text() == "{not json"
+
+
+def test_compute_sha256_many(tmp_path):
+    filepaths = []
+    for i in range(5):
+        filepath = str(tmp_path / f"file{i}.bin")
+        with open(filepath, "wb") as f:
+            f.write(os.urandom(100))
+        filepaths.append(filepath)
+    cache = attachments.HashCache(str(tmp_path / "hashes.json"))
+
+    for hash_cache in (None, cache):
+        hashes = attachments.compute_sha256_many(filepaths, workers=2, hash_cache=hash_cache)
+        assert hashes == {f: utils.compute_sha256(f) for f in filepaths}
+
+
+def test_hash_cache_set_stores_known_hash(tmp_path, mocker: MockerFixture):
+    filepath = tmp_path / "file.bin"
+    filepath.write_bytes(b"aaa")
+    cache = attachments.HashCache(str(tmp_path / "hashes.json"))
+    compute = mocker.spy(utils, "compute_sha256")
+
+    cache.set(str(filepath), "abc")
+
+    assert cache.sha256(str(filepath)) == "abc"
+    compute.assert_not_called()
+
+
+def test_attachment_cache_add_and_get(tmp_path):
+    filepath = tmp_path / "file.bin"
+    filepath.write_bytes(b"aaa")
+    sha256 = hashlib.sha256(b"aaa").hexdigest()
+    cache = attachments.AttachmentCache(str(tmp_path / "cache"))
+
+    assert not cache.get(sha256, str(tmp_path / "other.bin"))
+    cache.add(sha256, str(filepath))
+    assert cache.size == 3
+
+    assert cache.get(sha256, str(tmp_path / "other.bin"))
+    assert (tmp_path / "other.bin").read_bytes() == b"aaa"
+    assert os.path.exists(tmp_path / "cache" / sha256[:2] / sha256)
+
+
+def test_attachment_cache_copies_if_hard_links_fail(tmp_path, mocker: MockerFixture):
+    mocker.patch("os.link", side_effect=OSError("Cross-device link"))
+    filepath = tmp_path / "file.bin"
+    filepath.write_bytes(b"aaa")
+    sha256 = hashlib.sha256(b"aaa").hexdigest()
+    cache = attachments.AttachmentCache(str(tmp_path / "cache"))
+
+    cache.add(sha256, str(filepath))
+    assert cache.get(sha256, str(tmp_path / "other.bin"))
+
+    assert (tmp_path / "other.bin").read_bytes() == b"aaa"
+    assert os.stat(tmp_path / "other.bin").st_ino != os.stat(filepath).st_ino
+
+
+def test_attachment_cache_evicts_least_recently_used(tmp_path):
+    cache = attachments.AttachmentCache(str(tmp_path / "cache"), max_size=10)
+    hashes = []
+    for i, content in enumerate([b"a" * 4, b"b" * 4, b"c" * 4]):
+        filepath = tmp_path / f"file{i}.bin"
+        filepath.write_bytes(content)
+        sha256 = hashlib.sha256(content).hexdigest()
+        cache.add(sha256, str(filepath))
+        os.utime(f"{cache._path(sha256)}.used", (i, i))
+        hashes.append(sha256)
+        if i == 1:
+            # Use the first file, the second one becomes the oldest.
+            assert cache.get(hashes[0], str(tmp_path / "copy.bin"))
+            os.utime(f"{cache._path(hashes[0])}.used", (10, 10))
+
+    assert cache.size == 8
+    assert cache.get(hashes[0], str(tmp_path / "copy.bin"))
+    assert not cache.get(hashes[1], str(tmp_path / "copy.bin"))
+    assert cache.get(hashes[2], str(tmp_path / "copy.bin"))
+
+
+def test_attachment_cache_does_not_touch_the_linked_files(tmp_path, mocker: MockerFixture):
+    filepath = tmp_path / "file.bin"
+    filepath.write_bytes(b"aaa")
+    os.utime(filepath, ns=(1000, 1000))
+    sha256 = hashlib.sha256(b"aaa").hexdigest()
+    cache = attachments.AttachmentCache(str(tmp_path / "cache"))
+    hash_cache = attachments.HashCache(str(tmp_path / "hashes.json"))
+
+    cache.add(sha256, str(filepath))
+    hash_cache.sha256(str(filepath))
+    assert cache.get(sha256, str(tmp_path / "other.bin"))
+    cache.add(sha256, str(tmp_path / "other.bin"))
+
+    assert os.stat(filepath).st_mtime_ns == 1000
+    assert os.stat(tmp_path / "other.bin").st_mtime_ns == 1000
+    # The hashes of the linked files remain valid.
+    compute = mocker.spy(utils, "compute_sha256")
+    assert hash_cache.sha256(str(filepath)) == sha256
+    compute.assert_not_called()
+
+
+def test_attachment_cache_add_marks_existing_files_as_used(tmp_path):
+    filepath = tmp_path / "file.bin"
+    filepath.write_bytes(b"aaa")
+    sha256 = hashlib.sha256(b"aaa").hexdigest()
+    cache = attachments.AttachmentCache(str(tmp_path / "cache"))
+    cache.add(sha256, str(filepath))
+    used = f"{cache._path(sha256)}.used"
+    os.utime(used, (0, 0))
+
+    cache.add(sha256, str(filepath))
+
+    assert cache.size == 3
+    assert os.stat(used).st_mtime > 0
+
+
+def test_attachment_cache_evicts_files_without_last_use_first(tmp_path):
+    cache = attachments.AttachmentCache(str(tmp_path / "cache"), max_size=6)
+    hashes = []
+    for i, content in enumerate([b"a" * 4, b"b" * 4]):
+        filepath = tmp_path / f"file{i}.bin"
+        filepath.write_bytes(content)
+        os.utime(filepath, (0, 0))
+        sha256 = hashlib.sha256(content).hexdigest()
+        cache.add(sha256, str(filepath))
+        if i == 0:
+            # Cached before the last use was tracked.
+            os.remove(f"{cache._path(sha256)}.used")
+        hashes.append(sha256)
+
+    assert cache.size == 4
+    assert not os.path.exists(cache._path(hashes[0]))
+    assert os.path.exists(cache._path(hashes[1]))
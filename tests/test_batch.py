@@ -20,6 +20,7 @@ def test_send_adds_data_attribute(batch_setup: Client):
     batch_setup.session.request.assert_called_with(
         method="POST",
         endpoint=batch_setup.endpoints.get("batch"),
+        idempotent=True,
         payload={
             "requests": [
                 {"method": "GET", "path": "/foobar/baz", "body": {"data": {"foo": "bar"}}}
@@ -36,6 +37,7 @@ def test_send_adds_permissions_attribute(batch_setup: Client, mocker: MockerFixt
     batch_setup.session.request.assert_called_with(
         method="POST",
         endpoint=batch_setup.endpoints.get("batch"),
+        idempotent=True,
         payload={
             "requests": [
                 {
@@ -56,6 +58,7 @@ def test_send_adds_headers_if_specified(batch_setup: Client):
     batch_setup.session.request.assert_called_with(
         method="POST",
         endpoint=batch_setup.endpoints.get("batch"),
+        idempotent=True,
         payload={
             "requests": [
                 {"method": "GET", "path": "/foobar/baz", "headers": {"Foo": "Bar"}, "body": {}}
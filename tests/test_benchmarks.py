@@ -0,0 +1,132 @@
+import time
+
+import pytest
+import requests
+
+from benchmarks import latency, run
+from benchmarks.server import Faults, Store, running_server
+from kinto_http import Client, KintoException
+from kinto_http.replication import replicate
+
+
+@pytest.fixture
+def store():
+    store = Store()
+    for i in range(25):
+        store.put_record("bid", "cid", {"id": f"r{i}", "i": i})
+    return store
+
+
+@pytest.fixture
+def client(store):
+    with running_server(store=store, page_size=10, batch_max_requests=5) as server:
+        yield Client(server_url=server.url, bucket="bid", collection="cid")
+
+
+def test_stand_in_server_paginates_records(client):
+    assert len(client.get_records()) == 25
+    assert len(list(client.get_paginated_records())) == 3
+
+
+def test_stand_in_server_returns_changes_since_timestamp(client):
+    timestamp = client.get_records_timestamp()
+    client.delete_record(id="r0")
+    client.update_record(id="r1", data={"i": 42})
+
+    changes = client.get_records(_since=timestamp)
+
+    assert [(r["id"], r.get("deleted", False)) for r in changes] == [
+        ("r1", False),
+        ("r0", True),
+    ]
+
+
+def test_stand_in_server_supports_batches_and_replication(client):
+    dest = client.clone(collection="dest")
+    replicate(client, dest)
+    assert len(dest.get_records()) == 25
+
+    with pytest.raises(KintoException):
+        dest.create_record(id="r0", data={}, if_not_exists=False)
+
+
+def test_create_records_benchmark_creates_the_records(client):
+    options = run.get_arguments(["--records", "30", "--workers", "2"])
+
+    assert run.bench_create_records(client, options) == run.Measure(30, 0)
+
+
+def test_stand_in_server_serves_attachments(store, client, tmp_path):
+    store.add_attachment("bid", "cid", "r0", "file.bin", b"abc" * 1000)
+
+    path = client.download_attachment(client.get_record(id="r0")["data"], filepath=str(tmp_path))
+
+    assert open(path, "rb").read() == b"abc" * 1000
+
+
+def test_compare_reports_regressions():
+    baselines = {"results": {"get_records": {"ops_per_sec": 100, "rss_growth_mb": 1}}}
+    results = {
+        "get_records": {"ops_per_sec": 70, "rss_growth_mb": 20},
+        "batch": {"ops_per_sec": 1, "rss_growth_mb": 0},
+    }
+
+    regressions = run.compare(results, baselines, tolerance=0.25)
+
+    assert len(regressions) == 2
+    assert run.compare(results, baselines, tolerance=0.5) == [
+        "get_records: RSS grew by 20.0 MB (baseline 1.0 MB)"
+    ]
+
+
+@pytest.mark.parametrize("faults,status", [(Faults(errors=1), 503), (Faults(throttles=1), 429)])
+def test_stand_in_server_injects_error_responses(store, faults, status):
+    with running_server(store=store, faults=faults) as server:
+        client = Client(server_url=server.url, bucket="bid", collection="cid")
+        with pytest.raises(KintoException) as e:
+            client.get_record(id="r0")
+
+    assert e.value.response.status_code == status
+    assert e.value.response.headers["Retry-After"] == "1"
+
+
+def test_stand_in_server_drops_connections(store):
+    with running_server(store=store, faults=Faults(drops=1)) as server:
+        client = Client(server_url=server.url)
+        with pytest.raises(requests.exceptions.ConnectionError):
+            client.session.request("get", "/")
+
+
+def test_stand_in_server_sends_backoff_headers(store):
+    with running_server(store=store, faults=Faults(backoffs=1, backoff=30)) as server:
+        client = Client(server_url=server.url, bucket="bid", collection="cid")
+        client.get_record(id="r0")
+
+    assert client.session.backoff > time.time() + 20
+
+
+def test_stand_in_server_delays_and_throttles_responses(store):
+    faults = Faults(rtt=0.05, jitter=0.01, bandwidth=100_000)
+    store.add_attachment("bid", "cid", "r0", "file.bin", b"a" * 10_000)
+    with running_server(store=store, faults=faults) as server:
+        url = server.url.replace("/v1", "/attachments/bid/cid/r0/file.bin")
+        started = time.perf_counter()
+        response = requests.get(url)
+
+    assert time.perf_counter() - started >= 0.05 + 0.1
+    assert len(response.content) == 10_000
+
+
+def test_percentile():
+    values = [float(i) for i in range(1, 101)]
+    assert latency.percentile(values, 50) == 50
+    assert latency.percentile(values, 99) == 99
+    assert latency.percentile([3.0], 99) == 3
+
+
+def test_latency_benchmark_reports_each_mode(capsys):
+    options = latency.get_arguments(["--requests", "5", "--records", "10", "--rtt", "0"])
+    latency.run_all(options)
+
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split()[0] for line in lines] == ["mode", "sync", "threads", "async"]
@@ -0,0 +1,204 @@
+import time
+from typing import Tuple
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+from pytest_mock import MockerFixture
+
+from benchmarks.server import Faults, Store, running_server
+from kinto_http import CircuitOpenException, Client
+from kinto_http.circuitbreaker import Circuit, CircuitBreaker
+from kinto_http.retry import RetryPolicy
+from kinto_http.session import Session
+
+from .support import get_200, get_503
+
+
+@pytest.fixture
+def clock(mocker: MockerFixture):
+    now = [1000.0]
+    mocker.patch("kinto_http.circuitbreaker.time.monotonic", side_effect=lambda: now[0])
+    return now
+
+
+def test_circuit_opens_after_consecutive_failures(clock):
+    circuit = Circuit(failures=3, reset_timeout=10, half_open_requests=1)
+
+    assert [circuit.failure(), circuit.failure(), circuit.success()] == [None, None, None]
+    assert [circuit.failure(), circuit.failure()] == [None, None]
+    assert circuit.failure() == "open"
+
+    clock[0] += 4
+    with pytest.raises(CircuitOpenException) as excinfo:
+        circuit.acquire()
+    assert excinfo.value.retry_after == 6
+
+
+def test_half_open_circuit_lets_probes_through(clock):
+    circuit = Circuit(failures=1, reset_timeout=10, half_open_requests=2)
+    circuit.failure()
+    clock[0] += 10
+
+    assert circuit.acquire() == "half_open"
+    assert circuit.acquire() is None
+    with pytest.raises(CircuitOpenException):
+        circuit.acquire()
+
+    circuit.release()
+    assert circuit.acquire() is None
+    assert circuit.success() == "closed"
+    assert circuit.acquire() is None
+
+
+def test_failed_probe_opens_the_circuit_again(clock):
+    circuit = Circuit(failures=5, reset_timeout=10, half_open_requests=1)
+    for _ in range(5):
+        circuit.failure()
+    clock[0] += 10
+    circuit.acquire()
+
+    assert circuit.failure() == "open"
+    with pytest.raises(CircuitOpenException):
+        circuit.acquire()
+
+
+def test_late_responses_do_not_close_an_open_circuit():
+    circuit = Circuit(failures=1, reset_timeout=10, half_open_requests=1)
+    circuit.failure()
+
+    assert circuit.success() is None
+    assert circuit.state == "open"
+
+
+def test_late_failures_do_not_reopen_an_open_circuit(clock):
+    circuit = Circuit(failures=1, reset_timeout=10, half_open_requests=1)
+    circuit.failure()
+    clock[0] += 5
+
+    assert circuit.failure() is None
+    assert circuit.failures == 1
+    with pytest.raises(CircuitOpenException) as excinfo:
+        circuit.acquire()
+    assert excinfo.value.retry_after == 5
+
+
+def test_breaker_has_a_circuit_per_server():
+    breaker = CircuitBreaker()
+
+    assert breaker.circuit("https://a.com/v1/") is breaker.circuit("https://a.com/v1/buckets")
+    assert breaker.circuit("https://a.com/v1/") is not breaker.circuit("https://b.com/v1/")
+
+
+def test_breaker_settings_must_be_positive():
+    with pytest.raises(ValueError):
+        CircuitBreaker(failures=0)
+
+
+def test_session_rejects_requests_while_the_circuit_is_open(
+    session_setup: Tuple[MagicMock, Session],
+):
+    requests_mock, _ = session_setup
+    requests_mock.request.side_effect = requests.exceptions.ConnectionError()
+    session = Session(
+        "https://example.org", circuit_breaker=2, retry_policy=RetryPolicy(network_retries=0)
+    )
+    events = []
+    session.add_listener(events.append)
+
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            session.request("get", "/test")
+    with pytest.raises(CircuitOpenException):
+        session.request("get", "/test")
+
+    assert requests_mock.request.call_count == 2
+    states = [e.attributes for e in events if e.name == "circuit.state"]
+    assert states == [{"url": "https://example.org", "state": "open", "failures": 2}]
+    assert events[-1].name == "circuit.reject"
+
+
+def test_server_errors_open_the_circuit_and_stop_retries(
+    session_setup: Tuple[MagicMock, Session], mocker: MockerFixture
+):
+    requests_mock, _ = session_setup
+    mocker.patch("kinto_http.session.time.sleep")
+    requests_mock.request.side_effect = [get_503()] * 5
+    session = Session("https://example.org", retry=4, circuit_breaker=CircuitBreaker(failures=2))
+
+    with pytest.raises(CircuitOpenException):
+        session.request("get", "/test")
+
+    assert requests_mock.request.call_count == 2
+
+
+def test_client_errors_do_not_open_the_circuit(session_setup: Tuple[MagicMock, Session]):
+    requests_mock, _ = session_setup
+    requests_mock.request.return_value = get_200()
+    requests_mock.request.return_value.status_code = 404
+    session = Session("https://example.org", circuit_breaker=1)
+
+    for _ in range(3):
+        with pytest.raises(Exception, match="404"):
+            session.request("get", "/test")
+
+    assert session.circuit_breaker.circuit("https://example.org").state == "closed"
+
+
+def test_invalid_probes_are_released(session_setup: Tuple[MagicMock, Session], clock):
+    requests_mock, _ = session_setup
+    requests_mock.request.side_effect = [
+        requests.exceptions.ConnectionError(),
+        requests.exceptions.InvalidURL(),
+        get_200(),
+    ]
+    session = Session(
+        "https://example.org",
+        circuit_breaker=CircuitBreaker(failures=1, reset_timeout=10),
+        retry_policy=RetryPolicy(network_retries=0),
+    )
+    with pytest.raises(requests.exceptions.ConnectionError):
+        session.request("get", "/test")
+    clock[0] += 10
+
+    # Neither a success nor a failure: another probe can be sent.
+    with pytest.raises(requests.exceptions.InvalidURL):
+        session.request("get", "/test")
+    session.request("get", "/test")
+
+    assert session.circuit_breaker.circuit("https://example.org").state == "closed"
+
+
+def test_clones_share_the_circuit_breaker():
+    client = Client(server_url="https://example.org/v1", circuit_breaker=3)
+
+    clone = client.clone(server_url="https://other.org/v1")
+
+    assert clone.session.circuit_breaker is client.session.circuit_breaker
+
+
+def test_circuit_against_a_server_switched_off():
+    store = Store()
+    store.put_record("bid", "cid", {"id": "r0"})
+    breaker = CircuitBreaker(failures=4, reset_timeout=0.2)
+    with running_server(store=store) as server:
+        client = Client(
+            server_url=server.url, bucket="bid", collection="cid", circuit_breaker=breaker
+        )
+        assert len(client.get_records()) == 1
+
+        # Switch off: connections are closed without response.
+        server.faults = Faults(drops=1)
+        for _ in range(2):
+            with pytest.raises(requests.exceptions.ConnectionError):
+                client.get_records()  # Retried once: two failures.
+        started = time.monotonic()
+        with pytest.raises(CircuitOpenException):
+            client.get_records()
+        assert time.monotonic() - started < 0.1
+
+        # Switch on: the probe closes the circuit.
+        server.faults = Faults()
+        time.sleep(0.2)
+        assert len(client.get_records()) == 1
+        assert breaker.circuit(server.url).state == "closed"
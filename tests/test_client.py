@@ -1,19 +1,26 @@
+import hashlib
+import json
 import os
 import re
 import tempfile
+import time
 from unittest.mock import mock_open, patch
+from urllib.parse import urlencode
 
 import pytest
 from pytest_mock.plugin import MockerFixture
 
 from kinto_http import (
+    AttachmentIntegrityError,
     BearerTokenAuth,
     BucketNotFound,
     Client,
     KintoBatchException,
     KintoException,
     create_session,
+    utils,
 )
+from kinto_http.attachments import AttachmentCache
 from kinto_http.constants import DO_NOT_OVERWRITE, SERVER_URL
 from kinto_http.patch_type import JSONPatch, MergePatch
 
@@ -286,6 +293,18 @@ def test_client_clone_with_server_url(client_setup: Client):
     assert client.collection_name == client_clone.collection_name
 
 
+def test_client_clone_shares_the_rate_limiter():
+    client = Client(server_url="https://example.org/v1", rate_limit=10)
+    client_clone = client.clone(auth=("reviewer", ""))
+    assert client_clone.session.rate_limiter is client.session.rate_limiter
+
+
+def test_client_clone_keeps_the_backoff_mode():
+    client = Client(server_url="https://example.org/v1", backoff_mode="wait")
+    client_clone = client.clone(auth=("reviewer", ""))
+    assert client_clone.session.backoff_mode == "wait"
+
+
 def test_client_clone_with_new_session(client_setup: Client):
     client = client_setup
     session = create_session(auth=("reviewer", ""), server_url=SERVER_URL)
@@ -1437,7 +1456,7 @@ def test_download_attachment(client_setup: Client, mocker: MockerFixture, delete
     with pytest.raises(ValueError):
         client.download_attachment({})
 
-    record = {"attachment": {"location": "file.bin", "size": 42, "filename": "local.bin"}}
+    record = {"attachment": {"location": "file.bin", "size": 18, "filename": "local.bin"}}
 
     path = client.download_attachment(record)
     assert path == "local.bin"
@@ -1497,7 +1516,440 @@ def test_download_attachment_existing_file(client_setup: Client, mocker: MockerF
     mock_session_request.return_value.__enter__.assert_not_called()
 
 
-def test_add_attachment_guesses_mimetype(record_setup: Client, tmp_path):
+def test_download_attachment_existing_file_uses_hash_cache(
+    client_setup: Client, mocker: MockerFixture, tmp_path
+):
+    client = client_setup
+    client.session.request.return_value = (
+        {"capabilities": {"attachments": {"base_url": "https://cdn/"}}},
+        {},
+    )
+    mock_session_request = client.session._session.request
+    hash_cache = mocker.MagicMock()
+    hash_cache.sha256.return_value = "abc"
+    filepath = tmp_path / "local.bin"
+    filepath.write_bytes(b"aaa")
+    record = {"attachment": {"location": "file.bin", "hash": "abc", "size": 3}}
+
+    client.download_attachment(record, filepath=str(filepath), hash_cache=hash_cache)
+
+    hash_cache.sha256.assert_called_with(str(filepath))
+    mock_session_request.return_value.__enter__.assert_not_called()
+
+
+@pytest.fixture
+def attachment_setup(client_setup: Client, mocker: MockerFixture):
+    client = client_setup
+    client.session.request.return_value = (
+        {"capabilities": {"attachments": {"base_url": "https://cdn/"}}},
+        {},
+    )
+    mock_response = mocker.MagicMock()
+    client.session._session.request.return_value.__enter__.return_value = mock_response
+    return client, mock_response
+
+
+def test_download_attachment_resumes_partial_download(attachment_setup, tmp_path):
+    client, mock_response = attachment_setup
+    mock_response.status_code = 206
+    mock_response.headers = {"Content-Range": "bytes 3-4/5"}
+    mock_response.iter_content.return_value = [b"lo"]
+    (tmp_path / "file.bin.part").write_bytes(b"hel")
+    record = {
+        "attachment": {
+            "location": "file.bin",
+            "size": 5,
+            "hash": hashlib.sha256(b"hello").hexdigest(),
+        }
+    }
+
+    client.download_attachment(record, filepath=str(tmp_path / "file.bin"))
+
+    client.session._session.request.assert_called_with(
+        "get", "https://cdn/file.bin", stream=True, headers={"Range": "bytes=3-"}
+    )
+    assert (tmp_path / "file.bin").read_bytes() == b"hello"
+    assert not (tmp_path / "file.bin.part").exists()
+
+
+def test_download_attachment_is_limited_by_the_deadline(attachment_setup, tmp_path):
+    client, mock_response = attachment_setup
+    mock_response.status_code = 200
+    mock_response.iter_content.return_value = [b"hello"]
+    client.deadline = 30
+    record = {"attachment": {"location": "file.bin", "size": 5}}
+
+    client.download_attachment(record, filepath=str(tmp_path / "file.bin"))
+
+    timeout = client.session._session.request.call_args[1]["timeout"]
+    assert 0 < timeout <= 30
+    assert (tmp_path / "file.bin").read_bytes() == b"hello"
+
+
+def test_download_attachment_restarts_if_range_is_not_supported(attachment_setup, tmp_path):
+    client, mock_response = attachment_setup
+    mock_response.status_code = 200
+    mock_response.iter_content.return_value = [b"hello"]
+    (tmp_path / "file.bin.part").write_bytes(b"hel")
+    record = {"attachment": {"location": "file.bin", "size": 5}}
+
+    client.download_attachment(record, filepath=str(tmp_path / "file.bin"))
+
+    assert (tmp_path / "file.bin").read_bytes() == b"hello"
+
+
+def test_download_attachment_restarts_if_part_is_too_large(attachment_setup, tmp_path):
+    client, mock_response = attachment_setup
+    mock_response.status_code = 200
+    mock_response.iter_content.return_value = [b"hello"]
+    (tmp_path / "file.bin.part").write_bytes(b"hello world")
+    record = {"attachment": {"location": "file.bin", "size": 5}}
+
+    client.download_attachment(record, filepath=str(tmp_path / "file.bin"))
+
+    client.session._session.request.assert_called_once_with(
+        "get", "https://cdn/file.bin", stream=True, headers={}
+    )
+    assert (tmp_path / "file.bin").read_bytes() == b"hello"
+
+
+def test_download_attachment_complete_part_of_unknown_size(attachment_setup, tmp_path):
+    client, mock_response = attachment_setup
+    mock_response.status_code = 416
+    mock_response.headers = {"Content-Range": "bytes */5"}
+    (tmp_path / "file.bin.part").write_bytes(b"hello")
+    record = {"attachment": {"location": "file.bin", "hash": hashlib.sha256(b"hello").hexdigest()}}
+
+    client.download_attachment(record, filepath=str(tmp_path / "file.bin"))
+
+    client.session._session.request.assert_called_once_with(
+        "get", "https://cdn/file.bin", stream=True, headers={"Range": "bytes=5-"}
+    )
+    mock_response.raise_for_status.assert_not_called()
+    assert (tmp_path / "file.bin").read_bytes() == b"hello"
+    assert not (tmp_path / "file.bin.part").exists()
+
+
+def test_download_attachment_restarts_if_resumed_part_is_stale(
+    attachment_setup, mocker: MockerFixture, tmp_path
+):
+    client, _ = attachment_setup
+    resumed = mocker.MagicMock(status_code=206, headers={"Content-Range": "bytes 3-4/5"})
+    resumed.iter_content.return_value = [b"lo"]
+    restarted = mocker.MagicMock(status_code=200)
+    restarted.iter_content.return_value = [b"hello"]
+    client.session._session.request.return_value.__enter__.side_effect = [resumed, restarted]
+    # Left by an interrupted download of a previous version of the attachment.
+    (tmp_path / "file.bin.part").write_bytes(b"old")
+    record = {
+        "attachment": {
+            "location": "file.bin",
+            "size": 5,
+            "hash": hashlib.sha256(b"hello").hexdigest(),
+        }
+    }
+
+    client.download_attachment(record, filepath=str(tmp_path / "file.bin"))
+
+    assert client.session._session.request.call_args_list == [
+        mocker.call("get", "https://cdn/file.bin", stream=True, headers={"Range": "bytes=3-"}),
+        mocker.call("get", "https://cdn/file.bin", stream=True, headers={}),
+    ]
+    assert (tmp_path / "file.bin").read_bytes() == b"hello"
+    assert not (tmp_path / "file.bin.part").exists()
+
+
+def test_download_attachment_unknown_size_part_is_verified(attachment_setup, tmp_path):
+    client, mock_response = attachment_setup
+    mock_response.status_code = 416
+    mock_response.headers = {}
+    (tmp_path / "file.bin.part").write_bytes(b"hellp")
+    record = {"attachment": {"location": "file.bin", "hash": hashlib.sha256(b"hello").hexdigest()}}
+
+    with pytest.raises(AttachmentIntegrityError):
+        client.download_attachment(record, filepath=str(tmp_path / "file.bin"))
+
+    assert not (tmp_path / "file.bin.part").exists()
+
+
+@pytest.mark.parametrize(
+    "status,content_range",
+    [
+        (416, "bytes */4"),
+        (206, "bytes 0-4/5"),
+        (206, None),
+    ],
+)
+def test_download_attachment_restarts_if_part_does_not_match(
+    attachment_setup, tmp_path, mocker: MockerFixture, status, content_range
+):
+    client, _ = attachment_setup
+    mismatch = mocker.MagicMock(status_code=status)
+    mismatch.headers = {"Content-Range": content_range} if content_range else {}
+    full = mocker.MagicMock(status_code=200)
+    full.iter_content.return_value = [b"hello"]
+    client.session._session.request.return_value.__enter__.side_effect = [mismatch, full]
+    (tmp_path / "file.bin.part").write_bytes(b"hel")
+    record = {"attachment": {"location": "file.bin", "hash": hashlib.sha256(b"hello").hexdigest()}}
+
+    client.download_attachment(record, filepath=str(tmp_path / "file.bin"))
+
+    assert client.session._session.request.call_args_list == [
+        mocker.call("get", "https://cdn/file.bin", stream=True, headers={"Range": "bytes=3-"}),
+        mocker.call("get", "https://cdn/file.bin", stream=True, headers={}),
+    ]
+    mismatch.iter_content.assert_not_called()
+    assert (tmp_path / "file.bin").read_bytes() == b"hello"
+
+
+def test_download_attachment_complete_part_is_not_downloaded_again(attachment_setup, tmp_path):
+    client, _ = attachment_setup
+    (tmp_path / "file.bin.part").write_bytes(b"hello")
+    record = {
+        "attachment": {
+            "location": "file.bin",
+            "size": 5,
+            "hash": hashlib.sha256(b"hello").hexdigest(),
+        }
+    }
+
+    client.download_attachment(record, filepath=str(tmp_path / "file.bin"))
+
+    client.session._session.request.assert_not_called()
+    assert (tmp_path / "file.bin").read_bytes() == b"hello"
+
+
+def test_download_attachment_uses_and_populates_cache(attachment_setup, tmp_path):
+    client, mock_response = attachment_setup
+    mock_response.iter_content.return_value = [b"hello"]
+    cache = AttachmentCache(str(tmp_path / "cache"))
+    record = {
+        "attachment": {
+            "location": "file.bin",
+            "size": 5,
+            "hash": hashlib.sha256(b"hello").hexdigest(),
+        }
+    }
+
+    client.download_attachment(record, filepath=str(tmp_path / "a.bin"), cache=cache)
+    assert client.session._session.request.call_count == 1
+
+    client.download_attachment(record, filepath=str(tmp_path / "b.bin"), cache=cache)
+    assert client.session._session.request.call_count == 1
+    assert (tmp_path / "b.bin").read_bytes() == b"hello"
+
+
+def test_download_attachment_raises_if_hash_does_not_match(attachment_setup, tmp_path):
+    client, mock_response = attachment_setup
+    mock_response.iter_content.return_value = [b"corrupted"]
+    record = {"attachment": {"location": "file.bin", "hash": hashlib.sha256(b"hello").hexdigest()}}
+
+    with pytest.raises(AttachmentIntegrityError):
+        client.download_attachment(record, filepath=str(tmp_path / "file.bin"))
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_download_attachment_raises_if_size_does_not_match(attachment_setup, tmp_path):
+    client, mock_response = attachment_setup
+    mock_response.iter_content.return_value = [b"hell"]
+    record = {"attachment": {"location": "file.bin", "size": 5}}
+
+    with pytest.raises(AttachmentIntegrityError):
+        client.download_attachment(record, filepath=str(tmp_path / "file.bin"))
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_download_attachment_stores_computed_hash(attachment_setup, mocker, tmp_path):
+    client, mock_response = attachment_setup
+    mock_response.iter_content.return_value = [b"hel", b"lo"]
+    hash_cache = mocker.MagicMock()
+    record = {"attachment": {"location": "file.bin", "size": 5}}
+
+    client.download_attachment(
+        record, filepath=str(tmp_path / "file.bin"), chunk_size=3, hash_cache=hash_cache
+    )
+
+    mock_response.iter_content.assert_called_with(chunk_size=3)
+    hash_cache.set.assert_called_with(
+        str(tmp_path / "file.bin"), hashlib.sha256(b"hello").hexdigest()
+    )
+
+
+def test_download_attachments(client_setup: Client, mocker: MockerFixture, tmp_path):
+    client = client_setup
+    client.session.request.return_value = (
+        {"capabilities": {"attachments": {"base_url": "https://cdn/"}}},
+        {},
+    )
+    mock_session_request = client.session._session.request
+    mock_response = mocker.MagicMock()
+    mock_response.iter_content.return_value = [b"chunk1", b"chunk2"]
+    mock_session_request.return_value.__enter__.return_value = mock_response
+    (tmp_path / "attachments").mkdir()
+    (tmp_path / "attachments" / "up-to-date.bin").write_bytes(b"aaa")
+    records = [
+        {"id": f"r{i}", "attachment": {"location": f"file{i}.bin", "filename": f"file{i}.bin"}}
+        for i in range(5)
+    ]
+    records.append(
+        {
+            "id": "r5",
+            "attachment": {
+                "location": "up-to-date.bin",
+                "filename": "up-to-date.bin",
+                "hash": "9834876dcfb05cb167a5c24953eba58c4ac89b1adf57f28f2f9d09af107ee8f0",
+                "size": 3,
+            },
+        }
+    )
+
+    report = client.download_attachments(records, str(tmp_path / "attachments"), workers=3)
+
+    # Server info is fetched once.
+    client.session.request.assert_called_once_with("get", "/")
+    assert mock_session_request.call_count == 5
+    assert [f["id"] for f in report["files"]] == ["r0", "r1", "r2", "r3", "r4", "r5"]
+    assert [f["skipped"] for f in report["files"]] == [False] * 5 + [True]
+    assert report["size"] == 5 * 12
+    assert (tmp_path / "attachments" / "file3.bin").read_bytes() == b"chunk1chunk2"
+
+
+def test_download_attachments_with_the_same_filename(
+    attachment_setup, mocker: MockerFixture, tmp_path
+):
+    client, _ = attachment_setup
+    downloading = []
+    overlaps = []
+
+    def request(method, url, **kwargs):
+        def body(**kwargs):
+            if url.startswith("https://cdn/same"):
+                overlaps.extend(u for u in downloading if u.startswith("https://cdn/same"))
+            downloading.append(url)
+            time.sleep(0.02)
+            downloading.remove(url)
+            yield url.encode()
+
+        response = mocker.MagicMock(status_code=200)
+        response.iter_content.side_effect = body
+        context = mocker.MagicMock()
+        context.__enter__.return_value = response
+        return context
+
+    client.session._session.request.side_effect = request
+    records = [
+        {"id": f"r{i}", "attachment": {"location": loc, "filename": filename}}
+        for i, (loc, filename) in enumerate(
+            [("same1", "same.bin"), ("other", "other.bin"), ("same2", "same.bin")]
+        )
+    ]
+
+    report = client.download_attachments(records, str(tmp_path), workers=3)
+
+    assert overlaps == []
+    assert [f["id"] for f in report["files"]] == ["r0", "r1", "r2"]
+    assert (tmp_path / "same.bin").read_bytes() == b"https://cdn/same2"
+    assert (tmp_path / "other.bin").read_bytes() == b"https://cdn/other"
+    assert sorted(os.listdir(tmp_path)) == ["other.bin", "same.bin"]
+
+
+def test_sync_attachments(attachment_setup, tmp_path):
+    client, mock_response = attachment_setup
+    mock_response.iter_content.side_effect = lambda **kwargs: iter([b"hello"])
+    server_info = {"capabilities": {"attachments": {"base_url": "https://cdn/"}}}
+    hello = {"hash": hashlib.sha256(b"hello").hexdigest(), "size": 5}
+    responses = {
+        None: [
+            {"id": "a", "attachment": {"location": "c/a.bin", **hello}},
+            {"id": "b", "attachment": {"location": "c/b.bin", **hello}},
+            {"id": "c", "attachment": {"location": "c/c.bin", **hello}},
+            {"id": "d"},
+        ],
+        "10": [
+            {"id": "a", "deleted": True},
+            {"id": "b", "attachment": {"location": "c/b2.bin", **hello}},
+            {"id": "c", "title": "metadata only", "attachment": {"location": "c/c.bin", **hello}},
+        ],
+    }
+
+    def request(method, endpoint, headers=None, params=None):
+        if endpoint == "/":
+            return server_info, {}
+        since = params.get("_since")
+        return {"data": responses[since]}, {"ETag": '"%s"' % ("10" if since is None else "20")}
+
+    client.session.request.side_effect = request
+    dest = tmp_path / "mirror"
+
+    report = client.sync_attachments(str(dest), collection="cid")
+
+    assert report["timestamp"] == "10"
+    assert sorted(os.listdir(dest / "c")) == ["a.bin", "b.bin", "c.bin"]
+    assert client.session._session.request.call_count == 3
+
+    report = client.sync_attachments(str(dest), collection="cid")
+
+    client.session.request.assert_any_call(
+        "get",
+        "/buckets/mybucket/collections/cid/records",
+        headers={"If-None-Match": '"10"'},
+        params={"_since": "10"},
+    )
+    assert report["timestamp"] == "20"
+    assert sorted(report["deleted"]) == ["c/a.bin", "c/b.bin"]
+    assert [f["id"] for f in report["files"]] == ["b"]
+    assert sorted(os.listdir(dest / "c")) == ["b2.bin", "c.bin"]
+    with open(dest / ".manifest.json") as f:
+        manifest = json.load(f)
+    assert manifest["timestamp"] == "20"
+    assert sorted(manifest["files"]) == ["b", "c"]
+
+    # Nothing changed: a single request.
+    client.session.request.reset_mock()
+    client.session.request.side_effect = None
+    client.session.request.return_value = (None, {"ETag": '"20"'})
+
+    report = client.sync_attachments(str(dest), collection="cid")
+
+    assert client.session.request.call_count == 1
+    assert report["files"] == [] and report["deleted"] == []
+
+
+def test_sync_attachments_ignores_mirrored_files_removed_meanwhile(attachment_setup, tmp_path):
+    client, _ = attachment_setup
+    dest = tmp_path / "mirror"
+    dest.mkdir()
+    manifest = {"timestamp": "10", "files": {"a": {"location": "a.bin", "hash": "abc"}}}
+    (dest / ".manifest.json").write_text(json.dumps(manifest))
+    client.session.request.return_value = (
+        {"data": [{"id": "a", "deleted": True}]},
+        {"ETag": '"20"'},
+    )
+
+    report = client.sync_attachments(str(dest), collection="cid")
+
+    assert report["deleted"] == ["a.bin"]
+    with open(dest / ".manifest.json") as f:
+        assert json.load(f) == {"timestamp": "20", "files": {}}
+
+
+def test_sync_attachments_rejects_locations_outside_the_directory(attachment_setup, tmp_path):
+    client, _ = attachment_setup
+    client.session.request.return_value = (
+        {"data": [{"id": "a", "attachment": {"location": "../../etc/passwd"}}]},
+        {"ETag": '"10"'},
+    )
+
+    with pytest.raises(ValueError):
+        client.sync_attachments(str(tmp_path / "mirror"), collection="cid")
+
+    with open(tmp_path / "mirror" / ".manifest.json") as f:
+        assert json.load(f)["timestamp"] is None
+
+
+def test_add_attachment_guesses_mimetype(record_setup: Client, tmp_path, mocker: MockerFixture):
     client = record_setup
     mock_response(client.session)
 
@@ -1514,8 +1966,49 @@ def test_add_attachment_guesses_mimetype(record_setup: Client, tmp_path):
             "/buckets/a/collections/b/records/abc/attachment",
             data=None,
             permissions=None,
-            files=[("attachment", ("file.txt", mock_file.return_value, "text/plain"))],
+            files=mocker.ANY,
         )
+        body = client.session.request.call_args[1]["files"]
+        assert body.files == [("attachment", ("file.txt", mock_file.return_value, "text/plain"))]
+
+
+def test_add_attachments_skips_up_to_date_files(record_setup: Client, tmp_path):
+    client = record_setup
+    for name in ("a", "b", "c"):
+        (tmp_path / f"{name}.txt").write_bytes(name.encode())
+    client.session.request.return_value = (
+        {
+            "data": [
+                {"id": "a", "attachment": {"hash": hashlib.sha256(b"a").hexdigest()}},
+                {"id": "b", "attachment": {"hash": "outdated"}},
+                {"id": "c"},
+            ]
+        },
+        {},
+    )
+
+    report = client.add_attachments(
+        [{"id": name, "filepath": str(tmp_path / f"{name}.txt")} for name in ("a", "b", "c")],
+        bucket="mybucket",
+        collection="mycollection",
+        workers=2,
+    )
+
+    client.session.request.assert_any_call(
+        "get",
+        "/buckets/mybucket/collections/mycollection/records",
+        headers={},
+        params={"in_id": ["a", "b", "c"], "_fields": "attachment"},
+    )
+    posted = sorted(
+        call[0][1] for call in client.session.request.call_args_list if call[0][0] == "post"
+    )
+    assert posted == [
+        "/buckets/mybucket/collections/mycollection/records/b/attachment",
+        "/buckets/mybucket/collections/mycollection/records/c/attachment",
+    ]
+    assert [f["skipped"] for f in report["files"]] == [True, False, False]
+    assert report["size"] == 2
 
 
 def test_get_permissions(client_setup: Client):
@@ -1637,3 +2130,264 @@ def test_rollback_changes(client_setup: Client, mocker: MockerFixture):
             "data": {"field": "foo", "last_editor_comment": "cancel", "status": "to-rollback"}
         },
     )
+
+
+def test_oversized_in_filter_is_split_into_several_requests(record_setup: Client):
+    client = record_setup.clone(max_url_length=200)
+    client.session.server_url = "http://localhost/v1"
+    ids = [f"record-{i:03d}" for i in range(30)]
+    client.session.request.side_effect = lambda method, endpoint, headers, params: build_response(
+        [{"id": i} for i in params["in_id"]]
+    )
+
+    records = client.get_records(in_id=ids)
+
+    assert client.session.request.call_count > 1
+    for call in client.session.request.call_args_list:
+        params = call[1]["params"]
+        assert (
+            len(client.session.server_url + call[0][1])
+            + len(urlencode(utils.encode_params(params)))
+            < 200
+        )
+    assert [r["id"] for r in records] == ids
+
+
+def test_oversized_in_filter_results_are_deduplicated_and_sorted(record_setup: Client):
+    client = record_setup.clone(max_url_length=100)
+    client.session.server_url = "http://localhost/v1"
+    client.session.request.side_effect = [
+        build_response([{"id": "a", "age": 3}, {"id": "b", "age": 1}]),
+        build_response([{"id": "b", "age": 1}, {"id": "c", "age": 2}]),
+    ]
+
+    with patch.object(utils, "split_values", return_value=[["a", "b"], ["b", "c"]]):
+        records = client.get_records(in_id=["a", "b", "c"] * 20, _sort="-age")
+
+    assert records == [{"id": "a", "age": 3}, {"id": "c", "age": 2}, {"id": "b", "age": 1}]
+
+
+def paginated_records(records, page_size=None):
+    """Side effect of ``session.request`` filtering, sorting (``-last_modified``) and
+    paginating the records like the server.
+    """
+    next_pages = {}
+
+    def request(method, endpoint, headers, params):
+        if endpoint in next_pages:
+            matching, limit = next_pages.pop(endpoint)
+        else:
+            matching = [
+                r
+                for r in sorted(records, key=lambda r: -r["last_modified"])
+                if r["id"] in params.get("in_id", [r["id"]])
+                and r["id"] not in params.get("exclude_id", [])
+            ]
+            limit = int(params.get("_limit", page_size or len(records)))
+        page, rest = matching[:limit], matching[limit:]
+        if not rest:
+            return build_response(page)
+        next_page = f"http://localhost/v1/records?_token={len(next_pages)}-{rest[0]['id']}"
+        next_pages[next_page] = (rest, limit)
+        return build_response(page, {"Next-Page": next_page})
+
+    return request
+
+
+RECORDS = [{"id": f"r{i}", "last_modified": i} for i in range(1, 6)]
+
+
+def test_oversized_in_filter_results_are_truncated_to_limit(record_setup: Client):
+    client = record_setup.clone(max_url_length=100)
+    client.session.server_url = "http://localhost/v1"
+    client.session.request.side_effect = paginated_records(RECORDS)
+
+    with patch.object(utils, "split_values", return_value=[["r1", "r5"], ["r2", "r4"]]):
+        records = client.get_records(in_id=["r1", "r2", "r4", "r5"] * 20, _limit=3)
+
+    # In the default order of the server, not in the order of the chunks.
+    assert [r["id"] for r in records] == ["r5", "r4", "r2"]
+
+
+def test_oversized_exclude_filter_results_are_truncated_to_limit(record_setup: Client):
+    client = record_setup.clone(max_url_length=100)
+    client.session.server_url = "http://localhost/v1"
+    client.session.request.side_effect = paginated_records(RECORDS)
+
+    with patch.object(utils, "split_values", return_value=[["r5", "r4"], ["r3"]]):
+        records = client.get_records(exclude_id=["r3", "r4", "r5"] * 20, _limit=2)
+
+    assert [r["id"] for r in records] == ["r2", "r1"]
+
+
+def test_oversized_filter_results_are_truncated_to_limit_and_pages(record_setup: Client):
+    client = record_setup.clone(max_url_length=100)
+    client.session.server_url = "http://localhost/v1"
+    client.session.request.side_effect = paginated_records(RECORDS)
+
+    with patch.object(utils, "split_values", return_value=[["r1", "r2"], ["r3", "r4"]]):
+        records = client.get_records(in_id=["r1", "r2", "r3", "r4"] * 20, _limit=1, pages=3)
+
+    assert [r["id"] for r in records] == ["r4", "r3", "r2"]
+
+
+def test_oversized_exclude_filter_chunks_are_fetched_entirely(record_setup: Client):
+    client = record_setup.clone(max_url_length=100)
+    client.session.server_url = "http://localhost/v1"
+    client.session.request.side_effect = paginated_records(RECORDS, page_size=2)
+
+    with patch.object(utils, "split_values", return_value=[["r5"], ["r1"]]):
+        records = client.get_records(exclude_id=["r1", "r5"] * 20, pages=1)
+
+    assert [r["id"] for r in records] == ["r4", "r3", "r2"]
+
+
+def test_oversized_exclude_filter_results_are_intersected(record_setup: Client):
+    client = record_setup.clone(max_url_length=100)
+    client.session.server_url = "http://localhost/v1"
+    client.session.request.side_effect = [
+        build_response([{"id": "c"}, {"id": "d"}, {"id": "e"}]),
+        build_response([{"id": "a"}, {"id": "b"}, {"id": "e"}]),
+    ]
+
+    with patch.object(utils, "split_values", return_value=[["a", "b"], ["c", "d"]]):
+        records = client.get_records(exclude_id=["a", "b", "c", "d"] * 20)
+
+    assert records == [{"id": "e"}]
+
+
+def test_short_in_filter_is_not_split(record_setup: Client):
+    client = record_setup
+    client.session.server_url = "http://localhost/v1"
+    client.session.request.side_effect = [build_response([{"id": "a"}])]
+
+    client.get_records(in_id=["a", "b"])
+
+    client.session.request.assert_called_once()
+
+
+def test_create_records_sends_chunked_batches(client_setup: Client):
+    client = client_setup
+    client._server_settings = {"batch_max_requests": 2}
+
+    def batch_response(method, endpoint, payload, **kwargs):
+        return {"responses": [{"status": 201, "body": r["body"]} for r in payload["requests"]]}, {}
+
+    client.session.request.side_effect = batch_response
+
+    results = client.create_records(
+        [{"id": "a"}, {"id": "b"}, {"id": "c"}], bucket="mozilla", collection="test"
+    )
+
+    assert [r["body"]["data"]["id"] for r in results] == ["a", "b", "c"]
+    # The chunks are sent concurrently, in any order.
+    chunks = [call[1]["payload"]["requests"] for call in client.session.request.call_args_list]
+    assert sorted([r["body"]["data"]["id"] for r in chunk] for chunk in chunks) == [
+        ["a", "b"],
+        ["c"],
+    ]
+    (first_chunk,) = [chunk for chunk in chunks if len(chunk) == 2]
+    assert first_chunk[0] == {
+        "method": "PUT",
+        "path": "/buckets/mozilla/collections/test/records/a",
+        "body": {"data": {"id": "a"}},
+        "headers": {"If-None-Match": "*"},
+    }
+
+
+def test_bulk_operations_return_4xx_errors_as_results(client_setup: Client):
+    client = client_setup
+    client._server_settings = {"batch_max_requests": 10}
+    client.session.request.return_value = (
+        {"responses": [{"status": 200, "body": {}}, {"status": 412, "body": {}}]},
+        {},
+    )
+
+    results = client.update_records(
+        [{"id": "a", "last_modified": 1}, {"id": "b", "last_modified": 2}],
+        bucket="mozilla",
+        collection="test",
+    )
+
+    assert [r["status"] for r in results] == [200, 412]
+    requests = client.session.request.call_args[1]["payload"]["requests"]
+    assert requests[1]["headers"] == {"If-Match": '"2"'}
+
+
+def test_bulk_operations_raise_on_5xx(client_setup: Client):
+    client = client_setup
+    client._server_settings = {"batch_max_requests": 10}
+    client.session.request.return_value = ({"responses": [{"status": 503, "body": {}}]}, {})
+
+    with pytest.raises(KintoException):
+        list(client.patch_records([{"id": "a", "foo": 1}], bucket="mozilla", collection="test"))
+
+
+def test_delete_records_by_id(client_setup: Client):
+    client = client_setup
+    client._server_settings = {"batch_max_requests": 10}
+    client.session.request.return_value = (
+        {"responses": [{"status": 200, "body": {}}, {"status": 200, "body": {}}]},
+        {},
+    )
+
+    list(client.delete_records_by_id(["a", "b"], bucket="mozilla", collection="test", workers=1))
+
+    requests = client.session.request.call_args[1]["payload"]["requests"]
+    assert [(r["method"], r["path"]) for r in requests] == [
+        ("DELETE", "/buckets/mozilla/collections/test/records/a"),
+        ("DELETE", "/buckets/mozilla/collections/test/records/b"),
+    ]
+
+
+def test_apply_records_sends_minimal_changes(client_setup: Client):
+    client = client_setup
+    client._server_settings = {"batch_max_requests": 10}
+    client.session.request.side_effect = [
+        build_response(
+            [
+                {"id": "same", "foo": 1, "last_modified": 1},
+                {"id": "changed", "foo": 1, "last_modified": 2},
+                {"id": "removed", "foo": 1, "last_modified": 3},
+            ]
+        ),
+        (
+            {
+                "responses": [
+                    {"status": 200, "body": {}},
+                    {"status": 201, "body": {}},
+                    {"status": 412, "body": {}},
+                ]
+            },
+            {},
+        ),
+    ]
+
+    report = client.apply_records(
+        [{"id": "same", "foo": 1}, {"id": "changed", "foo": 2}, {"id": "new", "foo": 1}],
+        bucket="mozilla",
+        collection="test",
+    )
+
+    requests = client.session.request.call_args[1]["payload"]["requests"]
+    assert [(r["method"], r["path"].rsplit("/", 1)[-1], r["headers"]) for r in requests] == [
+        ("PUT", "changed", {"If-Match": '"2"'}),
+        ("PUT", "new", {"If-None-Match": "*"}),
+        ("DELETE", "removed", {"If-Match": '"3"'}),
+    ]
+    assert report == {
+        "created": ["new"],
+        "updated": ["changed"],
+        "deleted": [],
+        "errors": [{"status": 412, "body": {}}],
+    }
+
+
+def test_apply_records_without_changes_does_not_write(client_setup: Client):
+    client = client_setup
+    client.session.request.side_effect = [build_response([{"id": "a", "last_modified": 1}])]
+
+    report = client.apply_records([{"id": "a"}], bucket="mozilla", collection="test")
+
+    assert client.session.request.call_count == 1
+    assert report == {"created": [], "updated": [], "deleted": [], "errors": []}
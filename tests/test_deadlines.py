@@ -0,0 +1,240 @@
+import asyncio
+from typing import Tuple
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+from pytest_mock import MockerFixture
+
+from kinto_http import AsyncClient, Client, DeadlineExceeded, deadline, deadlines
+from kinto_http.session import Session
+
+from .support import get_200, get_503, get_http_response
+
+
+@pytest.fixture
+def clock(mocker: MockerFixture):
+    now = [1000.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    mocker.patch("kinto_http.deadlines.time.monotonic", side_effect=lambda: now[0])
+    mocker.patch("kinto_http.deadlines.time.sleep", side_effect=sleep)
+    return now
+
+
+def test_no_deadline_by_default():
+    assert deadlines.remaining() is None
+    assert deadlines.timeout(3) == 3
+    deadlines.check("anything")
+
+
+def test_nested_deadlines_cannot_extend_the_enclosing_one(clock):
+    with deadline(5):
+        with deadline(10):
+            assert deadlines.remaining() == 5
+        with deadline(2):
+            assert deadlines.remaining() == 2
+        assert deadlines.remaining() == 5
+    assert deadlines.remaining() is None
+
+
+def test_timeout_is_reduced_to_the_remaining_time(clock):
+    with deadline(5):
+        clock[0] += 2
+        assert deadlines.timeout(None) == 3
+        assert deadlines.timeout(False) == 3
+        assert deadlines.timeout(1) == 1
+        assert deadlines.timeout(10) == 3
+        assert deadlines.timeout((1, 10)) == (1, 3)
+        assert deadlines.timeout((None, 10)) == (3, 3)
+
+
+def test_sleep_fails_right_away_if_it_would_exceed_the_deadline(clock):
+    with deadline(5):
+        deadlines.sleep(2, "something")
+        with pytest.raises(DeadlineExceeded, match="before something"):
+            deadlines.sleep(3, "something")
+    assert clock[0] == 1002
+
+
+def test_requests_timeout_is_reduced_to_the_remaining_time(
+    session_setup: Tuple[MagicMock, Session], clock
+):
+    requests_mock, session = session_setup
+    session.timeout = 10
+
+    with deadline(4):
+        clock[0] += 1
+        session.request("get", "/test")
+
+    assert requests_mock.request.call_args[1]["timeout"] == 3
+
+
+def test_requests_are_not_sent_once_the_deadline_is_spent(
+    session_setup: Tuple[MagicMock, Session], clock
+):
+    requests_mock, session = session_setup
+
+    with deadline(1), pytest.raises(DeadlineExceeded, match="GET https://example.org/test"):
+        clock[0] += 1
+        session.request("get", "/test")
+
+    assert not requests_mock.request.called
+
+
+def test_retries_stop_at_the_deadline(session_setup: Tuple[MagicMock, Session], clock):
+    requests_mock, _ = session_setup
+    requests_mock.request.side_effect = [get_503()] * 5
+    session = Session("https://example.org", retry=5, retry_after=2)
+    events = []
+    session.add_listener(events.append)
+
+    with deadline(5), pytest.raises(DeadlineExceeded, match="retrying GET"):
+        session.request("get", "/test")
+
+    # Two retries fit in the deadline, the third one would not.
+    assert requests_mock.request.call_count == 3
+    assert clock[0] == 1004
+    assert events[-1].name == "retry.give_up"
+    assert events[-1].attributes["reason"] == "deadline"
+
+
+def test_timeouts_at_the_deadline_raise_deadline_exceeded(
+    session_setup: Tuple[MagicMock, Session], clock
+):
+    requests_mock, session = session_setup
+
+    def timeout(*args, **kwargs):
+        clock[0] += kwargs["timeout"]
+        raise requests.exceptions.ReadTimeout()
+
+    requests_mock.request.side_effect = timeout
+
+    with deadline(2), pytest.raises(DeadlineExceeded) as excinfo:
+        session.request("get", "/test")
+
+    assert isinstance(excinfo.value.__context__, requests.exceptions.ReadTimeout)
+    assert requests_mock.request.call_count == 1
+
+
+def page(records, next_page=None):
+    resp = get_http_response(200, headers={"Next-Page": next_page} if next_page else {})
+    resp.json.return_value = {"data": records}
+    return resp
+
+
+def test_client_deadline_applies_to_the_whole_pagination(
+    session_setup: Tuple[MagicMock, Session], clock
+):
+    requests_mock, _ = session_setup
+    next_page = "https://example.org/v1/buckets/b/collections/c/records?_token=a"
+
+    def slow_page(*args, **kwargs):
+        clock[0] += 0.4
+        return page([{"id": str(clock[0])}], next_page)
+
+    requests_mock.request.side_effect = slow_page
+    client = Client(server_url="https://example.org/v1", bucket="b", collection="c", deadline=1)
+
+    with pytest.raises(DeadlineExceeded):
+        client.get_records()
+
+    assert requests_mock.request.call_count == 3
+    # Each operation has its own deadline.
+    requests_mock.request.side_effect = None
+    requests_mock.request.return_value = page([])
+    assert client.get_records() == []
+
+
+def test_client_deadline_applies_to_lazy_pagination(
+    session_setup: Tuple[MagicMock, Session], clock
+):
+    requests_mock, _ = session_setup
+    next_page = "https://example.org/v1/buckets/b/collections/c/records?_token=a"
+
+    def slow_page(*args, **kwargs):
+        clock[0] += 0.4
+        return page([{"id": str(clock[0])}], next_page)
+
+    requests_mock.request.side_effect = slow_page
+    client = Client(server_url="https://example.org/v1", bucket="b", collection="c", deadline=1)
+
+    pages = client.get_paginated_records()
+    with pytest.raises(DeadlineExceeded):
+        for _ in pages:
+            pass
+
+    assert requests_mock.request.call_count == 3
+    assert deadlines.remaining() is None
+    requests_mock.request.side_effect = None
+    requests_mock.request.return_value = page([{"id": "a"}])
+    assert list(client.get_paginated_records()) == [{"data": [{"id": "a"}]}]
+
+
+def test_client_deadline_applies_to_lazy_bulk_operations(
+    session_setup: Tuple[MagicMock, Session], clock
+):
+    requests_mock, _ = session_setup
+    client = Client(server_url="https://example.org/v1", bucket="b", collection="c", deadline=2.5)
+    client._server_settings = {"batch_max_requests": 1}
+
+    def slow_batch(*args, **kwargs):
+        clock[0] += 1
+        resp = get_200()
+        resp.json.return_value = {"responses": [{"status": 201, "body": {}}]}
+        return resp
+
+    requests_mock.request.side_effect = slow_batch
+
+    responses = client.create_records([{"id": str(i)} for i in range(5)], workers=1)
+    with pytest.raises(DeadlineExceeded):
+        list(responses)
+
+    assert requests_mock.request.call_count == 3
+
+
+def test_client_deadline_is_kept_by_clones():
+    client = Client(server_url="https://example.org/v1", deadline=3)
+
+    assert client.clone(bucket="other").deadline == 3
+
+
+def test_batch_deadline_covers_the_whole_batch(session_setup: Tuple[MagicMock, Session], clock):
+    requests_mock, _ = session_setup
+    client = Client(server_url="https://example.org/v1", bucket="b", collection="c")
+    client._server_settings = {"batch_max_requests": 1}
+    timeouts = []
+
+    def slow_batch(*args, **kwargs):
+        timeouts.append(kwargs.get("timeout"))
+        clock[0] += 1
+        resp = get_200()
+        resp.json.return_value = {"responses": [{"status": 200, "body": {}}]}
+        return resp
+
+    requests_mock.request.side_effect = slow_batch
+
+    with pytest.raises(DeadlineExceeded):
+        with client.batch(deadline=2.5) as batch:
+            for i in range(5):
+                batch.create_record(data={"id": str(i)})
+
+    assert timeouts == [2.5, 1.5, 0.5]
+
+
+def test_async_client_keeps_the_deadline_of_the_caller(
+    session_setup: Tuple[MagicMock, Session],
+):
+    requests_mock, _ = session_setup
+    requests_mock.request.return_value = page([])
+    client = AsyncClient(server_url="https://example.org/v1", bucket="b", collection="c")
+
+    async def get_records():
+        with deadline(30):
+            return await client.get_records()  # ty: ignore[invalid-await]
+
+    asyncio.run(get_records())
+
+    assert 0 < requests_mock.request.call_args[1]["timeout"] <= 30
@@ -417,6 +417,19 @@ def test_records_deletion_when_no_records_exist(functional_setup):
     assert len(deleted_records) == 0
 
 
+def test_bulk_records_operations(functional_setup):
+    client = functional_setup.clone(bucket="mozilla", collection="payments")
+    client.create_bucket()
+    client.create_collection()
+
+    results = client.create_records([{"id": f"r{i}"} for i in range(30)])
+    assert [r["status"] for r in results] == [201] * 30
+
+    results = client.delete_records_by_id([f"r{i}" for i in range(10)])
+    assert [r["status"] for r in results] == [200] * 10
+    assert len(client.get_records()) == 20
+
+
 def test_bucket_sharing(functional_setup):
     client = functional_setup
     alice_credentials = ("alice", "p4ssw0rd")
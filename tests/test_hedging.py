@@ -0,0 +1,296 @@
+import threading
+from typing import Tuple
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+from pytest_mock import MockerFixture
+
+from kinto_http import Client
+from kinto_http.circuitbreaker import CircuitBreaker
+from kinto_http.hedging import Hedge, HedgingPolicy
+from kinto_http.ratelimit import RateLimiter
+from kinto_http.session import Session
+
+from .support import get_200
+
+
+def test_delay_is_the_percentile_of_the_latencies():
+    policy = HedgingPolicy(percentile=90, min_samples=10)
+
+    for latency in range(1, 10):
+        policy.record(latency / 100)
+    assert policy.delay() is None
+
+    policy.record(0.10)
+    assert policy.delay() == 0.09
+
+
+def test_fixed_delay_is_used_until_enough_latencies_are_measured():
+    policy = HedgingPolicy(delay=0.5, min_samples=2)
+    assert policy.delay() == 0.5
+
+    policy.record(0.1)
+    policy.record(0.1)
+    assert policy.delay() == 0.1
+
+
+def test_percentile_must_be_valid():
+    with pytest.raises(ValueError):
+        HedgingPolicy(percentile=0)
+
+
+def test_hedges_are_limited_to_a_ratio_of_the_requests():
+    policy = HedgingPolicy(max_ratio=0.2)
+    policy.requests = 10
+
+    assert [policy.allow() for _ in range(3)] == [True, True, False]
+    assert policy.hedges == 2
+
+
+def test_hedge_url_uses_the_alternate_server():
+    policy = HedgingPolicy(alternate_url="https://b.example.com/v1/")
+
+    assert (
+        policy.hedge_url("https://a.example.com/v1/buckets", "https://a.example.com/v1")
+        == "https://b.example.com/v1/buckets"
+    )
+    assert policy.hedge_url("https://cdn/file", "https://a.example.com/v1") == "https://cdn/file"
+    assert HedgingPolicy().hedge_url("https://a/v1/b", "https://a/v1") == "https://a/v1/b"
+
+
+@pytest.fixture
+def policy():
+    return HedgingPolicy(delay=0.01, max_ratio=1)
+
+
+def slow_then_fast(release: threading.Event):
+    calls = []
+
+    def send(url):
+        calls.append(url)
+        if len(calls) == 1:
+            release.wait(5)
+            return "slow"
+        return "fast"
+
+    return send, calls
+
+
+def test_fast_responses_are_not_hedged(policy):
+    assert policy.call(lambda url: url, "a", "b") == ("a", None)
+    assert (policy.requests, policy.hedges) == (1, 0)
+
+
+def test_no_hedge_until_enough_latencies_are_measured():
+    policy = HedgingPolicy(min_samples=2, max_ratio=1)
+    release = threading.Event()
+    send, calls = slow_then_fast(release)
+    threading.Timer(0.05, release.set).start()
+
+    assert policy.call(send, "a", "b") == ("slow", None)
+    assert calls == ["a"]
+    assert (policy.requests, policy.hedges) == (1, 0)
+
+
+def test_late_responses_are_hedged_and_the_first_one_wins(policy):
+    release = threading.Event()
+    send, calls = slow_then_fast(release)
+
+    result, hedge = policy.call(send, "a", "b")
+    release.set()
+
+    assert (result, hedge) == ("fast", Hedge(0.01, True))
+    assert calls == ["a", "b"]
+    assert (policy.hedges, policy.wins) == (1, 1)
+
+
+def test_errors_of_the_hedged_request_are_ignored(policy):
+    release = threading.Event()
+
+    def send(url):
+        if url == "b":
+            release.set()
+            raise ConnectionError()
+        release.wait(5)
+        return "slow"
+
+    assert policy.call(send, "a", "b") == ("slow", Hedge(0.01, False))
+
+
+def test_error_is_raised_if_both_requests_fail(policy):
+    release = threading.Event()
+
+    def send(url):
+        if url == "a":
+            release.wait(5)
+        else:
+            release.set()
+        raise ConnectionError(url)
+
+    with pytest.raises(ConnectionError):
+        policy.call(send, "a", "b")
+
+
+def test_hedged_request_can_be_sent_differently(policy):
+    release = threading.Event()
+    send, calls = slow_then_fast(release)
+
+    result, _ = policy.call(send, "a", "b", send_hedge=lambda url: "hedged " + url)
+    release.set()
+
+    assert result == "hedged b"
+    assert calls == ["a"]
+
+
+def test_no_hedge_beyond_the_maximum_ratio():
+    policy = HedgingPolicy(delay=0.01, max_ratio=0.5)
+    release = threading.Event()
+    send, calls = slow_then_fast(release)
+    threading.Timer(0.05, release.set).start()
+
+    assert policy.call(send, "a", "b") == ("slow", None)
+    assert calls == ["a"]
+
+
+def test_session_hedges_get_requests(session_setup: Tuple[MagicMock, Session]):
+    requests_mock, _ = session_setup
+    release = threading.Event()
+    fast = get_200()
+    fast.json.return_value = {"fast": True}
+
+    def request(method, url, **kwargs):
+        if requests_mock.request.call_count == 1:
+            release.wait(5)
+            return get_200()
+        return fast
+
+    requests_mock.request.side_effect = request
+    session = Session(
+        "https://a.example.com/v1",
+        hedging=HedgingPolicy(delay=0.01, max_ratio=1, alternate_url="https://b.example.com/v1"),
+    )
+    events = []
+    session.add_listener(events.append)
+
+    body, _ = session.request("get", "/buckets")
+    release.set()
+
+    assert body == {"fast": True}
+    urls = [call[0][1] for call in requests_mock.request.call_args_list]
+    assert urls == ["https://a.example.com/v1/buckets", "https://b.example.com/v1/buckets"]
+    hedges = [e.attributes for e in events if e.name == "hedge"]
+    assert hedges == [{"url": "https://a.example.com/v1/buckets", "delay": 0.01, "won": True}]
+
+
+def hedged_session_request(requests_mock: MagicMock, hedge_response, events=None, **kwargs):
+    """Send a GET request whose hedged request (to ``b.example.com``) returns or raises
+    ``hedge_response``, while the primary one waits for it.
+    """
+    release = threading.Event()
+
+    def request(method, url, **kw):
+        if url.startswith("https://b."):
+            release.set()
+            if isinstance(hedge_response, Exception):
+                raise hedge_response
+            return hedge_response
+        release.wait(5)
+        return get_200()
+
+    requests_mock.request.side_effect = request
+    session = Session(
+        "https://a.example.com/v1",
+        hedging=HedgingPolicy(delay=0.01, max_ratio=1, alternate_url="https://b.example.com/v1"),
+        **kwargs,
+    )
+    if events is not None:
+        session.add_listener(events.append)
+    return session.request("get", "/buckets")
+
+
+def test_session_hedges_are_rate_limited(
+    session_setup: Tuple[MagicMock, Session], mocker: MockerFixture
+):
+    requests_mock, _ = session_setup
+    limiter = RateLimiter(rate=50, burst=1)
+    limiter.acquire("https://b.example.com")
+    acquire = mocker.spy(limiter, "acquire")
+    events = []
+
+    hedged_session_request(requests_mock, get_200(), events, rate_limit=limiter)
+
+    assert [call[0][0] for call in acquire.call_args_list] == [
+        "https://a.example.com/v1/buckets",
+        "https://b.example.com/v1/buckets",
+    ]
+    # The hedged request waited for the token of its server.
+    waits = [e.attributes["url"] for e in events if e.name == "rate_limit"]
+    assert waits == ["https://b.example.com/v1/buckets"]
+
+
+@pytest.mark.parametrize(
+    "hedge_response,failures",
+    [
+        (get_200(), 0),
+        (requests.exceptions.ConnectionError(), 2),
+        # Neither a success nor a failure.
+        (ValueError(), 1),
+    ],
+)
+def test_session_hedges_are_guarded_by_the_circuit_breaker(
+    session_setup: Tuple[MagicMock, Session], hedge_response, failures
+):
+    requests_mock, _ = session_setup
+    breaker = CircuitBreaker(failures=3)
+    breaker.circuit("https://b.example.com").failure()
+
+    hedged_session_request(requests_mock, hedge_response, circuit_breaker=breaker)
+
+    assert breaker.circuit("https://b.example.com").failures == failures
+
+
+def test_session_does_not_hedge_to_an_open_circuit(session_setup: Tuple[MagicMock, Session]):
+    requests_mock, _ = session_setup
+    release = threading.Event()
+
+    def request(method, url, **kwargs):
+        release.wait(5)
+        return get_200()
+
+    requests_mock.request.side_effect = request
+    breaker = CircuitBreaker(failures=1)
+    breaker.circuit("https://b.example.com").failure()
+    session = Session(
+        "https://a.example.com/v1",
+        circuit_breaker=breaker,
+        hedging=HedgingPolicy(delay=0.01, max_ratio=1, alternate_url="https://b.example.com/v1"),
+    )
+    events = []
+    session.add_listener(events.append)
+    threading.Timer(0.05, release.set).start()
+
+    session.request("get", "/buckets")
+
+    urls = [call[0][1] for call in requests_mock.request.call_args_list]
+    assert urls == ["https://a.example.com/v1/buckets"]
+    rejects = [e.attributes["url"] for e in events if e.name == "circuit.reject"]
+    assert rejects == ["https://b.example.com"]
+
+
+def test_session_does_not_hedge_writes(session_setup: Tuple[MagicMock, Session]):
+    requests_mock, _ = session_setup
+    hedging = HedgingPolicy(delay=0, max_ratio=1)
+    session = Session("https://example.org", hedging=hedging)
+
+    session.request("post", "/buckets", data={})
+    session.request("get", "/buckets")
+
+    assert hedging.requests == 1
+
+
+def test_clones_share_the_hedging_policy():
+    hedging = HedgingPolicy()
+    client = Client(server_url="https://example.org/v1", hedging=hedging)
+
+    assert client.clone(bucket="other").session.hedging is hedging
@@ -0,0 +1,243 @@
+from typing import Tuple
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+from pytest_mock.plugin import MockerFixture
+
+from kinto_http import Client, instrumentation
+from kinto_http.instrumentation import Event, Instrumentation
+from kinto_http.retry import RetryPolicy
+from kinto_http.session import Session
+
+from .support import get_200, get_503, get_http_response
+
+
+def test_instrumentation_dispatches_events_to_listeners():
+    events = []
+    instr = Instrumentation()
+    instr.add_listener(events.append)
+
+    instr.emit("foo", a=1)
+    instr.remove_listener(events.append)
+    instr.emit("bar")
+
+    assert events == [Event("foo", {"a": 1})]
+
+
+def test_failing_listener_does_not_break_others():
+    events = []
+    instr = Instrumentation()
+    instr.add_listener(MagicMock(side_effect=ValueError))
+    instr.add_listener(events.append)
+
+    instr.emit("foo")
+
+    assert events == [Event("foo", {})]
+
+
+def test_session_emits_request_events(session_setup: Tuple[MagicMock, Session]):
+    requests_mock, session = session_setup
+    requests_mock.request.return_value.content = b'{"data": []}'
+    events = []
+    session.add_listener(events.append)
+
+    session.request("post", "/test", data={"foo": "bar"})
+
+    assert [e.name for e in events] == ["request.start", "request.end"]
+    end = events[1].attributes
+    assert end["method"] == "post"
+    assert end["url"] == "https://example.org/test"
+    assert end["status"] == 200
+    assert end["request_bytes"] == len('{"data": {"foo": "bar"}}')
+    assert end["response_bytes"] == 12
+    assert end["serialization"] + end["network"] + end["parse"] == pytest.approx(end["duration"])
+
+
+def test_session_emits_retry_and_backoff_events(
+    session_setup: Tuple[MagicMock, Session], mocker: MockerFixture
+):
+    requests_mock, session = session_setup
+    mocker.patch("kinto_http.session.time.sleep")
+    retry_response = get_503()
+    retry_response.headers["Retry-After"] = "3"
+    requests_mock.request.side_effect = [
+        retry_response,
+        get_http_response(200, headers={"Backoff": "10"}),
+    ]
+    session.nb_retry = 1
+    events = []
+    session.add_listener(events.append)
+
+    session.request("get", "/test")
+
+    assert [e.name for e in events] == [
+        "request.start",
+        "request.end",
+        "request.retry",
+        "request.start",
+        "backoff",
+        "request.end",
+    ]
+    assert events[1].attributes["status"] == 503
+    assert events[2].attributes == {
+        "method": "get",
+        "url": "https://example.org/test",
+        "status": 503,
+        "error": None,
+        "attempt": 1,
+        "sleep": 3,
+    }
+    assert events[4].attributes == {"url": "https://example.org/test", "seconds": 10}
+
+
+def test_session_emits_request_end_on_network_errors(session_setup: Tuple[MagicMock, Session]):
+    requests_mock, session = session_setup
+    requests_mock.request.side_effect = ConnectionError
+    events = []
+    session.add_listener(events.append)
+
+    with pytest.raises(ConnectionError):
+        session.request("get", "/test")
+
+    assert events[-1].name == "request.end"
+    assert events[-1].attributes["status"] is None
+    assert isinstance(events[-1].attributes["error"], ConnectionError)
+
+
+def test_session_emits_retry_events_on_network_errors(
+    session_setup: Tuple[MagicMock, Session], mocker: MockerFixture
+):
+    requests_mock, session = session_setup
+    mocker.patch("kinto_http.session.deadlines.sleep")
+    requests_mock.request.side_effect = [requests.exceptions.ConnectionError(), get_200()]
+    session.retry_policy = RetryPolicy(network_retries=1, backoff_factor=0)
+    events = []
+    session.add_listener(events.append)
+
+    session.request("get", "/test")
+
+    assert [e.name for e in events] == [
+        "request.start",
+        "request.end",
+        "request.retry",
+        "request.start",
+        "request.end",
+    ]
+    assert events[-1].attributes["status"] == 200
+    assert events[-1].attributes["duration"] >= 0
+
+
+def test_client_listeners_can_be_removed(session_setup: Tuple[MagicMock, Session]):
+    _, session = session_setup
+    client = Client(session=session, bucket="b", collection="c")
+    events = []
+    client.add_listener(events.append)
+    client.clone(bucket="other").remove_listener(events.append)
+
+    client.get_bucket()
+
+    assert events == []
+
+
+def test_session_does_not_measure_without_listeners(
+    session_setup: Tuple[MagicMock, Session], mocker: MockerFixture
+):
+    _, session = session_setup
+    perf_counter = mocker.patch("kinto_http.session.time.perf_counter")
+
+    session.request("get", "/test")
+
+    perf_counter.assert_not_called()
+
+
+def test_client_emits_pagination_and_batch_events(session_setup: Tuple[MagicMock, Session]):
+    requests_mock, session = session_setup
+    client = Client(session=session, bucket="b", collection="c")
+    events = []
+    client.add_listener(events.append)
+    page1 = get_200()
+    page1.json.return_value = {"data": [{"id": "1"}, {"id": "2"}]}
+    page1.headers = {"Next-Page": "https://example.org/next"}
+    page2 = get_200()
+    page2.json.return_value = {"data": [{"id": "3"}]}
+    requests_mock.request.side_effect = [page1, page2]
+
+    client.get_records()
+
+    pages = [e.attributes for e in events if e.name == "pagination.page"]
+    assert [p["records"] for p in pages] == [2, 1]
+
+    batch_response = get_200()
+    batch_response.json.return_value = {"responses": [{"status": 200, "body": {}}] * 2}
+    requests_mock.request.side_effect = None
+    requests_mock.request.return_value = batch_response
+    client._server_settings = {"batch_max_requests": 2}
+    with client.batch() as batch:
+        for i in range(4):
+            batch.create_record(data={"id": str(i)})
+
+    chunks = [e.attributes for e in events if e.name == "batch.chunk"]
+    assert [c["requests"] for c in chunks] == [2, 2]
+
+
+def test_prometheus_listener():
+    prometheus_client = pytest.importorskip("prometheus_client")
+    registry = prometheus_client.CollectorRegistry()
+    listener = instrumentation.PrometheusListener(registry=registry)
+
+    listener(
+        Event(
+            "request.end",
+            dict(
+                method="get",
+                url="http://server/v1/",
+                status=200,
+                error=None,
+                duration=0.3,
+                serialization=0.1,
+                network=0.15,
+                parse=0.05,
+                request_bytes=0,
+                response_bytes=42,
+            ),
+        )
+    )
+    listener(Event("request.retry", dict(status=503, sleep=2)))
+    listener(Event("batch.chunk", dict(url="/batch", requests=25)))
+    listener(Event("pagination.page", dict(url="/records", records=10)))
+    listener(Event("rate_limit", dict(url="/records", seconds=0.5)))
+    listener(Event("backoff.wait", dict(url="/records", seconds=3)))
+    listener(Event("circuit.state", dict(url="http://server", state="open", failures=5)))
+    listener(Event("circuit.reject", dict(url="http://server", retry_after=30)))
+    listener(Event("hedge", dict(url="http://server/v1/", delay=0.2, won=True)))
+    listener(Event("replica.failover", dict(url="http://replica/v1", status=503, error=None)))
+    listener(Event("retry.give_up", dict(url="/records", attempts=3, reason="attempts")))
+    listener(Event("backoff", dict(url="/records", seconds=10)))
+
+    sample = registry.get_sample_value
+    assert sample("kinto_http_requests_total", {"method": "GET", "status": "200"}) == 1
+    assert sample("kinto_http_request_duration_seconds_sum", {"method": "GET"}) == 0.3
+    assert sample("kinto_http_response_bytes_total") == 42
+    assert sample("kinto_http_retries_total", {"status": "503"}) == 1
+    assert sample("kinto_http_retry_sleep_seconds_total") == 2
+    assert sample("kinto_http_batch_chunks_total") == 1
+    assert sample("kinto_http_pages_total") == 1
+    assert sample("kinto_http_rate_limit_wait_seconds_total") == 0.5
+    assert sample("kinto_http_backoff_wait_seconds_total") == 3
+    assert sample("kinto_http_circuit_transitions_total", {"state": "open"}) == 1
+    assert sample("kinto_http_circuit_rejections_total") == 1
+    assert sample("kinto_http_hedges_total", {"won": "true"}) == 1
+    assert sample("kinto_http_replica_failovers_total") == 1
+    assert sample("kinto_http_retry_give_ups_total", {"reason": "attempts"}) == 1
+    assert sample("kinto_http_backoffs_total") == 1
+
+
+def test_prometheus_listener_uses_the_default_registry(mocker: MockerFixture):
+    prometheus_client = pytest.importorskip("prometheus_client")
+    registry = mocker.patch("prometheus_client.REGISTRY", prometheus_client.CollectorRegistry())
+
+    listener = instrumentation.PrometheusListener()
+    listener(Event("backoff", dict(url="/records", seconds=10)))
+
+    assert registry.get_sample_value("kinto_http_backoffs_total") == 1
@@ -0,0 +1,168 @@
+import threading
+
+import pytest
+import requests
+
+from benchmarks.server import Store, running_server
+from kinto_http import Client
+from kinto_http.pools import POOLS, ConnectionPools, PoolRegistry
+from kinto_http.session import Session
+
+
+@pytest.fixture(autouse=True)
+def clear_pools():
+    yield
+    POOLS.clear()
+
+
+def test_pool_sizes_must_be_positive():
+    with pytest.raises(ValueError):
+        ConnectionPools(pool_maxsize=0)
+
+
+def test_pools_are_mounted_on_requests_sessions():
+    pools = ConnectionPools(keep_alive=False)
+    session = requests.Session()
+
+    pools.mount(session)
+
+    assert session.get_adapter("https://example.org") is pools.adapter
+    assert session.get_adapter("http://example.org") is pools.adapter
+    assert session.headers["Connection"] == "close"
+
+
+def test_stats_of_unused_and_closed_pools():
+    pools = ConnectionPools(pool_maxsize=3)
+    pool = pools.adapter.poolmanager.connection_from_url("http://example.org/v1")
+
+    assert pools.stats() == {
+        "http://example.org:80": {
+            "maxsize": 3,
+            "in_use": 0,
+            "idle": 0,
+            "connections": 0,
+            "requests": 0,
+        }
+    }
+    pool.close()
+    assert pools.stats() == {}
+
+
+def test_registry_has_pools_per_server():
+    registry = PoolRegistry()
+
+    assert registry.get("https://a.com/v1") is registry.get("https://a.com/v2/buckets")
+    assert registry.get("https://a.com/v1") is not registry.get("https://b.com/v1")
+
+
+def test_registry_pools_can_be_configured():
+    registry = PoolRegistry()
+    previous = registry.get("https://a.com/v1")
+
+    pools = registry.configure("https://a.com", pool_maxsize=50, pool_block=True)
+
+    assert pools is not previous
+    assert registry.get("https://a.com/v1") is pools
+    assert (pools.pool_maxsize, pools.pool_block) == (50, True)
+
+
+def test_registry_can_be_cleared():
+    registry = PoolRegistry()
+    pools = registry.get("https://a.com/v1")
+    other = registry.get("https://b.com/v1")
+
+    registry.clear("https://a.com")
+    assert registry.get("https://a.com/v1") is not pools
+    assert registry.get("https://b.com/v1") is other
+
+    registry.clear()
+    assert registry.stats() == {}
+
+
+def test_threads_of_a_session_share_its_pools():
+    session = Session("https://example.org/v1", connection_pools=True)
+    adapters = []
+    thread = threading.Thread(
+        target=lambda: adapters.append(session._session.get_adapter("https://example.org"))
+    )
+    thread.start()
+    thread.join()
+
+    assert session.connection_pools is POOLS.get("https://example.org")
+    assert adapters == [session._session.get_adapter("https://example.org")]
+    assert adapters[0] is session.connection_pools.adapter
+
+
+def test_sessions_have_their_own_pools_by_default():
+    session = Session("https://example.org/v1")
+
+    assert session.connection_pools is None
+    assert session._session.get_adapter("https://example.org") is not (
+        Session("https://example.org/v1")._session.get_adapter("https://example.org")
+    )
+
+
+def test_clones_share_the_pools():
+    client = Client(server_url="https://example.org/v1", connection_pools=True)
+
+    clone = client.clone(auth=("user", "pass"))
+
+    assert clone.session.connection_pools is client.session.connection_pools
+
+
+@pytest.fixture
+def server():
+    store = Store()
+    store.put_record("bid", "cid", {"id": "r0"})
+    with running_server(store=store) as server:
+        yield server
+
+
+def get_records_from_threads(clients, threads=4, calls=5):
+    def run(client):
+        for _ in range(calls):
+            client.get_record(id="r0")
+
+    workers = [threading.Thread(target=run, args=(c,)) for c in clients for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def test_clients_and_threads_share_bounded_pools(server):
+    pools = POOLS.configure(server.url, pool_maxsize=2, pool_block=True)
+    clients = [
+        Client(server_url=server.url, bucket="bid", collection="cid", connection_pools=True)
+        for _ in range(5)
+    ]
+
+    get_records_from_threads(clients)
+
+    (stats,) = pools.stats().values()
+    assert stats["requests"] == 5 * 4 * 5
+    assert stats["connections"] <= 2
+    assert stats["in_use"] == 0
+    assert 1 <= stats["idle"] <= 2
+    assert POOLS.stats() == {server.url.rsplit("/", 1)[0]: pools.stats()}
+
+
+def test_connections_are_closed_without_keep_alive(server):
+    accepted = []
+    process_request = server.process_request
+
+    def count_connections(request, address):
+        accepted.append(address)
+        process_request(request, address)
+
+    server.process_request = count_connections
+    pools = ConnectionPools(keep_alive=False)
+    client = Client(server_url=server.url, bucket="bid", collection="cid", connection_pools=pools)
+
+    get_records_from_threads([client], threads=2, calls=3)
+
+    # Never reused, even if the server is slow to close them.
+    assert len(accepted) == 6
+    (stats,) = pools.stats().values()
+    assert stats["requests"] == 6
+    assert stats["idle"] == 0
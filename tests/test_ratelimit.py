@@ -0,0 +1,112 @@
+import asyncio
+import threading
+
+import pytest
+from pytest_mock import MockerFixture
+
+from kinto_http.ratelimit import RateLimiter, TokenBucket, prepaid
+
+
+def test_bucket_allows_bursts_then_spaces_requests(mocker: MockerFixture):
+    mocker.patch("kinto_http.ratelimit.time.monotonic", return_value=100.0)
+    bucket = TokenBucket(rate=10, burst=2)
+
+    assert [bucket.reserve() for _ in range(4)] == pytest.approx([0, 0, 0.1, 0.2])
+
+
+def test_bucket_refills_over_time_up_to_burst(mocker: MockerFixture):
+    monotonic = mocker.patch("kinto_http.ratelimit.time.monotonic", return_value=100.0)
+    bucket = TokenBucket(rate=10, burst=2)
+    bucket.reserve()
+    bucket.reserve()
+
+    monotonic.return_value = 100.15
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.05)
+
+    monotonic.return_value = 1000
+    assert [bucket.reserve() for _ in range(3)] == pytest.approx([0, 0, 0.1])
+
+
+def test_bucket_burst_defaults_to_rate():
+    assert TokenBucket(rate=20).burst == 20
+    assert TokenBucket(rate=0.5).burst == 1
+
+
+def test_rate_must_be_positive():
+    with pytest.raises(ValueError):
+        RateLimiter(rate=0)
+
+
+def test_bucket_reservations_are_thread_safe(mocker: MockerFixture):
+    mocker.patch("kinto_http.ratelimit.time.monotonic", return_value=100.0)
+    bucket = TokenBucket(rate=100, burst=1)
+    delays = []
+
+    def reserve():
+        for _ in range(50):
+            delays.append(bucket.reserve())
+
+    threads = [threading.Thread(target=reserve) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(delays) == pytest.approx([i / 100 for i in range(400)])
+
+
+def test_limiter_has_a_bucket_per_server(mocker: MockerFixture):
+    sleep = mocker.patch("kinto_http.ratelimit.time.sleep")
+    limiter = RateLimiter(rate=1)
+
+    assert limiter.acquire("https://a.example.com/v1/buckets") == 0
+    assert limiter.acquire("https://b.example.com/v1/buckets") == 0
+    assert limiter.acquire("https://a.example.com/v1/") > 0.9
+    sleep.assert_called_once()
+
+
+def test_acquire_async_does_not_block_the_loop(mocker: MockerFixture):
+    sleep = mocker.patch("kinto_http.ratelimit.time.sleep")
+    limiter = RateLimiter(rate=50, burst=1)
+
+    async def acquire_all():
+        return await asyncio.gather(
+            *(limiter.acquire_async("https://example.com") for _ in range(3))
+        )
+
+    delays = asyncio.run(acquire_all())
+
+    assert sorted(delays) == pytest.approx([0, 0.02, 0.04], abs=0.01)
+    assert not sleep.called
+
+
+def test_prepaid_skips_the_first_acquisition_only(mocker: MockerFixture):
+    mocker.patch("kinto_http.ratelimit.time.sleep")
+    limiter = RateLimiter(rate=1)
+    limiter.acquire("https://example.com")  # Empty the bucket.
+
+    def requests():
+        return [
+            limiter.acquire("https://other.com"),
+            limiter.acquire("https://example.com/v1/"),
+            limiter.acquire("https://example.com/v1/"),
+        ]
+
+    delays = prepaid("https://example.com/v1", requests)()
+
+    assert delays[:2] == [0, 0]
+    assert delays[2] > 0.9
+    assert limiter.acquire("https://example.com") > 1.9
+
+
+def test_unused_prepaid_tokens_are_given_back(mocker: MockerFixture):
+    mocker.patch("kinto_http.ratelimit.time.monotonic", return_value=100.0)
+    limiter = RateLimiter(rate=1)
+    limiter.acquire("https://example.com")
+
+    prepaid("https://example.com/v1", lambda: limiter.acquire("https://other.com"), limiter)()
+    assert limiter.bucket("https://example.com").reserve() == 0
+
+    prepaid("https://example.com/v1", lambda: limiter.acquire("https://example.com"), limiter)()
+    assert limiter.bucket("https://example.com").reserve() == pytest.approx(1)
@@ -0,0 +1,241 @@
+import collections
+from typing import Tuple
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+from pytest_mock import MockerFixture
+
+from benchmarks.server import Faults, Store, running_server
+from kinto_http import Client
+from kinto_http.replicas import ReplicaRouter
+from kinto_http.session import Session
+from kinto_http.utils import url_origin
+
+from .support import get_200, get_503
+
+
+@pytest.fixture
+def clock(mocker: MockerFixture):
+    now = [1000.0]
+    mocker.patch("kinto_http.replicas.time.monotonic", side_effect=lambda: now[0])
+    return now
+
+
+def test_router_prefers_the_fastest_replica():
+    router = ReplicaRouter(["https://r1", "https://r2"])
+    r1, r2 = router.replicas
+    for replica, latency in ((r1, 0.3), (r2, 0.1)):
+        router.sent(replica)
+        router.done(replica, latency)
+
+    assert router.choose() is r2
+
+    # Weighted by the requests in flight.
+    for _ in range(3):
+        router.sent(r2)
+    assert router.choose() is r1
+
+
+def test_router_latency_is_a_moving_average():
+    router = ReplicaRouter(["https://r1"], smoothing=0.5)
+    replica = router.replicas[0]
+    for latency in (1.0, 2.0, 2.0):
+        router.sent(replica)
+        router.done(replica, latency)
+
+    assert replica.latency == 1.75
+    assert replica.in_flight == 0
+
+
+def test_failed_replicas_are_skipped_until_the_cooldown(clock):
+    router = ReplicaRouter(["https://r1", "https://r2"], cooldown=10)
+    r1, r2 = router.replicas
+    router.sent(r1)
+    router.done(r1, None)
+
+    assert router.choose() is r2
+    assert router.choose(exclude={"https://r2"}) is None
+
+    clock[0] += 10
+    assert router.choose(exclude={"https://r2"}) is r1
+
+
+def test_reads_go_to_the_primary_after_writes(clock):
+    router = ReplicaRouter(["https://r1"], read_your_writes=5)
+
+    router.wrote()
+    assert router.choose() is None
+
+    clock[0] += 5
+    assert router.choose() is router.replicas[0]
+
+
+def test_writes_do_not_change_routing_without_read_your_writes():
+    router = ReplicaRouter(["https://r1"])
+    router.wrote()
+
+    assert router.choose() is router.replicas[0]
+
+
+def test_router_needs_replicas():
+    with pytest.raises(ValueError):
+        ReplicaRouter([])
+
+
+@pytest.fixture
+def replicated_session(session_setup: Tuple[MagicMock, Session]):
+    requests_mock, _ = session_setup
+    session = Session(
+        "https://primary/v1",
+        read_replicas=["https://r1/v1", "https://r2/v1"],
+        read_your_writes=30,
+    )
+    return requests_mock, session
+
+
+def urls(requests_mock):
+    return [call[0][1] for call in requests_mock.request.call_args_list]
+
+
+def test_session_sends_reads_to_replicas_and_writes_to_the_primary(replicated_session):
+    requests_mock, session = replicated_session
+
+    session.request("get", "/buckets")
+    session.request("head", "/buckets")
+    session.request("post", "/buckets", data={})
+    session.request("get", "/buckets")
+
+    replicas = {"https://r1/v1/buckets", "https://r2/v1/buckets"}
+    assert urls(requests_mock)[0] in replicas
+    assert urls(requests_mock)[1] in replicas
+    # Read your writes.
+    assert urls(requests_mock)[2:] == ["https://primary/v1/buckets"] * 2
+
+
+def test_session_does_not_route_absolute_urls(replicated_session):
+    requests_mock, session = replicated_session
+
+    session.request("get", "https://r2/v1/buckets?_token=abc")
+
+    assert urls(requests_mock) == ["https://r2/v1/buckets?_token=abc"]
+
+
+def test_session_fails_over_to_other_replicas_then_primary(
+    replicated_session, mocker: MockerFixture
+):
+    requests_mock, session = replicated_session
+    sleep = mocker.patch("kinto_http.session.time.sleep")
+    requests_mock.request.side_effect = [
+        requests.exceptions.ConnectionError(),
+        get_503(),
+        get_200(),
+        get_200(),
+    ]
+    events = []
+    session.add_listener(events.append)
+
+    session.request("get", "/buckets")
+
+    assert sorted(urls(requests_mock)[:2]) == ["https://r1/v1/buckets", "https://r2/v1/buckets"]
+    assert urls(requests_mock)[2] == "https://primary/v1/buckets"
+    failovers = [e.attributes["status"] for e in events if e.name == "replica.failover"]
+    assert sorted(failovers, key=str) == [503, None]
+    assert not sleep.called
+    # Failed replicas are skipped by the next reads.
+    session.request("get", "/buckets")
+    assert urls(requests_mock)[3] == "https://primary/v1/buckets"
+
+
+def test_session_fails_over_when_the_circuit_of_a_replica_is_open(
+    session_setup: Tuple[MagicMock, Session],
+):
+    requests_mock, _ = session_setup
+    session = Session("https://primary/v1", read_replicas=["https://r1/v1"], circuit_breaker=1)
+    session.circuit_breaker.circuit("https://r1/v1").failure()
+
+    session.request("get", "/buckets")
+
+    assert urls(requests_mock) == ["https://primary/v1/buckets"]
+
+
+def test_primary_failures_are_retried_as_usual(
+    session_setup: Tuple[MagicMock, Session], mocker: MockerFixture
+):
+    requests_mock, _ = session_setup
+    mocker.patch("kinto_http.session.time.sleep")
+    requests_mock.request.side_effect = [get_503(), get_503(), get_200()]
+    session = Session("https://primary/v1", read_replicas=["https://r1/v1"], retry=1)
+
+    session.request("get", "/buckets")
+
+    assert urls(requests_mock) == [
+        "https://r1/v1/buckets",
+        "https://primary/v1/buckets",
+        "https://primary/v1/buckets",
+    ]
+
+
+def test_clones_keep_the_replicas_of_the_same_server():
+    client = Client(server_url="https://primary/v1", read_replicas=["https://r1/v1"])
+
+    assert client.clone(auth=("a", "b")).session.read_replicas is client.session.read_replicas
+    assert client.clone(server_url="https://other/v1").session.read_replicas is None
+
+
+def test_replicas_against_stand_in_servers():
+    store = Store()
+    store.put_record("bid", "cid", {"id": "r0"})
+    with (
+        running_server(store=store) as primary,
+        running_server(store=store, faults=Faults(rtt=0.02)) as slow,
+        running_server(store=store) as fast,
+    ):
+        client = Client(
+            server_url=primary.url,
+            bucket="bid",
+            collection="cid",
+            read_replicas=[slow.url, fast.url],
+        )
+        servers = collections.Counter()
+        client.add_listener(
+            lambda e: e.name == "request.end" and servers.update([url_origin(e.attributes["url"])])
+        )
+
+        for _ in range(50):
+            client.get_record(id="r0")
+        assert servers[url_origin(fast.url)] > 40
+
+        # Switch the fast replica off.
+        fast.faults = Faults(drops=1)
+        servers.clear()
+        for _ in range(10):
+            client.get_record(id="r0")
+        assert servers[url_origin(slow.url)] == 10
+
+
+def test_paginated_reads_do_not_pin_reads_to_the_primary():
+    store = Store()
+    for i in range(5):
+        store.put_record("bid", "cid", {"id": f"r{i}"})
+    with (
+        running_server(store=store, page_size=2) as primary,
+        running_server(store=store, page_size=2) as replica,
+    ):
+        client = Client(
+            server_url=primary.url,
+            bucket="bid",
+            collection="cid",
+            read_replicas=[replica.url],
+            read_your_writes=30,
+        )
+        servers = []
+        client.add_listener(
+            lambda e: e.name == "request.end" and servers.append(url_origin(e.attributes["url"]))
+        )
+
+        # The next pages are absolute URLs.
+        assert len(client.get_records()) == 5
+        client.get_record(id="r0")
+
+        assert servers == [url_origin(replica.url)] * 4
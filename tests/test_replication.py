@@ -1,6 +1,6 @@
 from pytest_mock import MockerFixture
 
-from kinto_http import Client, exceptions
+from kinto_http import Client, exceptions, tracing
 from kinto_http.replication import replicate
 
 from .support import mock_response
@@ -84,3 +84,16 @@ def test_logger_outputs_replication_information(mocker: MockerFixture):
     )
     logger.info.assert_any_call(msg)
     logger.info.assert_any_call("replication of 0 records")
+
+
+def test_replication_is_traced(mocker: MockerFixture):
+    tracer = tracing.InMemoryTracer()
+    destination = mocker.MagicMock(bucket_name="bid", collection_name="cid")
+    destination.session.tracer = tracer
+    origin = mocker.MagicMock()
+    origin.get_records.return_value = [{"id": "1234"}, {"id": "4567"}]
+
+    replicate(origin, destination)
+
+    (span,) = tracer.find("replicate")
+    assert span.attributes == {"bucket": "bid", "collection": "cid", "records": 2}
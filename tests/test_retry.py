@@ -0,0 +1,190 @@
+from typing import Tuple
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+from pytest_mock import MockerFixture
+
+from kinto_http import Client, KintoException
+from kinto_http.retry import RetryDecision, RetryPolicy, call
+from kinto_http.session import Session
+
+from .support import get_200, get_http_response
+
+
+@pytest.fixture
+def no_jitter(mocker: MockerFixture):
+    # Return the upper bound of the jittered delay.
+    return mocker.patch("kinto_http.retry.random.uniform", side_effect=lambda a, b: b)
+
+
+def test_server_errors_are_retried_with_exponential_backoff(no_jitter):
+    policy = RetryPolicy(retries=4, backoff_factor=1, max_backoff=5)
+
+    delays = [policy.decide(attempt, "GET", status=500).delay for attempt in range(4)]
+
+    assert delays == [1, 2, 4, 5]
+    assert policy.decide(4, "GET", status=500) == RetryDecision(None, "exhausted")
+
+
+@pytest.mark.parametrize("status", [400, 401, 403, 404, 412])
+def test_client_errors_are_not_retriable(status):
+    assert RetryPolicy(retries=3).decide(0, "GET", status=status) is None
+
+
+def test_retry_after_header_is_a_minimum(no_jitter):
+    policy = RetryPolicy(retries=3, backoff_factor=1)
+
+    assert policy.decide(0, "GET", status=503, retry_after="10").delay == 10
+    assert policy.decide(0, "GET", status=503, retry_after="0").delay == 1
+    assert policy.decide(0, "GET", status=503, retry_after="soon").delay == 1
+
+
+def test_forced_retry_after_overrides_backoff(no_jitter):
+    policy = RetryPolicy(retries=3, retry_after=2)
+
+    assert policy.decide(2, "GET", status=503, retry_after="10").delay == 2
+
+
+def test_budget_limits_the_time_spent_retrying(no_jitter):
+    policy = RetryPolicy(retries=10, backoff_factor=1, budget=5)
+
+    assert policy.decide(1, "GET", status=500, elapsed=2).delay == 2
+    assert policy.decide(2, "GET", status=500, elapsed=2) == RetryDecision(None, "budget")
+
+
+def test_processed_requests_are_retried_if_idempotent():
+    policy = RetryPolicy(retries=1)
+
+    for method in ("GET", "PUT", "DELETE", "HEAD"):
+        assert policy.decide(0, method, status=500).delay is not None
+    for method in ("POST", "PATCH"):
+        assert policy.decide(0, method, status=500) == RetryDecision(None, "not_idempotent")
+    assert policy.decide(0, "POST", status=500, idempotent=True).delay is not None
+    assert policy.decide(0, "PUT", status=500, idempotent=False).delay is None
+
+
+@pytest.mark.parametrize("status", [409, 429, 503])
+def test_unprocessed_requests_are_always_retriable(status):
+    assert RetryPolicy(retries=1).decide(0, "POST", status=status).delay is not None
+
+
+def test_non_idempotent_retries_can_be_enabled():
+    policy = RetryPolicy(retries=1, retry_non_idempotent=True)
+
+    assert policy.decide(0, "PATCH", status=502).delay is not None
+
+
+def test_network_errors_are_retried_once_by_default():
+    policy = RetryPolicy()
+    error = requests.exceptions.ConnectionError()
+
+    assert policy.decide(0, "GET", error=error).delay is not None
+    assert policy.decide(1, "GET", error=error) == RetryDecision(None, "exhausted")
+    assert policy.decide(0, "POST", error=error) == RetryDecision(None, "not_idempotent")
+    assert policy.decide(0, "GET", error=ValueError()) is None
+
+
+def test_replace_returns_a_copy():
+    policy = RetryPolicy(retries=1, budget=10)
+    other = policy.replace(retries=3)
+
+    assert (policy.retries, other.retries, other.budget) == (1, 3, 10)
+
+
+def test_session_retries_network_errors_of_idempotent_requests(
+    session_setup: Tuple[MagicMock, Session], mocker: MockerFixture
+):
+    requests_mock, session = session_setup
+    mocker.patch("kinto_http.session.time.sleep")
+    requests_mock.request.side_effect = [requests.exceptions.Timeout(), get_200()]
+
+    session.request("get", "/test")
+
+    assert requests_mock.request.call_count == 2
+
+
+def test_session_does_not_retry_network_errors_of_posts(
+    session_setup: Tuple[MagicMock, Session], mocker: MockerFixture
+):
+    requests_mock, session = session_setup
+    requests_mock.request.side_effect = [requests.exceptions.Timeout(), get_200()]
+    events = []
+    session.add_listener(events.append)
+
+    with pytest.raises(requests.exceptions.Timeout):
+        session.request("post", "/test", data={})
+
+    assert events[-1].name == "retry.give_up"
+    assert events[-1].attributes["reason"] == "not_idempotent"
+
+
+def test_session_gives_up_when_retries_are_exhausted(
+    session_setup: Tuple[MagicMock, Session], mocker: MockerFixture
+):
+    requests_mock, _ = session_setup
+    mocker.patch("kinto_http.session.time.sleep")
+    requests_mock.request.return_value = get_http_response(500)
+    session = Session("https://example.org", retry_policy=RetryPolicy(retries=2))
+    events = []
+    session.add_listener(events.append)
+
+    with pytest.raises(KintoException):
+        session.request("get", "/test")
+
+    assert [e.attributes["attempt"] for e in events if e.name == "request.retry"] == [1, 2]
+    assert events[-1].name == "retry.give_up"
+    assert events[-1].attributes["attempts"] == 2
+
+
+def test_changing_the_retries_of_a_session_does_not_change_shared_policies():
+    policy = RetryPolicy(retries=1)
+    session = Session("https://example.org", retry_policy=policy)
+
+    session.nb_retry = 5
+    session.retry_after = 2
+
+    assert (session.retry_policy.retries, session.retry_policy.retry_after) == (5, 2)
+    assert (policy.retries, policy.retry_after) == (1, None)
+
+
+def test_clones_share_the_retry_policy():
+    policy = RetryPolicy(retries=3)
+    client = Client(server_url="https://example.org/v1", retry_policy=policy)
+
+    assert client.clone(auth=("user", "pass")).session.retry_policy is policy
+    assert client.clone(auth=("user", "pass"), retry=1).session.nb_retry == 1
+
+
+def test_clones_keep_the_custom_retry_policy_with_new_retries():
+    policy = RetryPolicy(retries=3, retry_after=5, network_retries=2)
+    client = Client(server_url="https://example.org/v1", retry_policy=policy)
+
+    clone = client.clone(server_url="https://other.org/v1", retry=1, retry_after=0)
+
+    assert clone.session.retry_policy is not policy
+    assert clone.session.retry_policy.retries == 1
+    assert clone.session.retry_policy.retry_after == 0
+    assert clone.session.retry_policy.network_retries == 2
+    assert policy.retries == 3
+
+
+def test_call_retries_network_errors(mocker: MockerFixture):
+    mocker.patch("kinto_http.retry.time.sleep")
+    session = Session("https://example.org", retry_policy=RetryPolicy(network_retries=2))
+    func = mocker.Mock(side_effect=[requests.exceptions.ConnectionError()] * 2 + ["ok"])
+
+    assert call(session, "GET", "https://cdn/file", func) == "ok"
+
+    func.side_effect = requests.exceptions.ConnectionError()
+    with pytest.raises(requests.exceptions.ConnectionError):
+        call(session, "GET", "https://cdn/file", func)
+
+
+def test_call_does_not_retry_without_policy(mocker: MockerFixture):
+    func = mocker.Mock(side_effect=requests.exceptions.ConnectionError())
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        call(mocker.MagicMock(), "GET", "https://cdn/file", func)
+
+    assert func.call_count == 1
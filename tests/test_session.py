@@ -13,7 +13,9 @@ from pytest_mock.plugin import MockerFixture
 import kinto_http
 from kinto_http.constants import USER_AGENT
 from kinto_http.exceptions import BackoffException, KintoException
-from kinto_http.session import Session, create_session
+from kinto_http.instrumentation import Event
+from kinto_http.ratelimit import RateLimiter
+from kinto_http.session import BACKOFF_DEADLINES, Session, create_session
 
 from .support import get_200, get_403, get_503, get_http_response
 
@@ -178,6 +180,25 @@ def test_passed_data_is_passed_as_is_when_files_are_posted(
     )
 
 
+def test_multipart_encoder_is_streamed_with_payload_fields(
+    session_setup: Tuple[MagicMock, Session], tmp_path
+):
+    requests_mock, session = session_setup
+    requests_mock.request.return_value = get_200()
+    filepath = tmp_path / "file.txt"
+    filepath.write_bytes(b"hello")
+
+    with open(filepath, "rb") as f:
+        body = kinto_http.utils.MultipartEncoder([("attachment", ("file.txt", f, "text/plain"))])
+        session.request("post", "/test", data='{"foo": "bar"}', files=body)
+
+    _, kwargs = requests_mock.request.call_args
+    assert "files" not in kwargs
+    assert kwargs["data"] is body
+    assert kwargs["headers"]["Content-Type"] == body.content_type
+    assert body.fields == {"data": '{"foo": "bar"}'}
+
+
 def test_passed_permissions_is_added_in_the_payload(
     session_setup: Tuple[MagicMock, Session], mocker: MockerFixture
 ):
@@ -472,15 +493,17 @@ def test_retries_on_409_errors(session_retry_setup: Tuple[MagicMock, Session]):
     assert session.request("GET", "/v1/foobar")  # Not raising.
 
 
-def test_does_not_wait_if_retry_after_header_is_not_present(
+def test_waits_a_jittered_backoff_if_retry_after_header_is_not_present(
     session_retry_setup: Tuple[MagicMock, Session], mocker: MockerFixture
 ):
     requests_mock, _ = session_retry_setup
-    requests_mock.request.side_effect = [get_503(), get_200()]
+    requests_mock.request.side_effect = [get_503(), get_503(), get_200()]
+    uniform = mocker.patch("kinto_http.retry.random.uniform", return_value=0.1)
     sleep_mocked = mocker.patch("kinto_http.session.time.sleep")
-    session = Session("https://example.org", retry=1)
+    session = Session("https://example.org", retry=2)
     session.request("GET", "/v1/foobar")
-    sleep_mocked.assert_called_with(0)
+    sleep_mocked.assert_called_with(0.1)
+    assert [c.args for c in uniform.call_args_list] == [(0, 0.2), (0, 0.4)]
 
 
 def test_waits_if_retry_after_header_is_present(
@@ -564,3 +587,97 @@ def test_dry_mode_logs_debug(caplog):
     assert body == {}
     assert headers == {"Content-Type": "application/json"}
     assert caplog.messages == ["(dry mode) GET https://foo:42/test?_since=333"]
+
+
+def test_requests_wait_for_the_rate_limiter(
+    session_setup: Tuple[MagicMock, Session], mocker: MockerFixture
+):
+    session = Session("https://example.org", rate_limit=10, rate_limit_burst=1)
+    acquire = mocker.patch.object(session.rate_limiter, "acquire", return_value=0.5)
+    events = []
+    session.add_listener(events.append)
+
+    session.request("get", "/test")
+
+    acquire.assert_called_with("https://example.org/test")
+    assert events[0] == Event("rate_limit", {"url": "https://example.org/test", "seconds": 0.5})
+
+
+def test_rate_limiter_can_be_shared_between_sessions(session_setup: Tuple[MagicMock, Session]):
+    limiter = RateLimiter(rate=5)
+
+    assert Session("https://a.org", rate_limit=limiter).rate_limiter is limiter
+    assert Session("https://b.org", rate_limit=limiter).rate_limiter is limiter
+    assert Session("https://c.org").rate_limiter is None
+
+
+def test_dry_mode_is_not_rate_limited(
+    session_setup: Tuple[MagicMock, Session], mocker: MockerFixture
+):
+    session = Session("https://example.org", rate_limit=10, dry_mode=True)
+    acquire = mocker.patch.object(session.rate_limiter, "acquire")
+
+    session.request("get", "/test")
+
+    assert not acquire.called
+
+
+@pytest.fixture
+def fake_clock(mocker: MockerFixture):
+    now = [1000.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    mocker.patch("kinto_http.session.time.time", side_effect=lambda: now[0])
+    mocker.patch("kinto_http.session.time.sleep", side_effect=sleep)
+    BACKOFF_DEADLINES.clear()
+    yield now
+    BACKOFF_DEADLINES.clear()
+
+
+def test_backoff_wait_mode_waits_for_the_deadline(
+    session_setup: Tuple[MagicMock, Session], fake_clock
+):
+    requests_mock, _ = session_setup
+    response = get_200()
+    response.headers = {"Backoff": "10"}
+    requests_mock.request.side_effect = [response, get_200()]
+    session = Session("https://example.org", backoff_mode="wait")
+    events = []
+    session.add_listener(events.append)
+
+    session.request("get", "/test")
+    session.request("get", "/test")
+
+    assert fake_clock[0] == 1010
+    assert session.backoff_waited == 10
+    assert Event("backoff.wait", {"url": "https://example.org/test", "seconds": 10}) in events
+
+
+def test_backoff_deadline_is_shared_by_the_sessions_of_a_server(
+    session_setup: Tuple[MagicMock, Session], fake_clock
+):
+    requests_mock, _ = session_setup
+    response = get_200()
+    response.headers = {"Backoff": "10"}
+    requests_mock.request.side_effect = [response, get_200(), get_200(), get_200()]
+    session = Session("https://example.org/v1", backoff_mode="wait")
+    other_server = Session("https://example.com/v1", backoff_mode="wait")
+    same_server = Session("https://example.org/v1", backoff_mode="wait")
+    raise_mode = Session("https://example.org/v1")
+
+    session.request("get", "/test")
+    other_server.request("get", "/test")
+    raise_mode.request("get", "/test")
+    assert fake_clock[0] == 1000
+    same_server.request("get", "/test")
+
+    assert fake_clock[0] == 1010
+    assert same_server.backoff_waited == 10
+    assert other_server.backoff_waited == 0
+
+
+def test_backoff_mode_must_be_known():
+    with pytest.raises(ValueError):
+        Session("https://example.org", backoff_mode="ignore")
@@ -0,0 +1,160 @@
+from typing import Tuple
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_mock import MockerFixture
+
+from kinto_http import Client, tracing
+from kinto_http.session import Session
+
+from .support import get_200, get_http_response
+
+
+def paginated_responses():
+    page1 = get_200()
+    page1.json.return_value = {"data": [{"id": "1"}, {"id": "2"}]}
+    page1.headers = {"Next-Page": "https://example.org/next"}
+    page1.content = b"x" * 10
+    page2 = get_200()
+    page2.json.return_value = {"data": [{"id": "3"}]}
+    page2.content = b"x" * 5
+    return [page1, page2]
+
+
+def test_noop_tracer_records_nothing(session_setup: Tuple[MagicMock, Session]):
+    _, session = session_setup
+    assert session.tracer is tracing.NOOP_TRACER
+    with session.tracer.start_span("foo") as span:
+        span.set_attribute("a", 1)
+
+
+def test_in_memory_tracer_links_children_to_parents():
+    tracer = tracing.InMemoryTracer()
+
+    with tracer.start_span("parent", a=1) as parent:
+        with tracer.start_span("child"):
+            pass
+    with pytest.raises(ValueError):
+        with tracer.start_span("failing"):
+            raise ValueError
+
+    assert [s.name for s in tracer.spans] == ["child", "parent", "failing"]
+    assert tracer.find("child")[0].parent is parent
+    assert tracer.find("parent")[0].parent is None
+    assert tracer.find("parent")[0].duration >= 0
+    assert isinstance(tracer.find("failing")[0].error, ValueError)
+    assert repr(tracer.find("parent")[0]) == "<Span parent {'a': 1}>"
+
+    tracer.clear()
+    assert tracer.spans == []
+
+
+def test_get_records_spans(session_setup: Tuple[MagicMock, Session]):
+    requests_mock, session = session_setup
+    tracer = tracing.InMemoryTracer()
+    session.tracer = tracer
+    client = Client(session=session, bucket="b", collection="c")
+    requests_mock.request.side_effect = paginated_responses()
+
+    client.get_records()
+
+    (operation,) = tracer.find("get_records")
+    assert operation.attributes == {"bucket": "b", "collection": "c", "records": 3}
+    pages = tracer.find("pagination.page")
+    assert [p.attributes["records"] for p in pages] == [2, 1]
+    assert all(p.parent is operation for p in pages)
+    requests = tracer.find("http.request")
+    assert [r.parent for r in requests] == pages
+    assert requests[0].attributes == {
+        "method": "GET",
+        "url": "https://example.org/buckets/b/collections/c/records",
+        "status": 200,
+        "response_bytes": 10,
+    }
+
+
+def test_retried_request_spans(session_setup: Tuple[MagicMock, Session], mocker: MockerFixture):
+    requests_mock, session = session_setup
+    mocker.patch("kinto_http.session.deadlines.sleep")
+    tracer = tracing.InMemoryTracer()
+    session.tracer = tracer
+    session.nb_retry = 2
+    requests_mock.request.side_effect = [get_http_response(503), get_200()]
+
+    session.request("GET", "/buckets")
+
+    (request,) = tracer.find("http.request")
+    assert request.attributes["retries"] == 1
+    assert request.attributes["status"] == 200
+
+
+def test_batch_spans(session_setup: Tuple[MagicMock, Session]):
+    requests_mock, _ = session_setup
+    tracer = tracing.InMemoryTracer()
+    client = Client(server_url="https://example.org", bucket="b", collection="c", tracer=tracer)
+    assert client.session.tracer is tracer
+    assert client.clone(server_url="https://other.org").session.tracer is tracer
+    client._server_settings = {"batch_max_requests": 2}
+    response = get_200()
+    response.json.return_value = {"responses": [{"status": 200, "body": {}}] * 2}
+    requests_mock.request.return_value = response
+
+    with client.batch() as batch:
+        for i in range(4):
+            batch.create_record(data={"id": str(i)})
+
+    (span,) = tracer.find("batch")
+    assert span.attributes == {"bucket": "b", "collection": "c", "requests": 4}
+    chunks = tracer.find("batch.chunk")
+    assert [c.attributes["requests"] for c in chunks] == [2, 2]
+    assert all(c.parent is span for c in chunks)
+
+
+def test_spans_are_propagated_to_worker_threads(session_setup: Tuple[MagicMock, Session]):
+    requests_mock, session = session_setup
+    tracer = tracing.InMemoryTracer()
+    session.tracer = tracer
+    client = Client(session=session, bucket="b", collection="c", max_url_length=120)
+    requests_mock.request.return_value = get_http_response(200, body={"data": []})
+    requests_mock.request.return_value.json.return_value = {"data": []}
+
+    client.get_records(in_id=[f"record-{i}" for i in range(20)])
+
+    (operation,) = tracer.find("get_records")
+    pages = tracer.find("pagination.page")
+    assert len(pages) > 1
+    assert all(p.parent is operation for p in pages)
+
+
+def test_opentelemetry_tracer():
+    pytest.importorskip("opentelemetry.sdk")
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    tracer = tracing.OpenTelemetryTracer(provider.get_tracer("tests"))
+
+    with tracer.start_span("parent", bucket="b", collection=None):
+        with tracer.start_span("child") as span:
+            span.set_attribute("records", 3)
+
+    child, parent = exporter.get_finished_spans()
+    assert dict(parent.attributes) == {"bucket": "b"}
+    assert dict(child.attributes) == {"records": 3}
+    assert child.parent.span_id == parent.context.span_id
+
+
+def test_opentelemetry_tracer_uses_the_global_tracer_provider(mocker: MockerFixture):
+    pytest.importorskip("opentelemetry")
+    get_tracer = mocker.patch("opentelemetry.trace.get_tracer")
+
+    tracer = tracing.OpenTelemetryTracer()
+    tracer.start_span("operation", bucket="b")
+
+    get_tracer.assert_called_with("kinto_http")
+    get_tracer.return_value.start_as_current_span.assert_called_with(
+        "operation", attributes={"bucket": "b"}
+    )
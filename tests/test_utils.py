@@ -1,3 +1,8 @@
+import hashlib
+import os
+
+import pytest
+
 from kinto_http import utils
 
 
@@ -237,3 +242,181 @@ def test_collection_diff_empty_collections():
     assert to_create == []
     assert to_update == []
     assert to_delete == []
+
+
+def test_encode_params_joins_list_filters():
+    assert utils.encode_params({"in_id": ["a", "b"], "exclude_id": "c", "_limit": 10}) == {
+        "in_id": "a,b",
+        "exclude_id": "c,",
+        "_limit": "10",
+    }
+
+
+def test_split_values_respects_max_length():
+    chunks = utils.split_values(["aaa", "bbb", "ccc", "ddd"], 10)
+    assert chunks == [["aaa", "bbb"], ["ccc", "ddd"]]
+
+
+def test_split_values_keeps_oversized_value_alone():
+    assert utils.split_values(["a" * 20, "b"], 10) == [["a" * 20], ["b"]]
+
+
+def test_ichunks_splits_any_iterable():
+    assert list(utils.ichunks(iter(range(5)), 2)) == [[0, 1], [2, 3], [4]]
+
+
+def test_concurrent_map_keeps_order():
+    assert list(utils.concurrent_map(lambda x: x * 2, iter(range(10)), 3)) == list(range(0, 20, 2))
+
+
+def test_collection_diff_does_not_mutate_source():
+    src = [{"id": 1, "name": "Alice", "last_modified": 42}]
+    dest = [{"id": 1, "name": "Bob", "last_modified": 12}]
+    _, to_update, _ = utils.collection_diff(src, dest)
+    assert to_update == [
+        ({"id": 1, "name": "Bob", "last_modified": 12}, {"id": 1, "name": "Alice"})
+    ]
+    assert src == [{"id": 1, "name": "Alice", "last_modified": 42}]
+
+
+def test_record_digest_ignores_server_fields():
+    a = {"id": 1, "name": "Alice", "tags": [1, 2], "last_modified": 123, "schema": 1}
+    b = {"tags": [1, 2], "name": "Alice", "id": 1}
+    assert utils.record_digest(a) == utils.record_digest(b)
+    assert utils.record_digest(a) != utils.record_digest({**b, "name": "Bob"})
+
+
+@pytest.mark.parametrize("external", [False, True])
+def test_iter_collection_diff(external):
+    src = iter(
+        [
+            {"id": "b", "name": "Bob"},
+            {"id": "a", "name": "Alice"},
+            {"id": "c", "name": "CharlieUpdated"},
+        ]
+    )
+    dest = iter(
+        [
+            {"id": "c", "name": "Charlie", "last_modified": 3},
+            {"id": "d", "name": "Dave", "last_modified": 4},
+            {"id": "b", "name": "Bob", "last_modified": 2},
+        ]
+    )
+    changes = utils.iter_collection_diff(src, dest, external=external, buffer_size=2)
+    assert sorted(changes) == [
+        ("create", "a", {"id": "a", "name": "Alice"}, None),
+        ("delete", "d", None, 4),
+        ("update", "c", {"id": "c", "name": "CharlieUpdated"}, 3),
+    ]
+
+
+def test_external_sort_merges_sorted_runs():
+    items = [5, 3, 9, 1, 7, 2, 8]
+    assert list(utils.external_sort(items, key=lambda x: -x, buffer_size=3)) == sorted(
+        items, reverse=True
+    )
+
+
+def test_sort_mixed_types_like_the_server():
+    records = [{"v": [1]}, {"v": True}, {"v": 2}, {"v": "a"}, {"v": None}, {}, {"v": {"a": 1}}]
+    result = utils.sort_records(records, "v")
+    assert result == [
+        {"v": None},
+        {"v": "a"},
+        {"v": 2},
+        {"v": True},
+        {"v": [1]},
+        {"v": {"a": 1}},
+        {},
+    ]
+    assert utils.sort_records(records, "-v") == result[::-1]
+
+
+def test_sort_non_latin_and_large_values():
+    records = [{"v": "€uro"}, {"v": "日本"}, {"v": "abc"}, {"v": 10**30}, {"v": -(10**30)}]
+    result = utils.sort_records(records, "-v")
+    assert result == [{"v": 10**30}, {"v": -(10**30)}, {"v": "日本"}, {"v": "€uro"}, {"v": "abc"}]
+
+
+def test_sort_by_subfield():
+    records = [{"author": {"name": "Bob"}}, {"author": {"name": "Alice"}}]
+    result = utils.sort_records(records, "author.name")
+    assert result == [{"author": {"name": "Alice"}}, {"author": {"name": "Bob"}}]
+
+
+def test_sort_by_missing_subfield():
+    records = [{"author": "Bob"}, {}, {"author": {"name": "Alice"}}, {"author": {}}]
+    result = utils.sort_records(records, "author.name")
+    assert result == [{"author": {"name": "Alice"}}, {"author": "Bob"}, {}, {"author": {}}]
+    assert list(utils.iter_sort_records(iter(records), "-author.name")) == [
+        {"author": "Bob"},
+        {},
+        {"author": {}},
+        {"author": {"name": "Alice"}},
+    ]
+
+
+def test_sort_is_stable():
+    records = [{"id": i, "v": i % 2} for i in range(6)]
+    result = utils.sort_records(records, "-v")
+    assert [r["id"] for r in result] == [1, 3, 5, 0, 2, 4]
+
+
+def test_iter_sort_records_matches_sort_records():
+    records = [{"id": i, "name": "abc"[i % 3], "age": (i * 7) % 5} for i in range(20)]
+    result = utils.iter_sort_records(iter(records), "name,-age,id", buffer_size=6)
+    assert list(result) == utils.sort_records(records, "name,-age,id")
+
+
+def test_compute_sha256_reads_by_chunks(tmp_path):
+    filepath = tmp_path / "file.bin"
+    content = os.urandom(1000)
+    filepath.write_bytes(content)
+    assert (
+        utils.compute_sha256(str(filepath), chunk_size=64) == hashlib.sha256(content).hexdigest()
+    )
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("bytes 10-99/100", (10, 100)),
+        ("bytes 10-99/*", (10, None)),
+        ("bytes */100", (None, 100)),
+        ("", (None, None)),
+        ("items 0-9/10", (None, None)),
+    ],
+)
+def test_parse_content_range(value, expected):
+    assert utils.parse_content_range(value) == expected
+
+
+def test_multipart_encoder_streams_files_by_chunks(tmp_path):
+    filepath = tmp_path / "file.bin"
+    filepath.write_bytes(b"abcdefghij")
+    with open(filepath, "rb") as f:
+        body = utils.MultipartEncoder(
+            [("attachment", ('my "file".bin', f, "image/png"))],
+            fields={"data": '{"a": 1}', "permissions": {"read": ["system.Everyone"]}},
+            chunk_size=4,
+        )
+        chunks = list(body)
+        # Can be sent again, eg. on retry.
+        assert list(body) == chunks
+        assert len(body) == len(b"".join(chunks))
+
+    assert b"abcd" in chunks and b"ij" in chunks
+    content = b"".join(chunks)
+    boundary = body.boundary.encode()
+    assert content == (
+        b"--" + boundary + b"\r\n"
+        b'Content-Disposition: form-data; name="data"\r\n\r\n{"a": 1}\r\n'
+        b"--" + boundary + b"\r\n"
+        b'Content-Disposition: form-data; name="permissions"\r\n\r\n'
+        b'{"read": ["system.Everyone"]}\r\n'
+        b"--" + boundary + b"\r\n"
+        b'Content-Disposition: form-data; name="attachment"; filename="my %22file%22.bin"\r\n'
+        b"Content-Type: image/png\r\n\r\n"
+        b"abcdefghij\r\n"
+        b"--" + boundary + b"--\r\n"
+    )